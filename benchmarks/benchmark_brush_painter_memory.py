@@ -0,0 +1,98 @@
+# benchmark_brush_painter_memory.py
+# Run with: blender --background --python benchmarks/benchmark_brush_painter_memory.py -- [--sizes 2048 3072 4096] [--steps 3]
+#
+# Reports the peak RSS of a brush painter pass over a single image. The peak of a
+# process never goes down, so every size is measured in its own Blender process.
+# Needs the resource module, which is not available on Windows.
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+import bpy
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Change this to the actual folder name of your addon
+# (the one that contains __init__.py)
+ADDON_FOLDER_NAME = "paint_system"
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Benchmark the peak memory of the brush painter")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2048, 3072, 4096], help="Image sides in pixels")
+    parser.add_argument("--steps", type=int, default=3, help="Brush painter steps")
+    parser.add_argument("--size", type=int, default=None, help="Measure this size in the current process")
+    return parser.parse_args(argv)
+
+
+def get_peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(size, steps):
+    try:
+        bpy.ops.preferences.addon_enable(module=ADDON_FOLDER_NAME)
+    except Exception as e:
+        print(f"Error: Failed to enable addon '{ADDON_FOLDER_NAME}'.", file=sys.stderr)
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    brush_painter_core = importlib.import_module(f"{ADDON_FOLDER_NAME}.operators.image_filters.brush_painter_core")
+
+    image = bpy.data.images.new("PS Benchmark Brush Painter", width=size, height=size, alpha=True)
+    image.generated_type = 'COLOR_GRID'
+    painter = brush_painter_core.BrushPainterCore()
+    painter.steps = steps
+    painter.use_random_seed = True
+    painter.enable_seam_duplication = False
+    try:
+        before = get_peak_rss_mb()
+        start_time = time.perf_counter()
+        painter.paint_image_tiles(image)
+        paint_time = time.perf_counter() - start_time
+        after = get_peak_rss_mb()
+    finally:
+        bpy.data.images.remove(image)
+    print(f"{size}px, {steps} steps: peak RSS {after:.0f} MB ({after - before:+.0f} MB while painting), {paint_time:.1f} s")
+
+
+def main():
+    args = parse_args()
+    if resource is None:
+        print("Error: peak RSS is measured with the resource module, which is not available here.", file=sys.stderr)
+        sys.exit(1)
+    if args.size is not None:
+        measure(args.size, args.steps)
+        return
+
+    failed = False
+    for size in args.sizes:
+        result = subprocess.run([
+            bpy.app.binary_path,
+            "--background",
+            "--python", os.path.abspath(__file__),
+            "--",
+            "--size", str(size),
+            "--steps", str(args.steps),
+        ], capture_output=True, text=True)
+        lines = [line for line in result.stdout.splitlines() if line.startswith(f"{size}px")]
+        if result.returncode != 0 or not lines:
+            print(f"{size}px: failed (exit code {result.returncode})")
+            print(result.stderr, file=sys.stderr)
+            failed = True
+            continue
+        print(lines[-1])
+    if failed:
+        sys.exit(1)
+
+
+main()
+sys.exit(0)
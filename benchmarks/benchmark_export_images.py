@@ -0,0 +1,94 @@
+# benchmark_export_images.py
+# Run with: blender --background --python benchmarks/benchmark_export_images.py -- [--count 20] [--size 4096]
+#
+# Compares exporting bake maps one after the other with Image.save() against
+# the threaded export of paintsystem.image_export.
+import argparse
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import bpy
+import numpy as np
+
+# Change this to the actual folder name of your addon
+# (the one that contains __init__.py)
+ADDON_FOLDER_NAME = "paint_system"
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Benchmark exporting bake maps")
+    parser.add_argument("--count", type=int, default=20, help="Number of maps")
+    parser.add_argument("--size", type=int, default=4096, help="Side of each map in pixels")
+    parser.add_argument("--workers", type=int, default=None, help="Export threads, the CPU count by default")
+    return parser.parse_args(argv)
+
+
+def create_maps(count, size):
+    """Create float maps with smooth gradients and some noise, like baked textures."""
+    rng = np.random.default_rng(0)
+    ramp = np.linspace(0.0, 1.0, size, dtype=np.float32)
+    images = []
+    for index in range(count):
+        image = bpy.data.images.new(f"BenchmarkMap{index}", width=size, height=size, alpha=True, float_buffer=True)
+        pixels = np.empty((size, size, 4), dtype=np.float32)
+        pixels[..., 0] = ramp[None, :]
+        pixels[..., 1] = ramp[:, None]
+        pixels[..., 2] = rng.random((size, size), dtype=np.float32) * 0.1 + index / count * 0.9
+        pixels[..., 3] = 1.0
+        image.pixels.foreach_set(pixels.ravel())
+        images.append(image)
+    return images
+
+
+def export_serial(images, directory):
+    """Export the way Export All Images did before the thread pool."""
+    for image in images:
+        image.filepath_raw = os.path.join(directory, f"{image.name}.png")
+        image.file_format = 'PNG'
+        image.save()
+
+
+def main():
+    args = parse_args()
+    try:
+        bpy.ops.preferences.addon_enable(module=ADDON_FOLDER_NAME)
+    except Exception as e:
+        print(f"Error: Failed to enable addon '{ADDON_FOLDER_NAME}'.", file=sys.stderr)
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    image_export = importlib.import_module(f"{ADDON_FOLDER_NAME}.paintsystem.image_export")
+
+    images = create_maps(args.count, args.size)
+    settings = image_export.ImageExportSettings(file_format='PNG', color_depth='16')
+    serial_dir = tempfile.mkdtemp(prefix="ps_export_serial_")
+    threaded_dir = tempfile.mkdtemp(prefix="ps_export_threaded_")
+    try:
+        start_time = time.perf_counter()
+        image_export.export_images(
+            [(image, os.path.join(threaded_dir, f"{image.name}.png"), settings) for image in images],
+            max_workers=args.workers,
+        )
+        threaded_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        export_serial(images, serial_dir)
+        serial_time = time.perf_counter() - start_time
+    finally:
+        shutil.rmtree(serial_dir, ignore_errors=True)
+        shutil.rmtree(threaded_dir, ignore_errors=True)
+        for image in images:
+            bpy.data.images.remove(image)
+
+    print(f"{args.count} maps of {args.size}px, 16 bit PNG")
+    print(f"  Image.save() one by one: {serial_time:.2f} s")
+    print(f"  export_images ({args.workers or os.cpu_count()} threads): {threaded_time:.2f} s")
+    print(f"  Speedup: {serial_time / threaded_time:.2f}x")
+
+
+main()
+sys.exit(0)
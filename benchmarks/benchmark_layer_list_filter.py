@@ -0,0 +1,116 @@
+# benchmark_layer_list_filter.py
+# Run with: blender --background --python benchmarks/benchmark_layer_list_filter.py -- [--layers 1000] [--redraws 100]
+#
+# Times MAT_PT_UL_LayerList.filter_items, run on every redraw of the layer list,
+# on a channel with many layers in folders, some of them collapsed. The loop it
+# replaced (list.index() and a parent chain walk per row) is timed for comparison.
+import argparse
+import importlib
+import sys
+import time
+from types import SimpleNamespace
+
+import bpy
+
+# Change this to the actual folder name of your addon
+# (the one that contains __init__.py)
+ADDON_FOLDER_NAME = "paint_system"
+# UILST_FLT_ITEM, the value of UIList.bitflag_filter_item
+BITFLAG_FILTER_ITEM = 1 << 30
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Benchmark the layer list filter")
+    parser.add_argument("--layers", type=int, default=1000, help="Number of layers in the channel")
+    parser.add_argument("--folder-size", type=int, default=10, help="Layers per folder, the folder included")
+    parser.add_argument("--redraws", type=int, default=100, help="Number of filter_items calls to time")
+    return parser.parse_args(argv)
+
+
+def create_channel(layer_count, folder_size):
+    """Create a material whose channel holds layer_count layers, grouped in folders, every third one collapsed."""
+    material = bpy.data.materials.new("PS Benchmark Layer List")
+    group = material.ps_mat_data.groups.add()
+    channel = group.channels.add()
+    folder_id = -1
+    order_by_parent = {}
+    for layer_id in range(layer_count):
+        layer = channel.layers.add()
+        # Only the hierarchy is needed, no layer node trees are built
+        layer.auto_update_node_tree = False
+        layer.id = layer_id
+        if layer_id % folder_size == 0:
+            layer.type = 'FOLDER'
+            layer.parent_id = -1
+            layer.is_expanded = (layer_id // folder_size) % 3 != 0
+            folder_id = layer_id
+        else:
+            layer.parent_id = folder_id
+        order_by_parent[layer.parent_id] = order_by_parent.get(layer.parent_id, 0) + 1
+        layer.order = order_by_parent[layer.parent_id]
+    channel.next_id = layer_count
+    return material, channel
+
+
+def previous_filter_items(self, context, data, propname):
+    """filter_items before it used the cached display order."""
+    layers = getattr(data, propname).values()
+    flattened_layers = data.flattened_unlinked_layers
+    flt_flags = [self.bitflag_filter_item] * len(layers)
+    flt_neworder = []
+    for idx, layer in enumerate(layers):
+        flt_neworder.append(flattened_layers.index(layer))
+        while layer.parent_id != -1:
+            layer = data.get_item_by_id(layer.parent_id)
+            if layer and not layer.is_expanded:
+                flt_flags[idx] &= ~self.bitflag_filter_item
+                break
+    return flt_flags, flt_neworder
+
+
+def time_redraws(filter_items, ui_list, channel, redraws):
+    result = filter_items(ui_list, bpy.context, channel, "layers")
+    start_time = time.perf_counter()
+    for _ in range(redraws):
+        filter_items(ui_list, bpy.context, channel, "layers")
+    return result, (time.perf_counter() - start_time) / redraws
+
+
+def main():
+    args = parse_args()
+    try:
+        bpy.ops.preferences.addon_enable(module=ADDON_FOLDER_NAME)
+    except Exception as e:
+        print(f"Error: Failed to enable addon '{ADDON_FOLDER_NAME}'.", file=sys.stderr)
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    layers_panels = importlib.import_module(f"{ADDON_FOLDER_NAME}.panels.layers_panels")
+    nested_list_manager = importlib.import_module(f"{ADDON_FOLDER_NAME}.paintsystem.nested_list_manager")
+
+    material, channel = create_channel(args.layers, args.folder_size)
+    # filter_items only reads bitflag_filter_item from the list, registered UILists cannot be created from Python
+    ui_list = SimpleNamespace(bitflag_filter_item=BITFLAG_FILTER_ITEM)
+    filter_items = layers_panels.MAT_PT_UL_LayerList.filter_items
+    try:
+        nested_list_manager.bump_structure_revision()
+        start_time = time.perf_counter()
+        filter_items(ui_list, bpy.context, channel, "layers")
+        first_time = time.perf_counter() - start_time
+
+        result, redraw_time = time_redraws(filter_items, ui_list, channel, args.redraws)
+        expected, previous_time = time_redraws(previous_filter_items, ui_list, channel, args.redraws)
+    finally:
+        bpy.data.materials.remove(material)
+
+    print(f"{args.layers} layers, {sum(1 for flag in result[0] if flag)} shown")
+    print(f"  filter_items after a structure change: {first_time * 1000:.2f} ms")
+    print(f"  filter_items per redraw: {redraw_time * 1000:.2f} ms")
+    print(f"  previous filter_items per redraw: {previous_time * 1000:.2f} ms")
+    if list(result[0]) != list(expected[0]) or list(result[1]) != list(expected[1]):
+        print("Error: the filter differs from the previous one.", file=sys.stderr)
+        sys.exit(1)
+
+
+main()
+sys.exit(0)
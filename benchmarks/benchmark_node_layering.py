@@ -0,0 +1,111 @@
+# benchmark_node_layering.py
+# Run with: blender --background --python benchmarks/benchmark_node_layering.py -- [--sizes 50 500 5000]
+#
+# Compares compute_node_levels, used by NodeTreeBuilder._arrange_nodes, with the
+# edge rescanning loop it replaced, on synthetic graphs shaped like channel graphs.
+import argparse
+import importlib
+import random
+import sys
+import time
+
+import bpy
+
+# Change this to the actual folder name of your addon
+# (the one that contains __init__.py)
+ADDON_FOLDER_NAME = "paint_system"
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Benchmark node layering")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 1000, 5000], help="Node counts")
+    parser.add_argument("--max-legacy-nodes", type=int, default=1000,
+                        help="Largest graph to run the previous algorithm on, it is quadratic")
+    return parser.parse_args(argv)
+
+
+def layer_stack_graph(node_count):
+    """A chain of mix nodes, each with its own layer node plugged in, like a channel with many layers."""
+    layer_count = max(1, node_count // 2)
+    nodes = ["group_output"]
+    edges = []
+    previous = "group_input"
+    nodes.append(previous)
+    for index in range(layer_count):
+        mix, layer = f"mix_{index}", f"layer_{index}"
+        nodes += [mix, layer]
+        edges += [(previous, mix), (layer, mix)]
+        previous = mix
+    edges.append((previous, "group_output"))
+    return nodes, edges
+
+
+def random_dag(node_count, seed=0):
+    """Every node feeds one to three nodes created before it, node 0 is the only end node."""
+    rng = random.Random(seed)
+    nodes = [f"node_{index}" for index in range(node_count)]
+    edges = []
+    for index in range(1, node_count):
+        for target in rng.sample(range(index), min(index, rng.randint(1, 3))):
+            edges.append((nodes[index], nodes[target]))
+    return nodes, edges
+
+
+def legacy_levels(node_names, edges):
+    """The level assignment _arrange_nodes did before compute_node_levels."""
+    source_node_names = {source for source, _target in edges}
+    level_map = {}
+    nodes_to_process = []
+    for name in node_names:
+        if name not in source_node_names and name not in level_map:
+            level_map[name] = 0
+            nodes_to_process.append(name)
+    while nodes_to_process:
+        current_node_name = nodes_to_process.pop(0)
+        current_level = level_map[current_node_name]
+        for source, target in edges:
+            if target == current_node_name:
+                level_map[source] = max(current_level + 1, level_map.get(source, 1))
+                if source not in nodes_to_process and current_node_name != source:
+                    nodes_to_process.append(source)
+    return level_map
+
+
+def time_call(function, *args):
+    start_time = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start_time
+
+
+def main():
+    args = parse_args()
+    try:
+        bpy.ops.preferences.addon_enable(module=ADDON_FOLDER_NAME)
+    except Exception as e:
+        print(f"Error: Failed to enable addon '{ADDON_FOLDER_NAME}'.", file=sys.stderr)
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    nodetree_builder = importlib.import_module(f"{ADDON_FOLDER_NAME}.paintsystem.graph.nodetree_builder")
+
+    failed = False
+    for graph_name, make_graph in (("layer stack", layer_stack_graph), ("random DAG", random_dag)):
+        for size in args.sizes:
+            nodes, edges = make_graph(size)
+            levels, new_time = time_call(nodetree_builder.compute_node_levels, nodes, edges)
+            line = f"{graph_name:>11} {len(nodes):>6} nodes {len(edges):>6} edges: compute_node_levels {new_time * 1000:9.2f} ms"
+            if len(nodes) <= args.max_legacy_nodes:
+                expected, legacy_time = time_call(legacy_levels, nodes, edges)
+                line += f", previous loop {legacy_time * 1000:9.2f} ms"
+                if levels != expected:
+                    line += " MISMATCH"
+                    failed = True
+            print(line)
+
+    if failed:
+        print("Error: the levels differ from the previous algorithm.", file=sys.stderr)
+        sys.exit(1)
+
+
+main()
+sys.exit(0)
@@ -0,0 +1,90 @@
+# benchmark_udim_read.py
+# Run with: blender --background --python benchmarks/benchmark_udim_read.py -- [--tiles 4 16 64] [--size 2048]
+#
+# Compares reading packed UDIM tiles in memory, as blender_image_to_numpy does,
+# with saving the tiles to the temporary folder and loading them back.
+import argparse
+import importlib
+import sys
+import time
+
+import bpy
+import numpy as np
+
+# Change this to the actual folder name of your addon
+# (the one that contains __init__.py)
+ADDON_FOLDER_NAME = "paint_system"
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Benchmark reading packed UDIM tiles")
+    parser.add_argument("--tiles", type=int, nargs="+", default=[4, 16, 64], help="Tile counts")
+    parser.add_argument("--size", type=int, default=2048, help="Side of each tile in pixels")
+    return parser.parse_args(argv)
+
+
+def create_packed_udim(tile_count, size):
+    """Create a packed UDIM image whose tiles are filled with a colour grid."""
+    image = bpy.data.images.new(f"PS Benchmark UDIM {tile_count}", width=size, height=size, alpha=True, tiled=True)
+    with bpy.context.temp_override(edit_image=image):
+        bpy.ops.image.tile_fill(generated_type='COLOR_GRID', width=size, height=size)
+        if tile_count > 1:
+            bpy.ops.image.tile_add(
+                number=1002,
+                count=tile_count - 1,
+                fill=True,
+                generated_type='COLOR_GRID',
+                width=size,
+                height=size,
+            )
+    image.pack()
+    return image
+
+
+def main():
+    args = parse_args()
+    try:
+        bpy.ops.preferences.addon_enable(module=ADDON_FOLDER_NAME)
+    except Exception as e:
+        print(f"Error: Failed to enable addon '{ADDON_FOLDER_NAME}'.", file=sys.stderr)
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    image_module = importlib.import_module(f"{ADDON_FOLDER_NAME}.paintsystem.image")
+
+    failed = False
+    for tile_count in args.tiles:
+        # Reading from disk unpacks the image, so each path gets its own copy
+        in_memory_image = create_packed_udim(tile_count, args.size)
+        from_disk_image = create_packed_udim(tile_count, args.size)
+        try:
+            start_time = time.perf_counter()
+            in_memory = image_module.blender_image_to_numpy(in_memory_image).tiles
+            in_memory_time = time.perf_counter() - start_time
+            is_still_packed = bool(in_memory_image.packed_files) and not in_memory_image.is_dirty
+
+            start_time = time.perf_counter()
+            from_disk = image_module._read_udim_tiles_from_disk(from_disk_image, args.size, args.size)
+            from_disk_time = time.perf_counter() - start_time
+        finally:
+            bpy.data.images.remove(in_memory_image)
+            bpy.data.images.remove(from_disk_image)
+
+        is_equal = in_memory.keys() == from_disk.keys() and all(
+            np.array_equal(in_memory[tile_number], from_disk[tile_number]) for tile_number in in_memory
+        )
+        print(
+            f"{tile_count:>3} tiles of {args.size}px: in memory {in_memory_time:.2f} s, "
+            f"save and load {from_disk_time:.2f} s ({from_disk_time / in_memory_time:.1f}x)"
+            + ("" if is_equal else " PIXELS DIFFER")
+            + ("" if is_still_packed else " IMAGE CHANGED")
+        )
+        failed = failed or not is_equal or not is_still_packed
+
+    if failed:
+        print("Error: the in memory read differs from the disk read or changed the image.", file=sys.stderr)
+        sys.exit(1)
+
+
+main()
+sys.exit(0)
@@ -1,3 +1,4 @@
+import os
 import time
 import bpy
 from bpy.types import Context, Image, Material, Operator, UILayout
@@ -6,8 +7,12 @@ from bpy.props import StringProperty, BoolProperty, IntProperty, EnumProperty
 
 from .common import PSContextMixin, PSImageCreateMixin, DEFAULT_PS_UV_MAP_NAME
 
-from ..paintsystem.data import Layer, set_layer_blend_type, get_layer_blend_type
+from ..paintsystem.data import ChannelBake, Layer, bake_channel_batches, mark_channels_baked, plan_bake_batches, set_layer_blend_type, get_layer_blend_type
 from ..paintsystem.context import parse_material
+from ..paintsystem.compositing import can_composite_layers, composite_layers
+from ..paintsystem.image_export import FILE_EXTENSIONS, ImageExportSettings, export_images
+from ..paintsystem.bake_workers import is_bake_workers_running, start_bake_workers
+from ..paintsystem.rebuild_scheduler import deferred_node_tree_updates
 from ..panels.common import get_icon_from_channel
 
 
@@ -63,6 +68,13 @@ class BakeOperator(PSContextMixin, PSImageCreateMixin, Operator):
         options={'SKIP_SAVE'}
     )
     
+    use_cache: BoolProperty(
+        name="Skip Unchanged Channels",
+        description="Keep the bake image of channels that have not changed since they were baked into it",
+        default=True,
+        options={'SKIP_SAVE'}
+    )
+    
     as_tangent_normal: BoolProperty(
         name="As Tangent Normal",
         description="Bake the channel as a tangent normal",
@@ -88,11 +100,13 @@ class BakeOperator(PSContextMixin, PSImageCreateMixin, Operator):
         self.image_name = f"{ps_ctx.active_group.name}_{ps_ctx.active_channel.name}"
         return context.window_manager.invoke_props_dialog(self)
     
-    def advanced_bake_settings_ui(self, layout: UILayout, context: Context):
+    def advanced_bake_settings_ui(self, layout: UILayout, context: Context, show_cache: bool = False):
         header, panel = layout.panel("advanced_bake_settings_panel", default_closed=True)
         header.label(text="Advanced Settings", icon='IMAGE_DATA')
         if panel:
             panel.prop(self, "use_gpu", text="Use GPU")
+            if show_cache:
+                panel.prop(self, "use_cache")
             split = panel.split(factor=0.4, align=True)
             split.prop(self, "margin", text="Margin")
             split.prop(self, "margin_type", text="")
@@ -202,7 +216,7 @@ class PAINTSYSTEM_OT_BakeChannel(BakeOperator):
         layout = self.layout
         self.multi_object_ui(layout, context)
         self.bake_image_ui(layout, context)
-        self.advanced_bake_settings_ui(layout, context)
+        self.advanced_bake_settings_ui(layout, context, show_cache=True)
     
     def invoke(self, context, event):
         ps_ctx = self.parse_context(context)
@@ -263,7 +277,7 @@ class PAINTSYSTEM_OT_BakeChannel(BakeOperator):
                 active_channel.bake_uv_map = self.uv_map_name
                     
                 active_channel.use_bake_image = False
-                active_channel.bake(
+                is_baked = active_channel.bake(
                     context,
                     mat,
                     bake_image,
@@ -272,13 +286,16 @@ class PAINTSYSTEM_OT_BakeChannel(BakeOperator):
                     use_gpu=self.use_gpu,
                     margin=self.margin,
                     margin_type=self.margin_type,
-                    disable_deform_modifiers=self.as_tangent_normal and active_channel.type == 'VECTOR'
+                    disable_deform_modifiers=self.as_tangent_normal and active_channel.type == 'VECTOR',
+                    use_cache=self.use_cache,
                 )
                 if self.as_tangent_normal:
                     active_channel.bake_vector_space = 'TANGENT'
                 else:
                     active_channel.bake_vector_space = active_channel.vector_space
                 active_channel.use_bake_image = True
+                if is_baked:
+                    mark_channels_baked([active_channel])
         # Return to object mode
         bpy.ops.object.mode_set(mode="OBJECT")
         # Set cursor to default
@@ -301,11 +318,48 @@ class PAINTSYSTEM_OT_BakeAllChannels(BakeOperator):
         ps_ctx = cls.parse_context(context)
         return ps_ctx.active_group
     
+    only_changed: BoolProperty(
+        name="Only Changed Channels",
+        description="Skip the channels that have not changed since they were baked into their bake image",
+        default=False,
+        options={'SKIP_SAVE'}
+    )
+    use_background_workers: BoolProperty(
+        name="Bake in Background",
+        description="Bake on the CPU in separate Blender processes and keep working meanwhile. The bake images are updated once all of them finish",
+        default=False,
+        options={'SKIP_SAVE'}
+    )
+    worker_count: IntProperty(
+        name="Workers",
+        description="Number of Blender processes baking in parallel",
+        default=max(1, min(4, (os.cpu_count() or 1) // 2)),
+        min=1,
+        max=64,
+        options={'SKIP_SAVE'}
+    )
+    
+    def is_channel_up_to_date(self, channel) -> bool:
+        bake_image = channel.bake_image
+        return (
+            not channel.bake_dirty
+            and channel.use_bake_image
+            and bake_image is not None
+            and bake_image.size[0] == self.image_width
+            and bake_image.size[1] == self.image_height
+            and channel.bake_uv_map == self.uv_map_name
+        )
+    
     def draw(self, context):
         layout = self.layout
         self.multi_object_ui(layout, context)
         self.bake_image_ui(layout, context)
-        self.advanced_bake_settings_ui(layout, context)
+        layout.prop(self, "only_changed")
+        row = layout.row(align=True)
+        row.prop(self, "use_background_workers")
+        if self.use_background_workers:
+            row.prop(self, "worker_count")
+        self.advanced_bake_settings_ui(layout, context, show_cache=True)
     
     def execute(self, context):
         start_time = time.time()
@@ -314,35 +368,73 @@ class PAINTSYSTEM_OT_BakeAllChannels(BakeOperator):
         if not bake_materials:
             self.report({'ERROR'}, "No materials to bake.")
             return {'CANCELLED'}
+        if self.use_background_workers and is_bake_workers_running():
+            self.report({'ERROR'}, "A background bake is already running.")
+            return {'CANCELLED'}
         # Set cursor to wait
         context.window.cursor_set('WAIT')
         
         if self.image_resolution != 'CUSTOM':
             self.image_width = int(self.image_resolution)
             self.image_height = int(self.image_resolution)
-        ps_ctx = self.parse_context(context)
-        for mat in bake_materials:
-            _, active_group, _, _ = parse_material(mat)
-            for channel in active_group.channels:
-                bake_image = channel.bake_image
-                if not bake_image:
-                    self.image_name = f"{active_group.name}_{channel.name}_Baked"
-                    bake_image = self.create_image(context)
-                    channel.bake_image = bake_image
-                elif bake_image.size[0] != self.image_width or bake_image.size[1] != self.image_height:
-                    bake_image.scale(self.image_width, self.image_height)
-                bake_image.colorspace_settings.name = 'Non-Color' if channel.color_space == 'NONCOLOR' else 'sRGB'
-                channel.use_bake_image = False
-                channel.bake_uv_map = self.uv_map_name
-                channel.bake(context, mat, bake_image, self.uv_map_name)
-                channel.use_bake_image = True
+        bakes = []
+        skipped_channels = []
+        with deferred_node_tree_updates(context):
+            for mat in bake_materials:
+                _, active_group, _, _ = parse_material(mat)
+                for channel in active_group.channels:
+                    if self.only_changed and self.is_channel_up_to_date(channel):
+                        skipped_channels.append(f"{mat.name}/{channel.name}")
+                        continue
+                    bake_image = channel.bake_image
+                    if not bake_image:
+                        self.image_name = f"{active_group.name}_{channel.name}_Baked"
+                        bake_image = self.create_image(context)
+                        channel.bake_image = bake_image
+                    elif bake_image.size[0] != self.image_width or bake_image.size[1] != self.image_height:
+                        bake_image.scale(self.image_width, self.image_height)
+                    bake_image.colorspace_settings.name = 'Non-Color' if channel.color_space == 'NONCOLOR' else 'sRGB'
+                    channel.use_bake_image = False
+                    channel.bake_uv_map = self.uv_map_name
+                    bakes.append(ChannelBake(material=mat, channel=channel, bake_image=bake_image, uv_layer=self.uv_map_name))
+        
+        if self.use_background_workers and bakes:
+            try:
+                session = start_bake_workers(context, bakes, self.worker_count, self.margin, self.margin_type, self.use_cache)
+            except (OSError, RuntimeError) as e:
+                context.window.cursor_set('DEFAULT')
+                self.report({'ERROR'}, f"Could not start the background bake: {e}")
+                return {'CANCELLED'}
+            context.window.cursor_set('DEFAULT')
+            report = f"Baking {len(bakes)} channels in {len(session.workers)} background processes"
+            if skipped_channels:
+                report += f". Skipped {len(skipped_channels)} unchanged channels: {', '.join(skipped_channels)}"
+            self.report({'INFO'}, report)
+            return {'FINISHED'}
+        
+        # Channels of the same material share one bake call
+        timings = bake_channel_batches(
+            context,
+            plan_bake_batches(bakes),
+            use_gpu=self.use_gpu,
+            margin=self.margin,
+            margin_type=self.margin_type,
+            use_cache=self.use_cache,
+        )
+        with deferred_node_tree_updates(context):
+            for bake in bakes:
+                bake.channel.use_bake_image = True
+        mark_channels_baked([bake.channel for bake in bakes if bake.is_baked])
         # Return to object mode
         bpy.ops.object.mode_set(mode="OBJECT")
         # Set cursor to default
         context.window.cursor_set('DEFAULT')
         end_time = time.time()
         # report the time taken
-        self.report({'INFO'}, f"Baked {len(bake_materials)} materials in {round(end_time - start_time, 2)} seconds")
+        report = f"Baked {len(bake_materials)} materials in {round(end_time - start_time, 2)} seconds ({timings.summary()})"
+        if skipped_channels:
+            report += f". Skipped {len(skipped_channels)} unchanged channels: {', '.join(skipped_channels)}"
+        self.report({'INFO'}, report)
         return {'FINISHED'}
 
 
@@ -396,6 +488,52 @@ class PAINTSYSTEM_OT_ExportAllImages(PSContextMixin, Operator):
         default=True
     )
     
+    file_format: EnumProperty(
+        name="File Format",
+        items=[
+            ('PNG', "PNG", "Export the images as PNG files"),
+            ('OPEN_EXR', "OpenEXR", "Export the images as OpenEXR files"),
+        ],
+        default='PNG'
+    )
+    
+    png_color_depth: EnumProperty(
+        name="Color Depth",
+        items=[
+            ('8', "8", "8 bit color channels"),
+            ('16', "16", "16 bit color channels"),
+        ],
+        default='8'
+    )
+    
+    exr_color_depth: EnumProperty(
+        name="Color Depth",
+        items=[
+            ('16', "Float (Half)", "16 bit float color channels"),
+            ('32', "Float (Full)", "32 bit float color channels"),
+        ],
+        default='16'
+    )
+    
+    compression: IntProperty(
+        name="Compression",
+        description="Amount of time to spend compressing the PNG files",
+        default=15,
+        min=0,
+        max=100,
+        subtype='PERCENTAGE'
+    )
+    
+    exr_codec: EnumProperty(
+        name="Codec",
+        items=[
+            ('ZIP', "ZIP (lossless)", "Lossless compression of blocks of 16 scanlines"),
+            ('ZIPS', "ZIPS (lossless)", "Lossless compression of single scanlines"),
+            ('NONE', "None", "No compression"),
+        ],
+        default='ZIP'
+    )
+    
     @classmethod
     def poll(cls, context):
         ps_ctx = cls.parse_context(context)
@@ -413,6 +551,23 @@ class PAINTSYSTEM_OT_ExportAllImages(PSContextMixin, Operator):
         context.window_manager.fileselect_add(self)
         return {'RUNNING_MODAL'}
     
+    def get_export_settings(self) -> ImageExportSettings:
+        return ImageExportSettings(
+            file_format=self.file_format,
+            color_depth=self.exr_color_depth if self.file_format == 'OPEN_EXR' else self.png_color_depth,
+            compression=self.compression,
+            exr_codec=self.exr_codec,
+        )
+    
+    def get_export_filename(self, image: Image) -> str:
+        filename = image.name
+        if self.replace_whitespaces:
+            filename = filename.replace(" ", "_")
+        # If image has tiles, add UDIM marker to the image name
+        if len(image.tiles) > 1:
+            filename = f"{filename}.<UDIM>"
+        return f"{filename}.{FILE_EXTENSIONS[self.file_format]}"
+    
     def draw(self, context):
         layout = self.layout
         # Show preview of what will be exported
@@ -426,13 +581,7 @@ class PAINTSYSTEM_OT_ExportAllImages(PSContextMixin, Operator):
         for channel in active_group.channels:
             row = export_col.row()
             if channel.bake_image:
-                image_name = channel.bake_image.name
-                if self.replace_whitespaces:
-                    image_name = image_name.replace(" ", "_")
-                # If image has tiles, add UDIM marker to the image name
-                if len(channel.bake_image.tiles) > 1:
-                    image_name = f"{image_name}.<UDIM>"
-                row.label(text=f"{channel.name}: {image_name}.png", icon_value=get_icon_from_channel(channel))
+                row.label(text=f"{channel.name}: {self.get_export_filename(channel.bake_image)}", icon_value=get_icon_from_channel(channel))
                 exported_count += 1
             else:
                 row.label(text=f"{channel.name}: No baked image", icon_value=get_icon_from_channel(channel))
@@ -444,10 +593,17 @@ class PAINTSYSTEM_OT_ExportAllImages(PSContextMixin, Operator):
             box.label(text=f"Total: {exported_count} images")
         box.prop(self, "as_copy")
         box.prop(self, "replace_whitespaces")
+        
+        format_box = layout.box()
+        format_box.prop(self, "file_format")
+        if self.file_format == 'OPEN_EXR':
+            format_box.row().prop(self, "exr_color_depth", expand=True)
+            format_box.prop(self, "exr_codec")
+        else:
+            format_box.row().prop(self, "png_color_depth", expand=True)
+            format_box.prop(self, "compression")
     
     def execute(self, context):
-        import os
-        
         ps_ctx = self.parse_context(context)
         active_group = ps_ctx.active_group
         
@@ -467,43 +623,59 @@ class PAINTSYSTEM_OT_ExportAllImages(PSContextMixin, Operator):
                 self.report({'ERROR'}, f"Failed to create directory: {str(e)}")
                 return {'CANCELLED'}
         
-        exported_count = 0
-        failed_count = 0
-        
+        images = {}
         for channel in active_group.channels:
             if channel.bake_image:
-                try:
-                    
-                    # Save the image
-                    image = channel.bake_image
-                    # Create filename from channel name
-                    filename = image.name
-                    if self.replace_whitespaces:
-                        filename = filename.replace(" ", "_")
-                    # If image has tiles, add UDIM marker to the image name
-                    if len(image.tiles) > 1:
-                        filename = f"{filename}.<UDIM>"
-                    filename = f"{filename}.png"
-                    filepath = os.path.join(self.directory, filename)
-                    image.save(filepath=filepath, save_copy=self.as_copy)
-                    
-                    exported_count += 1
-                    
-                except Exception as e:
-                    self.report({'WARNING'}, f"Failed to export {channel.name}: {str(e)}")
-                    failed_count += 1
+                images[channel.bake_image.name] = (channel.bake_image, os.path.join(self.directory, self.get_export_filename(channel.bake_image)))
+        if not images:
+            self.report({'ERROR'}, "No baked images found to export.")
+            return {'CANCELLED'}
+        
+        start_time = time.time()
+        settings = self.get_export_settings()
+        window_manager = context.window_manager
+        window_manager.progress_begin(0, len(images))
+        try:
+            errors = export_images(
+                [(image, filepath, settings) for image, filepath in images.values()],
+                progress_callback=lambda written, read: window_manager.progress_update(read),
+            )
+        finally:
+            window_manager.progress_end()
+        
+        exported_count = 0
+        failed_count = 0
+        for image_name, error in errors.items():
+            if error:
+                self.report({'WARNING'}, f"Failed to export {image_name}: {error}")
+                failed_count += 1
+                continue
+            exported_count += 1
+            if not self.as_copy:
+                image, filepath = images[image_name]
+                self.use_exported_file(image, filepath)
         
         if exported_count > 0:
-            self.report({'INFO'}, f"Exported {exported_count} images to {self.directory}")
+            self.report({'INFO'}, f"Exported {exported_count} images to {self.directory} in {round(time.time() - start_time, 2)} seconds")
         
         if failed_count > 0:
             self.report({'WARNING'}, f"Failed to export {failed_count} images")
         
         if exported_count == 0:
-            self.report({'ERROR'}, "No baked images found to export.")
             return {'CANCELLED'}
         
         return {'FINISHED'}
+    
+    def use_exported_file(self, image: Image, filepath: str):
+        """Point the image at its exported file, like saving it without As Copy does."""
+        image.filepath_raw = filepath
+        image.file_format = self.file_format
+        if image.packed_file:
+            # The file exists, so unpacking uses it instead of writing the packed data
+            image.unpack(method='USE_ORIGINAL')
+        if image.source == 'GENERATED':
+            image.source = 'FILE'
+        image.reload()
 
 
 class PAINTSYSTEM_OT_DeleteBakedImage(PSContextMixin, Operator):
@@ -769,35 +941,41 @@ class PAINTSYSTEM_OT_MergeDown(BakeOperator):
         
         image = self.create_image(context)
         
-        to_be_enabled_layers = []
-        # Enable both active layer and below layer, disable all others
-        for layer in active_channel.flattened_layers:
-            if layer.type != "FOLDER" and layer.enabled and layer != active_layer and layer != below_layer:
-                to_be_enabled_layers.append(layer)
-                layer.enabled = False
-        
-        # Enable the below layer if it's not already enabled
-        if not below_layer.enabled:
-            below_layer.enabled = True
-        
-        # Store original blend modes
-        original_active_blend_mode = get_layer_blend_type(active_layer)
-        original_below_blend_mode = get_layer_blend_type(below_layer)
-        
-        # Set both layers to MIX for proper blending
-        set_layer_blend_type(active_layer, 'MIX')
-        set_layer_blend_type(below_layer, 'MIX')
-        
-        # Bake both layers into the new image
-        active_channel.bake(context, ps_ctx.active_material, image, self.uv_map_name, use_group_tree=False, force_alpha=True)
-        
-        # Restore original blend modes
-        set_layer_blend_type(active_layer, original_active_blend_mode)
-        set_layer_blend_type(below_layer, original_below_blend_mode)
-        
-        # Restore other layers
-        for layer in to_be_enabled_layers:
-            layer.enabled = True
+        # Plain image layers in the same UV space are blended on the CPU, anything else is baked
+        merged = (
+            can_composite_layers(below_layer, active_layer, image, self.uv_map_name)
+            and composite_layers(below_layer, active_layer, image)
+        )
+        if not merged:
+            to_be_enabled_layers = []
+            # Enable both active layer and below layer, disable all others
+            for layer in active_channel.flattened_layers:
+                if layer.type != "FOLDER" and layer.enabled and layer != active_layer and layer != below_layer:
+                    to_be_enabled_layers.append(layer)
+                    layer.enabled = False
+            
+            # Enable the below layer if it's not already enabled
+            if not below_layer.enabled:
+                below_layer.enabled = True
+            
+            # Store original blend modes
+            original_active_blend_mode = get_layer_blend_type(active_layer)
+            original_below_blend_mode = get_layer_blend_type(below_layer)
+            
+            # Set both layers to MIX for proper blending
+            set_layer_blend_type(active_layer, 'MIX')
+            set_layer_blend_type(below_layer, 'MIX')
+            
+            # Bake both layers into the new image
+            active_channel.bake(context, ps_ctx.active_material, image, self.uv_map_name, use_group_tree=False, force_alpha=True)
+            
+            # Restore original blend modes
+            set_layer_blend_type(active_layer, original_active_blend_mode)
+            set_layer_blend_type(below_layer, original_below_blend_mode)
+            
+            # Restore other layers
+            for layer in to_be_enabled_layers:
+                layer.enabled = True
         
         # Remove the current layer since it's been merged
         apply_merged_image_to_layer(below_unlinked_layer, image, self.uv_map_name)
@@ -890,35 +1068,41 @@ class PAINTSYSTEM_OT_MergeUp(BakeOperator):
 
         image = self.create_image(context)
 
-        to_be_enabled_layers = []
-        # Enable both active layer and above layer, disable all others
-        for layer in active_channel.flattened_layers:
-            if layer.type != "FOLDER" and layer.enabled and layer != active_layer and layer != above_layer:
-                to_be_enabled_layers.append(layer)
-                layer.enabled = False
+        # Plain image layers in the same UV space are blended on the CPU, anything else is baked
+        merged = (
+            can_composite_layers(active_layer, above_layer, image, self.uv_map_name)
+            and composite_layers(active_layer, above_layer, image)
+        )
+        if not merged:
+            to_be_enabled_layers = []
+            # Enable both active layer and above layer, disable all others
+            for layer in active_channel.flattened_layers:
+                if layer.type != "FOLDER" and layer.enabled and layer != active_layer and layer != above_layer:
+                    to_be_enabled_layers.append(layer)
+                    layer.enabled = False
 
-        # Ensure the above layer is enabled
-        if not above_layer.enabled:
-            above_layer.enabled = True
+            # Ensure the above layer is enabled
+            if not above_layer.enabled:
+                above_layer.enabled = True
 
-        # Store original blend modes
-        original_active_blend_mode = get_layer_blend_type(active_layer)
-        original_above_blend_mode = get_layer_blend_type(above_layer)
+            # Store original blend modes
+            original_active_blend_mode = get_layer_blend_type(active_layer)
+            original_above_blend_mode = get_layer_blend_type(above_layer)
 
-        # Set both layers to MIX for proper blending
-        set_layer_blend_type(active_layer, 'MIX')
-        set_layer_blend_type(above_layer, 'MIX')
+            # Set both layers to MIX for proper blending
+            set_layer_blend_type(active_layer, 'MIX')
+            set_layer_blend_type(above_layer, 'MIX')
 
-        # Bake both layers into the new image
-        active_channel.bake(context, ps_ctx.active_material, image, self.uv_map_name, use_group_tree=False, force_alpha=True)
+            # Bake both layers into the new image
+            active_channel.bake(context, ps_ctx.active_material, image, self.uv_map_name, use_group_tree=False, force_alpha=True)
 
-        # Restore original blend modes
-        set_layer_blend_type(active_layer, original_active_blend_mode)
-        set_layer_blend_type(above_layer, original_above_blend_mode)
+            # Restore original blend modes
+            set_layer_blend_type(active_layer, original_active_blend_mode)
+            set_layer_blend_type(above_layer, original_above_blend_mode)
 
-        # Restore other layers
-        for layer in to_be_enabled_layers:
-            layer.enabled = True
+            # Restore other layers
+            for layer in to_be_enabled_layers:
+                layer.enabled = True
 
         apply_merged_image_to_layer(above_unlinked_layer, image, self.uv_map_name)
         active_channel.delete_layer(context, unlinked_layer)
@@ -10,6 +10,7 @@ from ..utils.version import is_newer_than
 from ..paintsystem.graph.common import get_library_nodetree
 
 from ..paintsystem.data import TEMPLATE_ENUM
+from ..paintsystem.rebuild_scheduler import deferred_node_tree_updates
 from ..utils.nodes import (
     dissolve_nodes,
     find_connected_node,
@@ -167,108 +168,110 @@ class PAINTSYSTEM_OT_NewGroup(PSContextMixin, PSUVOptionsMixin, MultiMaterialOpe
         if self.template == 'BASIC' and self.set_view_transform:
             context.scene.view_settings.view_transform = 'Standard'
         
-        node_tree = bpy.data.node_groups.new(name=f"Temp Group Name", type='ShaderNodeTree')
-        new_group = ps_ctx.ps_mat_data.create_new_group(context, self.group_name, node_tree)
-        new_group.template = self.template
-        mat_node_tree = mat.node_tree
+        # Rebuild the new group, its channels and layers once all of them exist
+        with deferred_node_tree_updates(context):
+            node_tree = bpy.data.node_groups.new(name=f"Temp Group Name", type='ShaderNodeTree')
+            new_group = ps_ctx.ps_mat_data.create_new_group(context, self.group_name, node_tree)
+            new_group.template = self.template
+            mat_node_tree = mat.node_tree
         
-        ps_ctx = self.parse_context(context)
-        if not self.add_layers:
-            self.coord_type = "UV"
-        self.store_coord_type(context)
+            ps_ctx = self.parse_context(context)
+            if not self.add_layers:
+                self.coord_type = "UV"
+            self.store_coord_type(context)
         
-        # Create Channels and layers and setup the group
-        match self.template:
-            case 'BASIC':
-                channel = new_group.create_channel(context, channel_name='Color', channel_type='COLOR', use_alpha=True)
-                if self.add_layers:
-                    channel.create_layer(context, layer_name='Solid Color', layer_type='SOLID_COLOR')
-                    channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
+            # Create Channels and layers and setup the group
+            match self.template:
+                case 'BASIC':
+                    channel = new_group.create_channel(context, channel_name='Color', channel_type='COLOR', use_alpha=True)
+                    if self.add_layers:
+                        channel.create_layer(context, layer_name='Solid Color', layer_type='SOLID_COLOR')
+                        channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
                 
-                right_most_node = get_right_most_node(mat_node_tree)
-                node_group, mix_shader = create_basic_setup(mat_node_tree, node_tree, right_most_node.location + Vector((right_most_node.width + 50, 0)) if right_most_node else Vector((0, 0)))
-                mat_output = mat_node_tree.nodes.new(type='ShaderNodeOutputMaterial')
-                mat_output.location = mix_shader.location + Vector((200, 0))
-                mat_output.is_active_output = True
-                connect_sockets(mix_shader.outputs[0], mat_output.inputs[0])
-            case 'PBR':
-                material_output = get_material_output(mat_node_tree)
-                principled_node = find_node(mat_node_tree, {'bl_idname': 'ShaderNodeBsdfPrincipled'})
-                if principled_node is None:
-                    principled_node = mat_node_tree.nodes.new(type='ShaderNodeBsdfPrincipled')
-                    principled_node.location = material_output.location + Vector((-200, 0))
-                nodes = traverse_connected_nodes(principled_node)
-                for node in nodes:
-                    node.location = node.location + Vector((-200, 0))
-                node_group = mat_node_tree.nodes.new(type='ShaderNodeGroup')
-                node_group.node_tree = node_tree
-                node_group.location = principled_node.location + Vector((-200, 0))
-                # Check if principled_node is not connected to anything
-                if len(principled_node.outputs[0].links) == 0:
-                    connect_sockets(principled_node.outputs[0], material_output.inputs[0])
-                if self.pbr_add_color:
-                    new_group.create_channel_template(context, "COLOR", add_layers=self.add_layers)
-                if self.pbr_add_metallic:
-                    new_group.create_channel_template(context, "METALLIC", add_layers=self.add_layers)
-                if self.pbr_add_roughness:
-                    new_group.create_channel_template(context, "ROUGHNESS", add_layers=self.add_layers)
-                if self.pbr_add_normal:
-                    new_group.create_channel_template(context, "NORMAL", add_layers=self.add_layers)
-                ps_ctx = self.parse_context(context)
-                ps_ctx.active_group.active_index = 0
+                    right_most_node = get_right_most_node(mat_node_tree)
+                    node_group, mix_shader = create_basic_setup(mat_node_tree, node_tree, right_most_node.location + Vector((right_most_node.width + 50, 0)) if right_most_node else Vector((0, 0)))
+                    mat_output = mat_node_tree.nodes.new(type='ShaderNodeOutputMaterial')
+                    mat_output.location = mix_shader.location + Vector((200, 0))
+                    mat_output.is_active_output = True
+                    connect_sockets(mix_shader.outputs[0], mat_output.inputs[0])
+                case 'PBR':
+                    material_output = get_material_output(mat_node_tree)
+                    principled_node = find_node(mat_node_tree, {'bl_idname': 'ShaderNodeBsdfPrincipled'})
+                    if principled_node is None:
+                        principled_node = mat_node_tree.nodes.new(type='ShaderNodeBsdfPrincipled')
+                        principled_node.location = material_output.location + Vector((-200, 0))
+                    nodes = traverse_connected_nodes(principled_node)
+                    for node in nodes:
+                        node.location = node.location + Vector((-200, 0))
+                    node_group = mat_node_tree.nodes.new(type='ShaderNodeGroup')
+                    node_group.node_tree = node_tree
+                    node_group.location = principled_node.location + Vector((-200, 0))
+                    # Check if principled_node is not connected to anything
+                    if len(principled_node.outputs[0].links) == 0:
+                        connect_sockets(principled_node.outputs[0], material_output.inputs[0])
+                    if self.pbr_add_color:
+                        new_group.create_channel_template(context, "COLOR", add_layers=self.add_layers)
+                    if self.pbr_add_metallic:
+                        new_group.create_channel_template(context, "METALLIC", add_layers=self.add_layers)
+                    if self.pbr_add_roughness:
+                        new_group.create_channel_template(context, "ROUGHNESS", add_layers=self.add_layers)
+                    if self.pbr_add_normal:
+                        new_group.create_channel_template(context, "NORMAL", add_layers=self.add_layers)
+                    ps_ctx = self.parse_context(context)
+                    ps_ctx.active_group.active_index = 0
 
-            case 'PAINT_OVER':
-                # Check if Engine is EEVEE
-                if 'EEVEE' not in bpy.context.scene.render.engine:
-                    self.report({'ERROR'}, "Paint Over is only supported in EEVEE")
-                    return {'CANCELLED'}
+                case 'PAINT_OVER':
+                    # Check if Engine is EEVEE
+                    if 'EEVEE' not in bpy.context.scene.render.engine:
+                        self.report({'ERROR'}, "Paint Over is only supported in EEVEE")
+                        return {'CANCELLED'}
                 
-                channel = new_group.create_channel(context, channel_name='Color', channel_type='COLOR', use_alpha=True)
-                if self.add_layers:
-                    channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
+                    channel = new_group.create_channel(context, channel_name='Color', channel_type='COLOR', use_alpha=True)
+                    if self.add_layers:
+                        channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
                 
-                mat_output = get_material_output(mat_node_tree)
+                    mat_output = get_material_output(mat_node_tree)
                 
-                node_links = mat_output.inputs[0].links
-                if len(node_links) > 0:
-                    link = node_links[0]
-                    from_node = link.from_node
-                    socket_type = find_base_socket_type(link.from_socket)
-                    if socket_type == 'NodeSocketShader':
-                        node_group, mix_shader = create_basic_setup(mat_node_tree, node_tree, from_node.location + Vector((from_node.width + 250, 0)))
-                        shader_to_rgb = mat_node_tree.nodes.new(type='ShaderNodeShaderToRGB')
-                        shader_to_rgb.location = from_node.location + Vector((from_node.width + 50, 0))
-                        connect_sockets(shader_to_rgb.inputs[0], link.from_socket)
-                        connect_sockets(node_group.inputs['Color'], shader_to_rgb.outputs[0])
-                        # connect_sockets(node_group.inputs['Color Alpha'], shader_to_rgb.outputs[1])
-                    else:
-                        node_group, mix_shader = create_basic_setup(mat_node_tree, node_tree, from_node.location + Vector((from_node.width + 50, 0)))
-                        connect_sockets(node_group.inputs['Color'], link.from_socket)
-                    node_group.inputs['Color Alpha'].default_value = 1.0
-                    mat_output.location = mix_shader.location + Vector((200, 0))
-                    mat_output.is_active_output = True
-                    connect_sockets(mix_shader.outputs[0], mat_output.inputs[0])
+                    node_links = mat_output.inputs[0].links
+                    if len(node_links) > 0:
+                        link = node_links[0]
+                        from_node = link.from_node
+                        socket_type = find_base_socket_type(link.from_socket)
+                        if socket_type == 'NodeSocketShader':
+                            node_group, mix_shader = create_basic_setup(mat_node_tree, node_tree, from_node.location + Vector((from_node.width + 250, 0)))
+                            shader_to_rgb = mat_node_tree.nodes.new(type='ShaderNodeShaderToRGB')
+                            shader_to_rgb.location = from_node.location + Vector((from_node.width + 50, 0))
+                            connect_sockets(shader_to_rgb.inputs[0], link.from_socket)
+                            connect_sockets(node_group.inputs['Color'], shader_to_rgb.outputs[0])
+                            # connect_sockets(node_group.inputs['Color Alpha'], shader_to_rgb.outputs[1])
+                        else:
+                            node_group, mix_shader = create_basic_setup(mat_node_tree, node_tree, from_node.location + Vector((from_node.width + 50, 0)))
+                            connect_sockets(node_group.inputs['Color'], link.from_socket)
+                        node_group.inputs['Color Alpha'].default_value = 1.0
+                        mat_output.location = mix_shader.location + Vector((200, 0))
+                        mat_output.is_active_output = True
+                        connect_sockets(mix_shader.outputs[0], mat_output.inputs[0])
                         
-            case 'NORMAL':
-                right_most_node = get_right_most_node(mat_node_tree)
-                node_group = mat_node_tree.nodes.new(type='ShaderNodeGroup')
-                node_group.node_tree = node_tree
-                node_group.location = right_most_node.location + Vector((200, 0))
-                diffuse_node = mat_node_tree.nodes.new(type='ShaderNodeBsdfDiffuse')
-                diffuse_node.location = node_group.location + Vector((200, 0))
-                mat_output = mat_node_tree.nodes.new(type='ShaderNodeOutputMaterial')
-                mat_output.location = diffuse_node.location + Vector((200, 0))
-                mat_output.is_active_output = True
-                connect_sockets(diffuse_node.outputs[0], mat_output.inputs[0])
-                new_group.create_channel_template(context, "NORMAL", add_layers=self.add_layers)
-            case _:
-                channel = new_group.create_channel(context, channel_name='Color', channel_type='COLOR', use_alpha=True)
-                if self.add_layers:
-                    channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
-                right_most_node = get_right_most_node(mat_node_tree)
-                node_group = mat_node_tree.nodes.new(type='ShaderNodeGroup')
-                node_group.node_tree = node_tree
-                node_group.location = right_most_node.location + Vector((200, 0))
+                case 'NORMAL':
+                    right_most_node = get_right_most_node(mat_node_tree)
+                    node_group = mat_node_tree.nodes.new(type='ShaderNodeGroup')
+                    node_group.node_tree = node_tree
+                    node_group.location = right_most_node.location + Vector((200, 0))
+                    diffuse_node = mat_node_tree.nodes.new(type='ShaderNodeBsdfDiffuse')
+                    diffuse_node.location = node_group.location + Vector((200, 0))
+                    mat_output = mat_node_tree.nodes.new(type='ShaderNodeOutputMaterial')
+                    mat_output.location = diffuse_node.location + Vector((200, 0))
+                    mat_output.is_active_output = True
+                    connect_sockets(diffuse_node.outputs[0], mat_output.inputs[0])
+                    new_group.create_channel_template(context, "NORMAL", add_layers=self.add_layers)
+                case _:
+                    channel = new_group.create_channel(context, channel_name='Color', channel_type='COLOR', use_alpha=True)
+                    if self.add_layers:
+                        channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
+                    right_most_node = get_right_most_node(mat_node_tree)
+                    node_group = mat_node_tree.nodes.new(type='ShaderNodeGroup')
+                    node_group.node_tree = node_tree
+                    node_group.location = right_most_node.location + Vector((200, 0))
         redraw_panel(context)
         return {'FINISHED'}
     
@@ -0,0 +1,123 @@
+"""Process-wide cache of brush masks for the brush painter.
+
+Decoded brush textures are keyed by the hash of their file content, resized and
+rotated masks by the key of their source mask, their size and rotation bin. The
+cache outlives painter instances, so running the brush painter again with other
+settings skips decoding and rotating the brushes it already used. The least
+recently used masks are dropped once the cache holds more than ``max_bytes``.
+Decoded textures can also be kept on disk, see ``set_cache_dir``.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from ...utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class BrushCache:
+    """LRU cache of read-only float32 masks with a memory budget."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.cache_dir: Optional[str] = None
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        """Number of bytes held in memory."""
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_path(self, key: Hashable) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode()).hexdigest() + ".npy")
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        mask = self._entries.get(key)
+        if mask is not None:
+            self._entries.move_to_end(key)
+            return mask
+        path = self._get_path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            mask = np.load(path, allow_pickle=False)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read cached brush {path}: {e}")
+            return None
+        return self.put(key, mask)
+
+    def put(self, key: Hashable, mask: np.ndarray, persistent: bool = False) -> np.ndarray:
+        """Store mask under key and return the cached, read-only array.
+
+        With persistent, the mask is also written to the cache directory if one is set.
+        """
+        mask = np.ascontiguousarray(mask, dtype=np.float32)
+        mask.flags.writeable = False
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= previous.nbytes
+        self._entries[key] = mask
+        self._size += mask.nbytes
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.nbytes
+
+        path = self._get_path(key) if persistent else None
+        if path is not None and not os.path.exists(path):
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                np.save(path, mask, allow_pickle=False)
+            except OSError as e:
+                logger.warning(f"Could not write cached brush {path}: {e}")
+        return mask
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+
+brush_cache = BrushCache()
+
+# Path -> (modification time, size) and the hash of the file content
+_file_hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def set_cache_dir(cache_dir: Optional[str]):
+    """Keep decoded brush textures in cache_dir across sessions, None keeps them in memory only."""
+    brush_cache.cache_dir = cache_dir
+
+
+def get_file_hash(path: str) -> str:
+    """Return the SHA-1 of the file content, only read again when the file changed."""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_hashes.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    digest = hashlib.sha1()
+    with open(path, "rb") as brush_file:
+        for chunk in iter(lambda: brush_file.read(1 << 20), b""):
+            digest.update(chunk)
+    _file_hashes[path] = (signature, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def get_array_hash(mask: np.ndarray) -> str:
+    """Return the SHA-1 of the shape and float32 values of a mask."""
+    mask = np.ascontiguousarray(mask, dtype=np.float32)
+    digest = hashlib.sha1(repr(mask.shape).encode())
+    digest.update(mask.data)
+    return digest.hexdigest()
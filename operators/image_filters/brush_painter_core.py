@@ -3,10 +3,12 @@ import bmesh
 import numpy as np
 import os
 import glob
-from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Tuple, Optional
 from ..common import blender_image_to_numpy
-from ...paintsystem.image import set_image_pixels, ImageTiles
+from .brush_cache import brush_cache, get_array_hash, get_file_hash
+from ...paintsystem.image import get_changed_tile_numbers, set_image_pixels, ImageTiles
 from ...utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -44,20 +46,28 @@ class UVSeamEdge:
     counterpart_index: int = -1
 
 
+@dataclass
+class SeamEdgeGrid:
+    """Uniform grid over a tile, listing the seam edges whose bounding box overlaps each cell."""
+    cell_size: int
+    cells: Dict[Tuple[int, int], List[int]]
+
+
 @dataclass
 class UVSeamIndex:
     edges: List[UVSeamEdge]
     tile_to_edges: Dict[int, List[int]]
+    tile_grids: Dict[int, SeamEdgeGrid] = field(default_factory=dict)
 
 
 @dataclass
 class TilePaintState:
     tile_num: int
-    img_float: np.ndarray
     img_blurred: np.ndarray
     g_normalized: np.ndarray
     theta: np.ndarray
     has_alpha: bool
+    # The image region of the extended canvas, (height, width, 4)
     canvas: np.ndarray
     extended_h: int
     extended_w: int
@@ -68,6 +78,34 @@ class TilePaintState:
     min_size_px: int
     max_size_px: int
 
+
+@dataclass
+class PlannedBlend:
+    """A brush stamp clipped to a tile canvas, ready to be blended."""
+    state: TilePaintState
+    rotated_brush: np.ndarray
+    color: np.ndarray
+    alpha: np.float32
+    opacity: np.float32
+    canvas_y0: int
+    canvas_x0: int
+    canvas_y1: int
+    canvas_x1: int
+    brush_y0: int
+    brush_x0: int
+
+
+# Size in canvas pixels of the cells used to find overlapping stamps
+BLEND_CELL_SIZE = 16
+# Maximum number of brush pixels blended by a single vectorised batch, small enough to stay in cache
+MAX_BATCH_PIXELS = 1 << 16
+# Stamps larger than this are blended on their own, the per-stamp overhead is negligible for them
+MAX_BATCHED_STAMP_PIXELS = 512
+_PIXEL_DTYPE = np.dtype((np.void, 16))
+# Number of seam grid cells along the longest side of a tile
+SEAM_GRID_RESOLUTION = 64
+
+
 class BrushPainterCore:
     """Core functionality for applying brush strokes to Blender images."""
     
@@ -91,8 +129,28 @@ class BrushPainterCore:
         self.random_seed = 42
         self.rotation_bins = 180
         self._rotation_cache = {}
+        # id of the brush masks used in this run -> their brush_cache key, and the mask to keep its id valid
+        self._brush_keys: Dict[int, Tuple[Hashable, np.ndarray]] = {}
         self.enable_seam_duplication = True
         self._seam_index: Optional[UVSeamIndex] = None
+        # Blend non-overlapping stamps together instead of one after the other
+        self.use_batched_stamping = True
+        self._pending_blends: Optional[List[PlannedBlend]] = None
+        # Paint UDIM tiles in this many background processes, see tile_workers
+        self.tile_worker_count = 0
+        # Stamps duplicated across UV seams onto another tile than the painted one, with
+        # their source tile. They are blended after all tiles, sorted by source tile, so
+        # the result is the same whether the tiles are painted here or in tile_workers
+        self._painted_tile_num: Optional[int] = None
+        self._cross_tile_blends: List[Tuple[int, PlannedBlend]] = []
+        # Tiles that differ from the source image after the last paint_image_tiles
+        self._changed_tile_nums: List[int] = []
+        # Shift the colors of all stamps of a step at once instead of one stamp at a time
+        self.use_vectorised_color_shift = True
+        # Read the UV seams from the mesh arrays instead of walking a bmesh
+        self.use_numpy_seam_extraction = True
+        # Paint a proxy downsampled by this factor, with the stroke layout of the full resolution
+        self.preview_factor = 1
         
         # Brush texture paths
         self.brush_texture_path = None
@@ -110,9 +168,18 @@ class BrushPainterCore:
         radius = kernel.size // 2
         pad_width = [(0, 0)] * array.ndim
         pad_width[axis] = (radius, radius)
-        padded = np.pad(array, pad_width, mode='edge')
-        windows = np.lib.stride_tricks.sliding_window_view(padded, kernel.size, axis=axis)
-        return np.tensordot(windows, kernel, axes=([-1], [0])).astype(np.float32, copy=False)
+        padded = np.pad(array.astype(np.float32, copy=False), pad_width, mode='edge')
+        # Accumulate shifted copies instead of building a window view, which would
+        # copy the array once per kernel tap
+        length = array.shape[axis]
+        window = [slice(None)] * array.ndim
+        result = np.zeros(array.shape, dtype=np.float32)
+        weighted = np.empty(array.shape, dtype=np.float32)
+        for offset, weight in enumerate(kernel):
+            window[axis] = slice(offset, offset + length)
+            np.multiply(padded[tuple(window)], weight, out=weighted)
+            result += weighted
+        return result
 
     def _gaussian_blur_array(self, array: np.ndarray, sigma: float) -> np.ndarray:
         if sigma <= 0:
@@ -232,6 +299,17 @@ class BrushPainterCore:
         normalized = angle_deg % 360.0
         return int(round((normalized / 360.0) * self.rotation_bins)) % self.rotation_bins
 
+    def _get_brush_key(self, brush: np.ndarray) -> Hashable:
+        """Returns the brush_cache key of a mask, hashing its content the first time it is seen."""
+        entry = self._brush_keys.get(id(brush))
+        if entry is None:
+            entry = (("mask", get_array_hash(brush)), brush)
+            self._brush_keys[id(brush)] = entry
+        return entry[0]
+
+    def _register_brush(self, brush: np.ndarray, key: Hashable):
+        self._brush_keys[id(brush)] = (key, brush)
+
     def _get_rotated_brush_cached(self, brush: np.ndarray, angle_deg: float) -> np.ndarray:
         angle_bin = self._quantize_angle(angle_deg)
         cache_key = (id(brush), angle_bin)
@@ -239,10 +317,21 @@ class BrushPainterCore:
         if cached is not None:
             return cached
 
-        quantized_angle = (angle_bin / self.rotation_bins) * 360.0
-        rotated = self._rotate_mask_bilinear(brush, quantized_angle)
+        shared_key = (self._get_brush_key(brush), "rotated", self.rotation_bins, angle_bin)
+        rotated = brush_cache.get(shared_key)
+        if rotated is None:
+            quantized_angle = (angle_bin / self.rotation_bins) * 360.0
+            rotated = brush_cache.put(shared_key, self._rotate_mask_bilinear(brush, quantized_angle))
         self._rotation_cache[cache_key] = rotated
         return rotated
+
+    def _get_resized_brush(self, brush: np.ndarray, size: int) -> np.ndarray:
+        cache_key = (self._get_brush_key(brush), "resized", size)
+        resized = brush_cache.get(cache_key)
+        if resized is None:
+            resized = brush_cache.put(cache_key, self._resize_mask_bilinear(brush.astype(np.float32, copy=False), size, size))
+        self._register_brush(resized, cache_key)
+        return resized
     
     def create_circular_brush(self, size):
         """Creates a soft circular brush mask as a NumPy array."""
@@ -259,6 +348,12 @@ class BrushPainterCore:
             if not os.path.exists(path):
                 return self.create_circular_brush(50)
 
+            cache_key = ("texture", get_file_hash(path))
+            cached = brush_cache.get(cache_key)
+            if cached is not None:
+                self._register_brush(cached, cache_key)
+                return cached
+
             brush_img = self._load_image_path_to_numpy(path)
 
             if brush_img.ndim == 3 and brush_img.shape[2] >= 4:
@@ -277,6 +372,8 @@ class BrushPainterCore:
                 square_brush[offset_y:offset_y + original_h, offset_x:offset_x + original_w] = brush_mask
                 brush_mask = square_brush
                 
+            brush_mask = brush_cache.put(cache_key, brush_mask, persistent=True)
+            self._register_brush(brush_mask, cache_key)
             return brush_mask
             
         except Exception as e:
@@ -318,27 +415,27 @@ class BrushPainterCore:
         size = max(1, int(size))
         resized_brush_list = []
         for brush in brush_list:
-            resized_array = self._resize_mask_bilinear(brush.astype(np.float32, copy=False), size, size)
-            resized_brush_list.append(resized_array)
+            resized_brush_list.append(self._get_resized_brush(brush, size))
         return resized_brush_list
     
     def calculate_gaussian_blur(self, img_float):
         """Calculates Gaussian blur for the image using numpy."""
         if self.gaussian_sigma <= 0:
             return img_float.astype(np.float32, copy=True)
+        sigma = float(self.gaussian_sigma) / self.preview_factor
 
         image = np.clip(img_float, 0.0, 1.0).astype(np.float32, copy=False)
         if image.ndim == 3 and image.shape[2] == 4:
             alpha = image[..., 3:4]
             premult_rgb = image[..., :3] * alpha
             premult_rgba = np.concatenate((premult_rgb, alpha), axis=2)
-            blurred = self._gaussian_blur_array(premult_rgba, float(self.gaussian_sigma))
+            blurred = self._gaussian_blur_array(premult_rgba, sigma)
             out_alpha = blurred[..., 3:4]
             safe_alpha = np.where(out_alpha > 1e-6, out_alpha, 1.0)
             out_rgb = np.where(out_alpha > 1e-6, blurred[..., :3] / safe_alpha, 0.0)
             return np.clip(np.concatenate((out_rgb, out_alpha), axis=2), 0.0, 1.0).astype(np.float32, copy=False)
 
-        return self._gaussian_blur_array(image, float(self.gaussian_sigma))
+        return self._gaussian_blur_array(image, sigma)
     
     def calculate_sobel_filter(self, img_float):
         """Calculates Sobel filter for the image using numpy."""
@@ -359,7 +456,7 @@ class BrushPainterCore:
     def calculate_gradients(self, img_float):
         """Calculates gradient magnitude and orientation for brush stroke direction."""
         gray = self._rgb_to_gray(np.clip(img_float, 0.0, 1.0).astype(np.float32, copy=False))
-        img_smoothed = self._gaussian_blur_array(gray, float(self.gaussian_sigma))
+        img_smoothed = self._gaussian_blur_array(gray, float(self.gaussian_sigma) / self.preview_factor)
 
         Gx, Gy = self.calculate_sobel_filter(img_smoothed)
         G = np.hypot(Gx, Gy)
@@ -391,8 +488,12 @@ class BrushPainterCore:
         
         return num_samples
     
-    def create_extended_canvas(self, img_float, H, W, overlay_on_input=True):
-        """Creates an extended canvas to prevent rotation clipping."""
+    def get_extended_canvas_geometry(self, H, W):
+        """Returns the size of the extended canvas that rotated stamps may reach and the image offset in it.
+
+        Only the image region of the canvas is stored, stamps are clipped to it. The
+        extended bounds still decide whether a stamp (and its seam duplicate) is placed.
+        """
         sqrt2 = np.sqrt(2) * 2
         extended_H = int(H * sqrt2)
         extended_W = int(W * sqrt2)
@@ -400,13 +501,7 @@ class BrushPainterCore:
         offset_y = (extended_H - H) // 2
         offset_x = (extended_W - W) // 2
         
-        if overlay_on_input:
-            canvas = np.zeros((extended_H, extended_W, 4), dtype=np.float32)
-            canvas[offset_y:offset_y + H, offset_x:offset_x + W] = img_float
-        else:
-            canvas = np.zeros((extended_H, extended_W, 4), dtype=np.float32)
-        
-        return canvas, extended_H, extended_W, offset_y, offset_x
+        return extended_H, extended_W, offset_y, offset_x
     
     def apply_color_shift(self, pixel):
         """Applies randomized HSV color shifts to a pixel based on shift parameters."""
@@ -485,6 +580,61 @@ class BrushPainterCore:
         else:
             return np.array([r_final, g_final, b_final])
 
+    def apply_color_shift_array(self, pixels: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Applies randomized HSV color shifts to an (N, C) array of pixels, see apply_color_shift.
+
+        The conversion follows apply_color_shift operation by operation, so a pixel shifted by
+        the same random offsets gets the same color. The offsets are drawn from rng.
+        """
+        if pixels.shape[-1] < 3 or len(pixels) == 0:
+            return pixels
+
+        r = pixels[:, 0]
+        g = pixels[:, 1]
+        b = pixels[:, 2]
+        max_val = np.maximum(np.maximum(r, g), b)
+        min_val = np.minimum(np.minimum(r, g), b)
+        delta = max_val - min_val
+
+        # Calculate Hue, checking the channels in the same order as apply_color_shift
+        with np.errstate(divide='ignore', invalid='ignore'):
+            h = np.select(
+                [delta == 0, max_val == r, max_val == g],
+                [
+                    np.zeros_like(delta),
+                    60 * ((g - b) / delta) % 360,
+                    60 * (2 + (b - r) / delta) % 360,
+                ],
+                60 * (4 + (r - g) / delta) % 360,
+            )
+            s = np.where(max_val == 0, np.zeros_like(delta), delta / max_val)
+        v = max_val
+
+        if self.hue_shift > 0:
+            hue_range = self.hue_shift * 360
+            h = (h + rng.uniform(-hue_range/2, hue_range/2, len(pixels))) % 360
+        if self.saturation_shift > 0:
+            s_range = self.saturation_shift
+            s = np.clip(s + rng.uniform(-s_range/2, s_range/2, len(pixels)), 0, 1)
+        if self.value_shift > 0:
+            v_range = self.value_shift
+            v = np.clip(v + rng.uniform(-v_range/2, v_range/2, len(pixels)), 0, 1)
+
+        # Convert back to RGB
+        c = v * s
+        x = c * (1 - abs((h / 60) % 2 - 1))
+        m = v - c
+        zero = np.zeros_like(c)
+        sectors = [(0 <= h) & (h < 60), h < 120, h < 180, h < 240, h < 300]
+        r_new = np.select(sectors, [c, x, zero, zero, x], c)
+        g_new = np.select(sectors, [x, c, c, x, zero], zero)
+        b_new = np.select(sectors, [zero, zero, x, c, c], x)
+
+        channels = [np.clip(r_new + m, 0, 1), np.clip(g_new + m, 0, 1), np.clip(b_new + m, 0, 1)]
+        if pixels.shape[-1] == 4:
+            channels.append(pixels[:, 3])
+        return np.stack(channels, axis=-1)
+
     def _tile_from_uv_int(self, tile_u: int, tile_v: int) -> int:
         return 1001 + tile_u + tile_v * 10
 
@@ -629,7 +779,7 @@ class BrushPainterCore:
         end_x = start_x + brush_w
         return start_y < state.extended_h and end_y > 0 and start_x < state.extended_w and end_x > 0
 
-    def _blend_rotated_brush(
+    def _plan_blend(
         self,
         state: TilePaintState,
         center_y: float,
@@ -638,13 +788,13 @@ class BrushPainterCore:
         sampled_alpha: float,
         opacity: float,
         rotated_brush: np.ndarray,
-    ) -> bool:
+    ) -> Optional[PlannedBlend]:
         if rotated_brush.size == 0 or float(np.max(rotated_brush)) <= 1e-6:
             if DEBUG_CANCEL:
                 logger.debug(f"[CANCEL] _blend_rotated_brush: brush is empty or zero "
                       f"(size={rotated_brush.size}, max={float(np.max(rotated_brush)) if rotated_brush.size > 0 else 0:.6f}) "
                       f"at center=({center_x:.1f},{center_y:.1f}) tile={state.tile_num}")
-            return False
+            return None
 
         brush_h, brush_w = rotated_brush.shape
         canvas_y = int(round(center_y)) + state.offset_y
@@ -654,55 +804,218 @@ class BrushPainterCore:
         end_y = start_y + brush_h
         end_x = start_x + brush_w
 
-        # Clip to canvas bounds — allow partial overlaps, cancel only if entirely outside
-        clip_y0 = max(0, start_y)
-        clip_x0 = max(0, start_x)
-        clip_y1 = min(state.extended_h, end_y)
-        clip_x1 = min(state.extended_w, end_x)
-
-        if clip_y0 >= clip_y1 or clip_x0 >= clip_x1:
+        # Cancel stamps entirely outside the extended canvas, allow partial overlaps
+        if start_y >= state.extended_h or end_y <= 0 or start_x >= state.extended_w or end_x <= 0:
             if DEBUG_CANCEL:
                 logger.debug(f"[CANCEL] _blend_rotated_brush: entirely outside canvas "
                       f"at center=({center_x:.1f},{center_y:.1f}) tile={state.tile_num} "
                       f"brush=({brush_w}x{brush_h}) "
                       f"brush_region=[{start_x}:{end_x}, {start_y}:{end_y}] "
                       f"canvas_size=({state.extended_w}x{state.extended_h})")
-            return False
+            return None
+
+        # Only the image region is kept, the rest of the extended canvas would be cropped away
+        clip_y0 = max(state.offset_y, start_y)
+        clip_x0 = max(state.offset_x, start_x)
+        clip_y1 = min(state.offset_y + state.height, end_y)
+        clip_x1 = min(state.offset_x + state.width, end_x)
+        if clip_y0 >= clip_y1 or clip_x0 >= clip_x1:
+            return None
+
+        return PlannedBlend(
+            state=state,
+            rotated_brush=rotated_brush,
+            color=np.asarray(sampled_pixel[:3], dtype=np.float32),
+            alpha=np.float32(sampled_alpha),
+            opacity=np.float32(opacity),
+            canvas_y0=clip_y0 - state.offset_y,
+            canvas_x0=clip_x0 - state.offset_x,
+            canvas_y1=clip_y1 - state.offset_y,
+            canvas_x1=clip_x1 - state.offset_x,
+            # Corresponding offset into the brush array
+            brush_y0=clip_y0 - start_y,
+            brush_x0=clip_x0 - start_x,
+        )
 
-        # Corresponding slice into the brush array
-        brush_y0 = clip_y0 - start_y
-        brush_x0 = clip_x0 - start_x
-        clip_h = clip_y1 - clip_y0
-        clip_w = clip_x1 - clip_x0
-        brush_y1 = brush_y0 + clip_h
-        brush_x1 = brush_x0 + clip_w
-
-        canvas_region = state.canvas[clip_y0:clip_y1, clip_x0:clip_x1]
-        brush_slice = rotated_brush[brush_y0:brush_y1, brush_x0:brush_x1]
-        brush_color_layer = np.tile(sampled_pixel[:3], (clip_h, clip_w, 1))
-        final_alpha = brush_slice * sampled_alpha * opacity
+    def _blend_planned(self, blend: PlannedBlend):
+        """Blend a single stamp into its canvas, in float32 like _blend_planned_batch."""
+        clip_h = blend.canvas_y1 - blend.canvas_y0
+        clip_w = blend.canvas_x1 - blend.canvas_x0
+        canvas_region = blend.state.canvas[blend.canvas_y0:blend.canvas_y1, blend.canvas_x0:blend.canvas_x1]
+        brush_slice = blend.rotated_brush[blend.brush_y0:blend.brush_y0 + clip_h, blend.brush_x0:blend.brush_x0 + clip_w]
+        final_alpha = brush_slice * blend.alpha * blend.opacity
         final_alpha_3d = final_alpha[..., np.newaxis]
 
         canvas_rgb = canvas_region[:, :, :3]
         canvas_alpha = canvas_region[:, :, 3:4]
 
         out_alpha = final_alpha_3d + canvas_alpha * (1.0 - final_alpha_3d)
-        numerator = brush_color_layer * final_alpha_3d + canvas_rgb * canvas_alpha * (1.0 - final_alpha_3d)
+        numerator = blend.color * final_alpha_3d + canvas_rgb * canvas_alpha * (1.0 - final_alpha_3d)
 
         safe_alpha = np.copy(out_alpha)
         safe_alpha[safe_alpha < 0.0001] = 1.0
 
         canvas_region[:, :, :3] = numerator / safe_alpha
         canvas_region[:, :, 3:4] = out_alpha
+
+    def _blend_planned_batch(self, blends: List[PlannedBlend]):
+        """Blend non-overlapping stamps of the same canvas with a single gather and scatter.
+
+        Every pixel goes through the same float32 operations as in _blend_planned, so the
+        result is bit-identical to blending the stamps one after the other.
+        """
+        # One 16 byte element per RGBA pixel, so gathering and scattering move whole pixels
+        canvas_pixels = blends[0].state.canvas.reshape(-1).view(_PIXEL_DTYPE)
+        canvas_w = blends[0].state.width
+        brush_slices = [
+            blend.rotated_brush[
+                blend.brush_y0:blend.brush_y0 + blend.canvas_y1 - blend.canvas_y0,
+                blend.brush_x0:blend.brush_x0 + blend.canvas_x1 - blend.canvas_x0,
+            ]
+            for blend in blends
+        ]
+        sizes = np.array([brush_slice.size for brush_slice in brush_slices], dtype=np.intp)
+        brush_values = np.concatenate([brush_slice.ravel() for brush_slice in brush_slices])
+        # Canvas index of every brush pixel, row by row within each stamp
+        index = np.concatenate([
+            (np.arange(blend.canvas_y0, blend.canvas_y1)[:, None] * canvas_w + np.arange(blend.canvas_x0, blend.canvas_x1)).ravel()
+            for blend in blends
+        ])
+
+        alphas = np.repeat(np.array([blend.alpha for blend in blends], dtype=np.float32), sizes)
+        opacities = np.repeat(np.array([blend.opacity for blend in blends], dtype=np.float32), sizes)
+        colors = np.repeat(np.stack([blend.color for blend in blends]), sizes, axis=0)
+
+        canvas_region = canvas_pixels.take(index).view(np.float32).reshape(-1, 4)
+        final_alpha = brush_values * alphas * opacities
+        final_alpha_3d = final_alpha[..., np.newaxis]
+
+        canvas_rgb = canvas_region[..., :3]
+        canvas_alpha = canvas_region[..., 3:4]
+
+        out_alpha = final_alpha_3d + canvas_alpha * (1.0 - final_alpha_3d)
+        numerator = colors * final_alpha_3d + canvas_rgb * canvas_alpha * (1.0 - final_alpha_3d)
+
+        safe_alpha = np.copy(out_alpha)
+        safe_alpha[safe_alpha < 0.0001] = 1.0
+
+        canvas_region[..., :3] = numerator / safe_alpha
+        canvas_region[..., 3:4] = out_alpha
+        canvas_pixels.put(index, canvas_region.reshape(-1).view(_PIXEL_DTYPE))
+
+    def _blend_rotated_brush(
+        self,
+        state: TilePaintState,
+        center_y: float,
+        center_x: float,
+        sampled_pixel: np.ndarray,
+        sampled_alpha: float,
+        opacity: float,
+        rotated_brush: np.ndarray,
+    ) -> bool:
+        blend = self._plan_blend(state, center_y, center_x, sampled_pixel, sampled_alpha, opacity, rotated_brush)
+        if blend is None:
+            return False
+        if self._painted_tile_num is not None and state.tile_num != self._painted_tile_num:
+            self._cross_tile_blends.append((self._painted_tile_num, blend))
+        elif self._pending_blends is not None:
+            self._pending_blends.append(blend)
+        else:
+            self._blend_planned(blend)
         return True
 
+    def _assign_blend_levels(self, blends: List[PlannedBlend]) -> List[int]:
+        """Give every stamp a level above the levels of the earlier stamps it overlaps.
+
+        Stamps of the same level never overlap, so blending the levels in order gives the
+        same result as blending the stamps in order. Overlaps are tested on a grid of
+        BLEND_CELL_SIZE cells, which may separate stamps that only share a cell.
+        """
+        level_grids: Dict[int, np.ndarray] = {}
+        levels = []
+        for blend in blends:
+            state = blend.state
+            grid = level_grids.get(state.tile_num)
+            if grid is None:
+                grid = np.full((
+                    -(-state.height // BLEND_CELL_SIZE),
+                    -(-state.width // BLEND_CELL_SIZE),
+                ), -1, dtype=np.int32)
+                level_grids[state.tile_num] = grid
+            cells = grid[
+                blend.canvas_y0 // BLEND_CELL_SIZE:(blend.canvas_y1 - 1) // BLEND_CELL_SIZE + 1,
+                blend.canvas_x0 // BLEND_CELL_SIZE:(blend.canvas_x1 - 1) // BLEND_CELL_SIZE + 1,
+            ]
+            level = int(cells.max()) + 1
+            cells[...] = level
+            levels.append(level)
+        return levels
+
+    def _flush_pending_blends(self, total_strokes: int, brush_callback=None):
+        """Blend the stamps collected while use_batched_stamping is enabled."""
+        blends = self._pending_blends or []
+        self._pending_blends = None
+        if not blends:
+            return
+        start_time = time.time()
+        if not any(blend.rotated_brush.size <= MAX_BATCHED_STAMP_PIXELS for blend in blends):
+            for blend in blends:
+                self._blend_planned(blend)
+            if brush_callback:
+                brush_callback(total_strokes, total_strokes)
+            return
+        levels = self._assign_blend_levels(blends)
+        blends_by_level: Dict[int, List[PlannedBlend]] = {}
+        for blend, level in zip(blends, levels):
+            blends_by_level.setdefault(level, []).append(blend)
+
+        blended_count = 0
+        batch_count = 0
+        for level in sorted(blends_by_level):
+            batches: Dict[int, List[PlannedBlend]] = {}
+            for blend in blends_by_level[level]:
+                batches.setdefault(blend.state.tile_num, []).append(blend)
+            for batch in batches.values():
+                chunk = []
+                chunk_pixels = 0
+                for blend in batch:
+                    if blend.rotated_brush.size > MAX_BATCHED_STAMP_PIXELS:
+                        # Large stamps gain nothing from batching, slicing their region is cheaper
+                        self._blend_planned(blend)
+                        continue
+                    chunk.append(blend)
+                    chunk_pixels += blend.rotated_brush.size
+                    if chunk_pixels >= MAX_BATCH_PIXELS:
+                        self._blend_planned_batch(chunk)
+                        batch_count += 1
+                        chunk = []
+                        chunk_pixels = 0
+                if chunk:
+                    self._blend_planned_batch(chunk)
+                    batch_count += 1
+            blended_count += len(blends_by_level[level])
+            if brush_callback:
+                brush_callback(total_strokes, max(1, total_strokes * blended_count // len(blends)))
+        logger.debug(f"Blended {len(blends)} stamps in {len(blends_by_level)} levels and {batch_count} batches "
+                     f"in {(time.time() - start_time)*1000} milliseconds")
+
+    def _blend_cross_tile_blends(self, cross_tile_blends: List[Tuple[int, PlannedBlend]]):
+        """Blend the stamps duplicated onto other tiles, by source tile and then in stamp order."""
+        blends = [blend for _, blend in sorted(cross_tile_blends, key=lambda item: item[0])]
+        if self.use_batched_stamping:
+            self._pending_blends = blends
+            self._flush_pending_blends(0)
+        else:
+            for blend in blends:
+                self._blend_planned(blend)
+
     def _build_uv_seam_index(
         self,
         mesh_object: Optional[bpy.types.Object],
         uv_map_name: Optional[str],
         tile_shapes: Dict[int, Tuple[int, int]],
     ) -> Optional[UVSeamIndex]:
-        """Build seam index using bmesh for reliable manifold edge detection."""
+        """Build the seam index from the manifold edges whose two faces have different UVs."""
         if not mesh_object or mesh_object.type != 'MESH' or not uv_map_name:
             return None
 
@@ -710,6 +1023,68 @@ class BrushPainterCore:
         if not mesh:
             return None
 
+        if self.use_numpy_seam_extraction:
+            seam_edges = self._find_uv_seam_edges_numpy(mesh, uv_map_name, tile_shapes)
+        else:
+            seam_edges = self._find_uv_seam_edges_bmesh(mesh, uv_map_name, tile_shapes)
+        if seam_edges is None:
+            return None
+
+        if not seam_edges:
+            if DEBUG_SEAM:
+                logger.debug("[SEAM-BUILD] No valid seam edges found — seam duplication disabled")
+            return None
+
+        tile_to_edges: Dict[int, List[int]] = {}
+        for edge_index, seam_edge in enumerate(seam_edges):
+            tile_to_edges.setdefault(seam_edge.tile_num, []).append(edge_index)
+
+        # if DEBUG_SEAM:
+        #     matched = sum(1 for e in seam_edges if e.counterpart_index >= 0)
+        #     logger.debug(f"[SEAM] Built {len(seam_edges)} seam edges ({len(seam_edges)//2} pairs), "
+        #           f"{matched}/{len(seam_edges)} matched")
+        #     for ei, se in enumerate(seam_edges):
+        #         cp = se.counterpart_index
+        #         cp_tile = seam_edges[cp].tile_num if cp >= 0 else None
+        #         logger.debug(f"  edge[{ei}] tile={se.tile_num} verts=({se.vert0},{se.vert1}) "
+        #               f"px0=({se.px0[0]:.1f},{se.px0[1]:.1f}) px1=({se.px1[0]:.1f},{se.px1[1]:.1f}) "
+        #               f"face_side={se.face_side} len_uv={se.length_uv:.4f} "
+        #               f"counterpart={cp}(tile={cp_tile})")
+        #     for tile_num, indices in tile_to_edges.items():
+        #         logger.debug(f"  tile {tile_num}: {len(indices)} seam edges")
+
+        tile_grids = {
+            tile_num: self._build_seam_edge_grid(seam_edges, edge_indices, tile_shapes[tile_num])
+            for tile_num, edge_indices in tile_to_edges.items()
+        }
+        return UVSeamIndex(edges=seam_edges, tile_to_edges=tile_to_edges, tile_grids=tile_grids)
+
+    def _build_seam_edge_grid(
+        self,
+        seam_edges: List[UVSeamEdge],
+        edge_indices: List[int],
+        tile_shape: Tuple[int, int],
+    ) -> SeamEdgeGrid:
+        cell_size = max(1, -(-max(tile_shape) // SEAM_GRID_RESOLUTION))
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for edge_index in edge_indices:
+            seam_edge = seam_edges[edge_index]
+            cell_x0 = int(np.floor(min(seam_edge.px0[0], seam_edge.px1[0]) / cell_size))
+            cell_x1 = int(np.floor(max(seam_edge.px0[0], seam_edge.px1[0]) / cell_size))
+            cell_y0 = int(np.floor(min(seam_edge.px0[1], seam_edge.px1[1]) / cell_size))
+            cell_y1 = int(np.floor(max(seam_edge.px0[1], seam_edge.px1[1]) / cell_size))
+            for cell_y in range(cell_y0, cell_y1 + 1):
+                for cell_x in range(cell_x0, cell_x1 + 1):
+                    cells.setdefault((cell_y, cell_x), []).append(edge_index)
+        return SeamEdgeGrid(cell_size=cell_size, cells=cells)
+
+    def _find_uv_seam_edges_bmesh(
+        self,
+        mesh: bpy.types.Mesh,
+        uv_map_name: str,
+        tile_shapes: Dict[int, Tuple[int, int]],
+    ) -> Optional[List[UVSeamEdge]]:
+        """Find the seam edges by walking the bmesh edges and loops, see _find_uv_seam_edges_numpy."""
         bm = bmesh.new()
         bm.from_mesh(mesh)
         bm.verts.ensure_lookup_table()
@@ -849,31 +1224,153 @@ class BrushPainterCore:
                 ))
 
         bm.free()
+        return seam_edges
 
-        if not seam_edges:
-            if DEBUG_SEAM:
-                logger.debug("[SEAM-BUILD] No valid seam edges found — seam duplication disabled")
+    def _find_uv_seam_edges_numpy(
+        self,
+        mesh: bpy.types.Mesh,
+        uv_map_name: str,
+        tile_shapes: Dict[int, Tuple[int, int]],
+    ) -> Optional[List[UVSeamEdge]]:
+        """Find the same seam edges as _find_uv_seam_edges_bmesh from the mesh attribute arrays.
+
+        The two faces of an edge are ordered like the bmesh link_faces, the face with the
+        higher index first, and the seam edges are created in edge order.
+        """
+        uv_layer = mesh.uv_layers.get(uv_map_name)
+        if uv_layer is None:
             return None
+        loop_count = len(mesh.loops)
+        edge_count = len(mesh.edges)
+        if loop_count == 0 or edge_count == 0:
+            return []
+
+        loop_verts = np.empty(loop_count, dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_verts)
+        loop_edges = np.empty(loop_count, dtype=np.int32)
+        mesh.loops.foreach_get("edge_index", loop_edges)
+        uvs = np.empty(loop_count * 2, dtype=np.float32)
+        uv_layer.uv.foreach_get("vector", uvs)
+        uvs = uvs.reshape((loop_count, 2)).astype(np.float64)
+        edge_verts = np.empty(edge_count * 2, dtype=np.int32)
+        mesh.edges.foreach_get("vertices", edge_verts)
+        edge_verts = edge_verts.reshape((edge_count, 2))
+        loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", loop_starts)
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        loop_faces = np.repeat(np.arange(len(loop_starts)), loop_totals)
+
+        # Only manifold edges (exactly 2 adjacent faces) can be seams
+        loop_order = np.argsort(loop_edges, kind='stable')
+        first_loops = np.searchsorted(loop_edges[loop_order], np.arange(edge_count))
+        edges = np.flatnonzero(np.bincount(loop_edges, minlength=edge_count) == 2)
+        if len(edges) == 0:
+            return []
+        v0 = edge_verts[edges, 0]
+        v1 = edge_verts[edges, 1]
+
+        def face_side_uvs(loops: np.ndarray):
+            """UVs of v0 and v1 and of the first other corner in the faces of loops."""
+            faces = loop_faces[loops]
+            starts = loop_starts[faces]
+            totals = loop_totals[faces]
+            positions = loops - starts
+            next_loops = starts + (positions + 1) % totals
+            starts_at_v0 = (loop_verts[loops] == v0)[:, np.newaxis]
+            uv_v0 = np.where(starts_at_v0, uvs[loops], uvs[next_loops])
+            uv_v1 = np.where(starts_at_v0, uvs[next_loops], uvs[loops])
+            third_positions = np.where(positions == 0, 2, np.where(positions == totals - 1, 1, 0))
+            has_third = totals >= 3
+            return uv_v0, uv_v1, uvs[starts + np.where(has_third, third_positions, 0)], has_third
+
+        sides = [
+            face_side_uvs(loop_order[first_loops[edges] + 1]),
+            face_side_uvs(loop_order[first_loops[edges]]),
+        ]
+        (uv_a_v0, uv_a_v1, _, _), (uv_b_v0, uv_b_v1, _, _) = sides
 
-        tile_to_edges: Dict[int, List[int]] = {}
-        for edge_index, seam_edge in enumerate(seam_edges):
-            tile_to_edges.setdefault(seam_edge.tile_num, []).append(edge_index)
+        # Skip non-seam edges (same UVs on both sides)
+        eps = 1e-5
+        is_seam = ~(
+            np.all(np.abs(uv_a_v0 - uv_b_v0) < eps, axis=1)
+            & np.all(np.abs(uv_a_v1 - uv_b_v1) < eps, axis=1)
+        )
 
-        # if DEBUG_SEAM:
-        #     matched = sum(1 for e in seam_edges if e.counterpart_index >= 0)
-        #     logger.debug(f"[SEAM] Built {len(seam_edges)} seam edges ({len(seam_edges)//2} pairs), "
-        #           f"{matched}/{len(seam_edges)} matched")
-        #     for ei, se in enumerate(seam_edges):
-        #         cp = se.counterpart_index
-        #         cp_tile = seam_edges[cp].tile_num if cp >= 0 else None
-        #         logger.debug(f"  edge[{ei}] tile={se.tile_num} verts=({se.vert0},{se.vert1}) "
-        #               f"px0=({se.px0[0]:.1f},{se.px0[1]:.1f}) px1=({se.px1[0]:.1f},{se.px1[1]:.1f}) "
-        #               f"face_side={se.face_side} len_uv={se.length_uv:.4f} "
-        #               f"counterpart={cp}(tile={cp_tile})")
-        #     for tile_num, indices in tile_to_edges.items():
-        #         logger.debug(f"  tile {tile_num}: {len(indices)} seam edges")
+        def to_tile_and_local(uv: np.ndarray):
+            # Same ceil-1 convention as _uv_to_tile_and_local
+            tile_uv = np.maximum(0, np.ceil(uv).astype(np.int64) - 1)
+            return 1001 + tile_uv[:, 0] + tile_uv[:, 1] * 10, uv - tile_uv
+
+        side_data = []
+        for uv0, uv1, third_uv, has_third in sides:
+            tile0, local0 = to_tile_and_local(uv0)
+            tile1, local1 = to_tile_and_local(uv1)
+            heights = np.ones(len(edges))
+            widths = np.ones(len(edges))
+            in_shapes = np.zeros(len(edges), dtype=bool)
+            for tile_num in np.unique(tile0).tolist():
+                tile_shape = tile_shapes.get(tile_num)
+                if tile_shape is not None:
+                    mask = tile0 == tile_num
+                    heights[mask], widths[mask] = tile_shape
+                    in_shapes |= mask
+            scale = np.stack([np.maximum(widths - 1, 1), np.maximum(heights - 1, 1)], axis=1)
+            px0 = np.stack([local0[:, 0], 1.0 - local0[:, 1]], axis=1) * scale
+            px1 = np.stack([local1[:, 0], 1.0 - local1[:, 1]], axis=1) * scale
+
+            # Face side via third vertex cross product
+            third_tile, third_local = to_tile_and_local(third_uv)
+            third_px = np.stack([third_local[:, 0], 1.0 - third_local[:, 1]], axis=1) * scale
+            cross = ((px1[:, 0] - px0[:, 0]) * (third_px[:, 1] - px0[:, 1])
+                     - (px1[:, 1] - px0[:, 1]) * (third_px[:, 0] - px0[:, 0]))
+            face_side = np.where(has_third & (third_tile == tile0), np.sign(cross), 0).astype(np.int64)
+
+            side_data.append({
+                'valid': (tile0 == tile1) & in_shapes,
+                'uv0': uv0,
+                'uv1': uv1,
+                'tile_num': tile0,
+                'px0': px0,
+                'px1': px1,
+                'face_side': face_side,
+                'length_uv': np.hypot(uv1[:, 0] - uv0[:, 0], uv1[:, 1] - uv0[:, 1]),
+            })
+
+        # Both sides must be valid to form a seam pair
+        pairs = np.flatnonzero(is_seam & side_data[0].pop('valid') & side_data[1].pop('valid'))
+        # Python values from here on, like the ones the bmesh path reads
+        side_data = [{key: values[pairs].tolist() for key, values in side.items()} for side in side_data]
+        pair_v0 = v0[pairs].tolist()
+        pair_v1 = v1[pairs].tolist()
 
-        return UVSeamIndex(edges=seam_edges, tile_to_edges=tile_to_edges)
+        seam_edges: List[UVSeamEdge] = []
+        for index in range(len(pairs)):
+            v0_idx = pair_v0[index]
+            v1_idx = pair_v1[index]
+            edge_key = (v0_idx, v1_idx) if v0_idx < v1_idx else (v1_idx, v0_idx)
+
+            # Create paired seam edges (counterparts point to each other)
+            idx_a = len(seam_edges)
+            idx_b = idx_a + 1
+            for side, counterpart_idx in [(side_data[0], idx_b), (side_data[1], idx_a)]:
+                uv0 = tuple(side['uv0'][index])
+                uv1 = tuple(side['uv1'][index])
+                seam_edges.append(UVSeamEdge(
+                    edge_key=edge_key,
+                    uv0=uv0,
+                    uv1=uv1,
+                    tile_num=side['tile_num'][index],
+                    px0=tuple(side['px0'][index]),
+                    px1=tuple(side['px1'][index]),
+                    midpoint_uv=((uv0[0] + uv1[0]) * 0.5, (uv0[1] + uv1[1]) * 0.5),
+                    length_uv=side['length_uv'][index],
+                    vert0=v0_idx,
+                    vert1=v1_idx,
+                    face_side=side['face_side'][index],
+                    counterpart_index=counterpart_idx,
+                ))
+        return seam_edges
 
     def _find_nearest_intersecting_edge(
         self,
@@ -899,6 +1396,20 @@ class BrushPainterCore:
             center_y + half_h,
         )
 
+        grid = self._seam_index.tile_grids.get(tile_num)
+        if grid is not None:
+            cell_x0 = int(np.floor(rect[0] / grid.cell_size))
+            cell_x1 = int(np.floor(rect[1] / grid.cell_size))
+            cell_y0 = int(np.floor(rect[2] / grid.cell_size))
+            cell_y1 = int(np.floor(rect[3] / grid.cell_size))
+            if (cell_x1 - cell_x0 + 1) * (cell_y1 - cell_y0 + 1) < len(grid.cells):
+                candidates = set()
+                for cell_y in range(cell_y0, cell_y1 + 1):
+                    for cell_x in range(cell_x0, cell_x1 + 1):
+                        candidates.update(grid.cells.get((cell_y, cell_x), ()))
+                # Same order as the full scan, so ties still go to the first edge
+                edge_indices = sorted(candidates)
+
         nearest_edge_index = -1
         nearest_dist_sq = float('inf')
         for edge_index in edge_indices:
@@ -934,6 +1445,7 @@ class BrushPainterCore:
         tile_array: np.ndarray,
         custom_tile_array: Optional[np.ndarray] = None,
     ) -> TilePaintState:
+        # Clipping copies the tile, so it is painted in place
         img_float = np.clip(tile_array, 0.0, 1.0).astype(np.float32, copy=False)
         height, width = img_float.shape[:2]
         has_alpha = img_float.shape[2] == 4 if img_float.ndim == 3 else False
@@ -946,12 +1458,30 @@ class BrushPainterCore:
         else:
             g_normalized, theta = self.calculate_gradients(img_float)
 
-        canvas, extended_h, extended_w, offset_y, offset_x = self.create_extended_canvas(
-            img_float,
-            height,
-            width,
-            overlay_on_input=True,
-        )
+        tile_state = self._prepare_tile_geometry(tile_num, height, width)
+        tile_state.img_blurred = img_blurred
+        tile_state.g_normalized = g_normalized
+        tile_state.theta = theta
+        tile_state.has_alpha = has_alpha
+        tile_state.canvas = img_float
+        return tile_state
+
+    def _prepare_tile_states(
+        self,
+        image_tiles: ImageTiles,
+        custom_image_tiles: Optional[ImageTiles] = None,
+    ) -> Dict[int, TilePaintState]:
+        tile_states = {}
+        for tile_num, tile_array in image_tiles.tiles.items():
+            custom_tile_array = None
+            if custom_image_tiles:
+                custom_tile_array = custom_image_tiles.tiles.get(tile_num)
+            tile_states[tile_num] = self._prepare_tile_state(tile_num, tile_array, custom_tile_array)
+        return tile_states
+
+    def _prepare_tile_geometry(self, tile_num: int, height: int, width: int) -> TilePaintState:
+        """Returns the state of a tile without its pixels, enough to place stamps on it."""
+        extended_h, extended_w, offset_y, offset_x = self.get_extended_canvas_geometry(height, width)
 
         base_dim = min(height, width)
         min_size_px = max(1, int(self.min_brush_scale * base_dim))
@@ -959,14 +1489,14 @@ class BrushPainterCore:
         if min_size_px > max_size_px:
             min_size_px, max_size_px = max_size_px, min_size_px
 
+        empty = np.empty((0, 0), dtype=np.float32)
         return TilePaintState(
             tile_num=tile_num,
-            img_float=img_float,
-            img_blurred=img_blurred,
-            g_normalized=g_normalized,
-            theta=theta,
-            has_alpha=has_alpha,
-            canvas=canvas,
+            img_blurred=empty,
+            g_normalized=empty,
+            theta=empty,
+            has_alpha=False,
+            canvas=np.empty((0, 0, 4), dtype=np.float32),
             extended_h=extended_h,
             extended_w=extended_w,
             offset_y=offset_y,
@@ -986,10 +1516,12 @@ class BrushPainterCore:
         opacity: float,
         selected_brush: np.ndarray,
         base_brush_size: int,
+        sampled_pixel: Optional[np.ndarray] = None,
     ) -> bool:
         source_state = tile_states[source_tile_num]
-        sampled_pixel = source_state.img_blurred[y, x]
-        sampled_pixel = self.apply_color_shift(sampled_pixel)
+        if sampled_pixel is None:
+            sampled_pixel = source_state.img_blurred[y, x]
+            sampled_pixel = self.apply_color_shift(sampled_pixel)
         sampled_alpha = sampled_pixel[3] if source_state.has_alpha else 1.0
         if sampled_alpha <= 1e-6:
             # if DEBUG_CANCEL:
@@ -1193,7 +1725,7 @@ class BrushPainterCore:
         if target_size_px == base_brush_size:
             duplicate_brush = selected_brush
         else:
-            duplicate_brush = self._resize_mask_bilinear(selected_brush, target_size_px, target_size_px)
+            duplicate_brush = self._get_resized_brush(selected_brush, target_size_px)
 
         duplicate_rotated = self._get_rotated_brush_cached(duplicate_brush, duplicate_angle)
         if duplicate_rotated.size == 0 or float(np.max(duplicate_rotated)) <= 1e-6:
@@ -1234,6 +1766,91 @@ class BrushPainterCore:
         )
         return source_applied and target_applied
     
+    def _paint_tile(
+        self,
+        tile_states: Dict[int, TilePaintState],
+        tile_num: int,
+        step_data_list: List[StepData],
+        total_strokes: int,
+        total_strokes_applied: int,
+        brush_callback=None,
+        rotation_angles: Optional[list] = None,
+    ) -> int:
+        """Applies the pre-calculated stamps of a tile, returns the updated number of applied strokes."""
+        if self.use_random_seed:
+            # Seed every tile on its own, so the result does not depend on the order or
+            # the process the tiles are painted in
+            np.random.seed(self.random_seed + tile_num)
+        self._painted_tile_num = tile_num
+        for step_data in step_data_list:
+            sampled_pixels = None
+            if self.use_vectorised_color_shift:
+                tile_state = tile_states[tile_num]
+                sampled_pixels = self.apply_color_shift_array(
+                    tile_state.img_blurred[step_data.random_y, step_data.random_x],
+                    self._get_color_shift_rng(tile_num, step_data.step),
+                )
+            for sample_index in range(step_data.num_samples):
+                y = int(step_data.random_y[sample_index])
+                x = int(step_data.random_x[sample_index])
+                brush_index = np.random.randint(0, len(step_data.scaled_brush_list))
+                selected_brush = step_data.scaled_brush_list[brush_index]
+                
+                # Track rotation angles for statistics
+                if rotation_angles is not None and total_strokes_applied < 1000:
+                    tile_state = tile_states[tile_num]
+                    angle_rad = tile_state.theta[y, x]
+                    angle_deg = float(np.rad2deg(angle_rad))
+                    rotation_angles.append(angle_deg)
+                
+                self._apply_stamp_with_optional_duplicate(
+                    tile_states,
+                    tile_num,
+                    y,
+                    x,
+                    step_data.opacity,
+                    selected_brush,
+                    step_data.actual_brush_size,
+                    sampled_pixels[sample_index] if sampled_pixels is not None else None,
+                )
+                total_strokes_applied += 1
+                if brush_callback and self._pending_blends is None:
+                    brush_callback(total_strokes, total_strokes_applied)
+        self._painted_tile_num = None
+        return total_strokes_applied
+
+    def _get_color_shift_rng(self, tile_num: int, step: int) -> np.random.Generator:
+        if self.use_random_seed:
+            return np.random.default_rng([self.random_seed, tile_num, step])
+        return np.random.default_rng()
+
+    def _downsample_tile(self, tile_array: np.ndarray) -> np.ndarray:
+        """Averages preview_factor x preview_factor blocks of pixels, dropping the incomplete ones."""
+        factor = self.preview_factor
+        height = max(1, tile_array.shape[0] // factor)
+        width = max(1, tile_array.shape[1] // factor)
+        block_h = min(factor, tile_array.shape[0])
+        block_w = min(factor, tile_array.shape[1])
+        blocks = tile_array[:height * block_h, :width * block_w].reshape(height, block_h, width, block_w, -1)
+        return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+    def _scale_step_data(self, step_data_list: List[StepData], brush_list, H, W) -> List[StepData]:
+        """Maps steps laid out at full resolution onto a proxy preview_factor times smaller."""
+        scaled_steps = []
+        for step_data in step_data_list:
+            actual_brush_size = max(1, int(round(step_data.actual_brush_size / self.preview_factor)))
+            scaled_steps.append(StepData(
+                step=step_data.step,
+                scale=step_data.scale,
+                opacity=step_data.opacity,
+                actual_brush_size=actual_brush_size,
+                scaled_brush_list=self.resize_brushes(brush_list, actual_brush_size),
+                num_samples=step_data.num_samples,
+                random_y=np.minimum(step_data.random_y // self.preview_factor, H - 1),
+                random_x=np.minimum(step_data.random_x // self.preview_factor, W - 1),
+            ))
+        return scaled_steps
+
     def precalculate_step_data(self, brush_list, H, W):
         """Pre-calculates all step data for brush painting."""
         steps_data = []
@@ -1284,8 +1901,42 @@ class BrushPainterCore:
         if image is None:
             return None
 
+        result_image_tiles = self.paint_image_tiles(
+            image,
+            brush_folder_path,
+            brush_texture_path,
+            custom_image_gradient,
+            brush_callback,
+            mesh_object,
+            uv_map_name,
+        )
+        if result_image_tiles is None:
+            return None
+
+        # Update image tiles in place, UDIM tiles without any stamp are not written again
+        set_image_pixels(image, result_image_tiles, self._changed_tile_nums)
+        return image
+
+    def paint_image_tiles(
+        self,
+        image,
+        brush_folder_path=None,
+        brush_texture_path=None,
+        custom_image_gradient=None,
+        brush_callback=None,
+        mesh_object: Optional[bpy.types.Object] = None,
+        uv_map_name: Optional[str] = None,
+    ) -> Optional[ImageTiles]:
+        """Paints the tiles of a Blender image and returns them without changing the image.
+
+        With a preview_factor above 1 the returned tiles are that many times smaller.
+        """
         self._rotation_cache.clear()
+        self._brush_keys.clear()
         self._seam_index = None
+        self._pending_blends = [] if self.use_batched_stamping else None
+        self._cross_tile_blends = []
+        self._changed_tile_nums = []
 
         if brush_folder_path and os.path.exists(brush_folder_path):
             brush_list = self.load_multiple_brushes(brush_folder_path)
@@ -1305,60 +1956,85 @@ class BrushPainterCore:
             if custom_image_tiles is None:
                 return None
 
-        tile_states: Dict[int, TilePaintState] = {}
-        steps_by_tile: Dict[int, List[StepData]] = {}
-        tile_shapes: Dict[int, Tuple[int, int]] = {}
-        total_strokes = 0
-
-        for tile_num, tile_array in image_tiles.tiles.items():
-            custom_tile_array = None
+        full_shapes = {tile_num: tile_array.shape[:2] for tile_num, tile_array in image_tiles.tiles.items()}
+        if self.preview_factor > 1:
+            image_tiles = ImageTiles(
+                tiles={tile_num: self._downsample_tile(tile_array) for tile_num, tile_array in image_tiles.tiles.items()},
+                ori_path=image_tiles.ori_path,
+                ori_packed=image_tiles.ori_packed,
+            )
             if custom_image_tiles:
-                custom_tile_array = custom_image_tiles.tiles.get(tile_num)
+                custom_image_tiles = ImageTiles(
+                    tiles={tile_num: self._downsample_tile(tile_array) for tile_num, tile_array in custom_image_tiles.tiles.items()},
+                    ori_path=custom_image_tiles.ori_path,
+                    ori_packed=custom_image_tiles.ori_packed,
+                )
+
+        use_workers = self.tile_worker_count > 1 and len(image_tiles.tiles) > 1 and self.preview_factor == 1
+        if use_workers:
+            # The workers blur their own tiles, only the geometry is needed here to build the seam index
+            tile_states = {
+                tile_num: self._prepare_tile_geometry(tile_num, *tile_array.shape[:2])
+                for tile_num, tile_array in image_tiles.tiles.items()
+            }
+        else:
+            tile_states = self._prepare_tile_states(image_tiles, custom_image_tiles)
+        tile_shapes = {tile_num: (tile_state.height, tile_state.width) for tile_num, tile_state in tile_states.items()}
 
-            tile_state = self._prepare_tile_state(tile_num, tile_array, custom_tile_array)
-            tile_states[tile_num] = tile_state
-            tile_shapes[tile_num] = (tile_state.height, tile_state.width)
+        if self.enable_seam_duplication:
+            self._seam_index = self._build_uv_seam_index(mesh_object, uv_map_name, tile_shapes)
 
-            step_data = self.precalculate_step_data(brush_list, tile_state.height, tile_state.width)
+        if use_workers:
+            from .tile_workers import paint_tiles_in_workers
+            try:
+                result_tiles = paint_tiles_in_workers(
+                    self,
+                    image_tiles.tiles,
+                    custom_image_tiles.tiles if custom_image_tiles else None,
+                    brush_list,
+                    brush_callback,
+                )
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"Painting the tiles in background processes failed, painting them here instead: {e}")
+                tile_states = self._prepare_tile_states(image_tiles, custom_image_tiles)
+            else:
+                self._pending_blends = None
+                result_image_tiles = ImageTiles(tiles=result_tiles, ori_path=image_tiles.ori_path, ori_packed=image_tiles.ori_packed)
+                self._changed_tile_nums = get_changed_tile_numbers(image_tiles, result_image_tiles)
+                return result_image_tiles
+
+        steps_by_tile: Dict[int, List[StepData]] = {}
+        total_strokes = 0
+        for tile_num, tile_state in tile_states.items():
+            # The strokes are laid out at full resolution, so a preview places the same strokes
+            step_data = self.precalculate_step_data(brush_list, *full_shapes[tile_num])
+            if self.preview_factor > 1:
+                step_data = self._scale_step_data(step_data, brush_list, tile_state.height, tile_state.width)
             steps_by_tile[tile_num] = step_data
             total_strokes += sum(step.num_samples for step in step_data)
 
-        if self.enable_seam_duplication:
-            self._seam_index = self._build_uv_seam_index(mesh_object, uv_map_name, tile_shapes)
-
         # Initialize rotation debug tracking
         if DEBUG_ROTATION:
             self._debug_rotation_count = 0
             rotation_angles = []
+        else:
+            rotation_angles = None
         
         total_strokes_applied = 0
         for tile_num, step_data_list in steps_by_tile.items():
-            for step_data in step_data_list:
-                for sample_index in range(step_data.num_samples):
-                    y = int(step_data.random_y[sample_index])
-                    x = int(step_data.random_x[sample_index])
-                    brush_index = np.random.randint(0, len(step_data.scaled_brush_list))
-                    selected_brush = step_data.scaled_brush_list[brush_index]
-                    
-                    # Track rotation angles for statistics
-                    if DEBUG_ROTATION and total_strokes_applied < 1000:
-                        tile_state = tile_states[tile_num]
-                        angle_rad = tile_state.theta[y, x]
-                        angle_deg = float(np.rad2deg(angle_rad))
-                        rotation_angles.append(angle_deg)
-                    
-                    self._apply_stamp_with_optional_duplicate(
-                        tile_states,
-                        tile_num,
-                        y,
-                        x,
-                        step_data.opacity,
-                        selected_brush,
-                        step_data.actual_brush_size,
-                    )
-                    total_strokes_applied += 1
-                    if brush_callback:
-                        brush_callback(total_strokes, total_strokes_applied)
+            total_strokes_applied = self._paint_tile(
+                tile_states,
+                tile_num,
+                step_data_list,
+                total_strokes,
+                total_strokes_applied,
+                brush_callback,
+                rotation_angles,
+            )
+
+        self._flush_pending_blends(total_strokes, brush_callback)
+        self._blend_cross_tile_blends(self._cross_tile_blends)
+        self._cross_tile_blends = []
         
         # Print rotation statistics
         if DEBUG_ROTATION and rotation_angles:
@@ -1377,12 +2053,8 @@ class BrushPainterCore:
 
         result_tiles = {}
         for tile_num, tile_state in tile_states.items():
-            result_tiles[tile_num] = tile_state.canvas[
-                tile_state.offset_y:tile_state.offset_y + tile_state.height,
-                tile_state.offset_x:tile_state.offset_x + tile_state.width,
-            ]
+            result_tiles[tile_num] = tile_state.canvas
 
-        # Update image tiles in place
         result_image_tiles = ImageTiles(tiles=result_tiles, ori_path=image_tiles.ori_path, ori_packed=image_tiles.ori_packed)
-        set_image_pixels(image, result_image_tiles)
-        return image
+        self._changed_tile_nums = get_changed_tile_numbers(image_tiles, result_image_tiles)
+        return result_image_tiles
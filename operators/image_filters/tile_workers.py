@@ -0,0 +1,235 @@
+"""Paint the UDIM tiles of the brush painter in background Blender processes.
+
+``paint_tiles_in_workers`` copies the tiles into shared memory and launches
+``blender --background`` once per share of tiles. Every worker paints its own
+tiles in place with ``run_tile_worker``. The stamps duplicated across UV seams
+onto another tile are returned and blended afterwards, sorted by source tile,
+like ``BrushPainterCore`` does when it paints the tiles itself, so the result
+depends neither on how the tiles are split nor on the order the workers finish in.
+"""
+
+import dataclasses
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import bpy
+import numpy as np
+
+from ...preferences import addon_package
+from ...utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+JOB_VERSION = 2
+_POLL_INTERVAL = 0.1
+
+
+def split_tiles(tile_shapes: Dict[int, Tuple[int, int]], worker_count: int) -> List[List[int]]:
+    """Split the tiles into at most worker_count shares with a similar number of pixels."""
+    worker_count = max(1, min(worker_count, len(tile_shapes)))
+    shares: List[List[int]] = [[] for _ in range(worker_count)]
+    share_pixels = [0] * worker_count
+    # Largest tiles first, ties broken by tile number so the split is deterministic
+    for tile_num in sorted(tile_shapes, key=lambda tile: (-tile_shapes[tile][0] * tile_shapes[tile][1], tile)):
+        index = share_pixels.index(min(share_pixels))
+        shares[index].append(tile_num)
+        share_pixels[index] += tile_shapes[tile_num][0] * tile_shapes[tile_num][1]
+    return [sorted(share) for share in shares if share]
+
+
+def _create_shared_array(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    shared = np.ndarray(array.shape, dtype=np.float32, buffer=shm.buf)
+    shared[...] = array
+    return shm, shared
+
+
+def _attach_shared_array(name: str, shape: Tuple[int, ...]) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # The main process owns the buffer, the tracker of the worker must not unlink it on exit
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm, np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+
+
+def paint_tiles_in_workers(
+        painter,
+        tiles: Dict[int, np.ndarray],
+        custom_tiles: Optional[Dict[int, np.ndarray]],
+        brush_list: list,
+        tile_callback=None,
+    ) -> Dict[int, np.ndarray]:
+    """Paint the tiles in painter.tile_worker_count background Blender processes.
+
+    Args:
+        painter (BrushPainterCore): The configured painter, with its seam index already built
+        tiles (Dict[int, np.ndarray]): The tiles to paint, by tile number
+        custom_tiles (Optional[Dict[int, np.ndarray]]): The tiles of the custom gradient image
+        brush_list (list): The brush masks
+        tile_callback (callable, optional): Called with the number of tiles and of painted tiles
+
+    Returns:
+        Dict[int, np.ndarray]: The painted tiles
+
+    Raises:
+        OSError: If the workers could not be started.
+        RuntimeError: If a worker failed.
+    """
+    tile_shapes = {tile_num: tile.shape[:2] for tile_num, tile in tiles.items()}
+    shares = split_tiles(tile_shapes, painter.tile_worker_count)
+    job_dir = tempfile.mkdtemp(prefix="ps_brush_", dir=bpy.app.tempdir or None)
+    settings = {key: value for key, value in vars(painter).items() if not key.startswith("_")}
+    command_expr = f"import importlib; importlib.import_module({__name__!r}).run_tile_worker()"
+    buffers: List[shared_memory.SharedMemory] = []
+    shared_tiles: Dict[int, np.ndarray] = {}
+    processes = []
+    start_time = time.time()
+    try:
+        for worker_index, share in enumerate(shares):
+            tile_jobs = []
+            for tile_num in share:
+                shm, shared_tiles[tile_num] = _create_shared_array(tiles[tile_num])
+                buffers.append(shm)
+                tile_job = {"tile": tile_num, "shm": shm.name, "shape": tiles[tile_num].shape}
+                custom_tile = custom_tiles.get(tile_num) if custom_tiles else None
+                if custom_tile is not None:
+                    custom_shm, _ = _create_shared_array(custom_tile)
+                    buffers.append(custom_shm)
+                    tile_job["custom_shm"] = custom_shm.name
+                    tile_job["custom_shape"] = custom_tile.shape
+                tile_jobs.append(tile_job)
+
+            job_path = os.path.join(job_dir, f"worker_{worker_index}.pickle")
+            result_path = os.path.join(job_dir, f"worker_{worker_index}_result.pickle")
+            with open(job_path, "wb") as job_file:
+                pickle.dump({
+                    "version": JOB_VERSION,
+                    "settings": settings,
+                    "brush_list": brush_list,
+                    "seam_index": painter._seam_index,
+                    "tile_shapes": tile_shapes,
+                    "tiles": tile_jobs,
+                    "result": result_path,
+                }, job_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            log_path = os.path.join(job_dir, f"worker_{worker_index}.log")
+            with open(log_path, "w", encoding="utf-8") as log_file:
+                command = [
+                    bpy.app.binary_path,
+                    "--background",
+                    "--addons", addon_package(),
+                    "--python-exit-code", "1",
+                    "--python-expr", command_expr,
+                    "--", job_path,
+                ]
+                process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT)
+            processes.append((process, share, result_path, log_path))
+
+        painted_count = 0
+        if tile_callback:
+            tile_callback(len(tiles), painted_count)
+        running = list(processes)
+        while running:
+            time.sleep(_POLL_INTERVAL)
+            for worker in [worker for worker in running if worker[0].poll() is not None]:
+                running.remove(worker)
+                process, share, _, log_path = worker
+                if process.returncode != 0:
+                    raise RuntimeError(f"Brush painter worker exited with code {process.returncode}, see {log_path}")
+                painted_count += len(share)
+                if tile_callback:
+                    tile_callback(len(tiles), painted_count)
+
+        result_tiles = {tile_num: np.array(shared_tiles[tile_num]) for tile_num in sorted(shared_tiles)}
+        cross_tile_blends = []
+        for _, _, result_path, _ in processes:
+            with open(result_path, "rb") as result_file:
+                cross_tile_blends.extend(pickle.load(result_file)["cross_tile_blends"])
+    except Exception:
+        for process, _, _, _ in processes:
+            if process.poll() is None:
+                process.terminate()
+        logger.error(f"Kept the brush painter worker files in {job_dir}")
+        raise
+    finally:
+        # The arrays viewing the buffers must be gone before they can be closed
+        shared_tiles.clear()
+        for shm in buffers:
+            shm.close()
+            shm.unlink()
+
+    shutil.rmtree(job_dir, ignore_errors=True)
+    # Point the seam stamps at the painted tiles, then blend them in source tile order
+    target_states = {}
+    for index, (source_tile_num, blend) in enumerate(cross_tile_blends):
+        target_state = target_states.get(blend.state.tile_num)
+        if target_state is None:
+            target_state = dataclasses.replace(blend.state, canvas=result_tiles[blend.state.tile_num])
+            target_states[blend.state.tile_num] = target_state
+        cross_tile_blends[index] = (source_tile_num, dataclasses.replace(blend, state=target_state))
+    painter._blend_cross_tile_blends(cross_tile_blends)
+    logger.info(f"Painted {len(tiles)} tiles in {len(processes)} background processes "
+                f"in {round(time.time() - start_time, 2)} seconds")
+    return result_tiles
+
+
+def run_tile_worker():
+    """Entry point of a worker process, paints the tiles of the job given after '--'."""
+    from .brush_painter_core import BrushPainterCore
+
+    job_path = sys.argv[sys.argv.index("--") + 1]
+    with open(job_path, "rb") as job_file:
+        job = pickle.load(job_file)
+    if job.get("version") != JOB_VERSION:
+        raise RuntimeError(f"Unsupported brush painter job version {job.get('version')}")
+
+    painter = BrushPainterCore()
+    for key, value in job["settings"].items():
+        setattr(painter, key, value)
+    painter._seam_index = job["seam_index"]
+    painter._cross_tile_blends = []
+    painter._pending_blends = [] if painter.use_batched_stamping else None
+
+    # Only the geometry of the other tiles is needed, to place the stamps duplicated onto them
+    geometry_states = {
+        tile_num: painter._prepare_tile_geometry(tile_num, height, width)
+        for tile_num, (height, width) in job["tile_shapes"].items()
+    }
+    tile_states = dict(geometry_states)
+    buffers = []
+    shared_tiles = {}
+    for tile_job in job["tiles"]:
+        shm, shared_tiles[tile_job["tile"]] = _attach_shared_array(tile_job["shm"], tile_job["shape"])
+        buffers.append(shm)
+        custom_tile = None
+        if "custom_shm" in tile_job:
+            custom_shm, custom_tile = _attach_shared_array(tile_job["custom_shm"], tile_job["custom_shape"])
+            buffers.append(custom_shm)
+        tile_states[tile_job["tile"]] = painter._prepare_tile_state(tile_job["tile"], shared_tiles[tile_job["tile"]], custom_tile)
+
+    for tile_job in job["tiles"]:
+        state = tile_states[tile_job["tile"]]
+        step_data_list = painter.precalculate_step_data(job["brush_list"], state.height, state.width)
+        painter._paint_tile(tile_states, tile_job["tile"], step_data_list, 0, 0)
+    painter._flush_pending_blends(0)
+    # Keep only the geometry of the target tiles, the main process blends onto the painted ones
+    cross_tile_blends = [
+        (source_tile_num, dataclasses.replace(blend, state=geometry_states[blend.state.tile_num]))
+        for source_tile_num, blend in painter._cross_tile_blends
+    ]
+
+    for tile_num, shared_tile in shared_tiles.items():
+        shared_tile[...] = tile_states[tile_num].canvas
+    with open(job["result"], "wb") as result_file:
+        pickle.dump({"cross_tile_blends": cross_tile_blends}, result_file, protocol=pickle.HIGHEST_PROTOCOL)
+    # The buffers are released when the process exits, the main process unlinks them
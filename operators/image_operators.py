@@ -9,7 +9,7 @@ from .common import (
     get_icon,
     blender_image_to_numpy
 )
-from ..paintsystem.image import set_image_pixels, ImageTiles
+from ..paintsystem.image import get_changed_tile_numbers, set_image_pixels, ImageTiles
 from .image_filters import list_brush_presets, resolve_brush_preset_path
 from ..paintsystem.graph.common import DEFAULT_PS_UV_MAP_NAME
 import numpy
@@ -18,8 +18,13 @@ IMAGE_FILTERS_AVAILABLE = True
 if IMAGE_FILTERS_AVAILABLE:
     from .image_filters import gaussian_blur, sharpen_image
     from .image_filters.brush_painter_core import BrushPainterCore
+    from .image_filters.brush_cache import set_cache_dir
 
 import os
+import random
+import tempfile
+
+BRUSH_PAINTER_PREVIEW_NAME = "Brush Painter Preview"
 
 class PAINTSYSTEM_OT_InvertColors(PSImageFilterMixin, Operator):
     bl_idname = "paint_system.invert_colors"
@@ -193,7 +198,7 @@ if IMAGE_FILTERS_AVAILABLE:
                 return {'CANCELLED'}
             blurred_tiles = gaussian_blur(image_tiles, self.gaussian_sigma)
             image = image.copy()
-            set_image_pixels(image, blurred_tiles)
+            set_image_pixels(image, blurred_tiles, get_changed_tile_numbers(image_tiles, blurred_tiles))
             ps_ctx.active_layer.image = image
             return {'FINISHED'}
         
@@ -223,7 +228,7 @@ if IMAGE_FILTERS_AVAILABLE:
                 return {'CANCELLED'}
             sharpened_tiles = sharpen_image(image_tiles, self.sharpen_amount)
             image = image.copy()
-            set_image_pixels(image, sharpened_tiles)
+            set_image_pixels(image, sharpened_tiles, get_changed_tile_numbers(image_tiles, sharpened_tiles))
             ps_ctx.active_layer.image = image
             return {'FINISHED'}
         
@@ -249,7 +254,13 @@ if IMAGE_FILTERS_AVAILABLE:
         steps: IntProperty(name="Steps", default=4, min=1, max=20)
         gradient_threshold: FloatProperty(name="Gradient Threshold", default=0.0, min=0.0, max=1.0)
         gaussian_sigma: IntProperty(name="Gaussian Sigma", default=3, min=0, max=10)
-        use_random_seed: BoolProperty(name="Use Random Seed", default=False)
+        use_random_seed: BoolProperty(
+            name="Use Random Seed",
+            description="Paint the same strokes on every run. Each UDIM tile is seeded on its own and stamps "
+                        "duplicated across UV seams are blended after all tiles, so a seed gives different "
+                        "strokes than in earlier versions of the add-on",
+            default=False,
+        )
         random_seed: IntProperty(name="Random Seed", default=42, min=0, max=1000000)
         
         brush_mode: EnumProperty(
@@ -309,6 +320,43 @@ if IMAGE_FILTERS_AVAILABLE:
             min=0.0,
             max=360.0,
         )
+        tile_worker_count: IntProperty(
+            name="Tile Workers",
+            description="Paint the UDIM tiles in this many background Blender processes, 1 paints them here",
+            default=1,
+            min=1,
+            max=64,
+            options={'SKIP_SAVE'},
+        )
+        use_brush_disk_cache: BoolProperty(
+            name="Cache Brushes on Disk",
+            description="Keep the decoded brush textures in the temporary folder, so they are not decoded again in the next sessions",
+            default=False,
+        )
+        use_preview: BoolProperty(
+            name="Preview",
+            description="Paint a low resolution preview into a temporary image and keep the layer unchanged. "
+                        "Turn it off in the Adjust Last Operation panel to paint at full resolution",
+            default=False,
+            options={'SKIP_SAVE'},
+        )
+        preview_scale: EnumProperty(
+            name="Preview Scale",
+            description="Resolution of the preview. The full resolution painting places the same strokes",
+            items=[
+                ('2', "1/2", "Half resolution"),
+                ('4', "1/4", "Quarter resolution"),
+                ('8', "1/8", "Eighth resolution"),
+            ],
+            default='4',
+        )
+        preview_seed: IntProperty(
+            name="Preview Seed",
+            description="Seed picked for a preview without a random seed, reused when painting at full resolution",
+            default=-1,
+            min=-1,
+            options={'HIDDEN', 'SKIP_SAVE'},
+        )
 
         def _resolve_uv_map_name(self, ps_ctx) -> str | None:
             active_layer = ps_ctx.active_layer
@@ -331,6 +379,36 @@ if IMAGE_FILTERS_AVAILABLE:
                     return uv_name
             return None
         
+        def show_preview(self, context, image, image_tiles) -> bpy.types.Image:
+            """Write the previewed tile into the preview image and show it in the image editors."""
+            tile_num = image.tiles.active.number if image.source == 'TILED' and image.tiles.active else 1001
+            tile = image_tiles.tiles.get(tile_num, next(iter(image_tiles.tiles.values())))
+            height, width = tile.shape[:2]
+            preview = bpy.data.images.get(BRUSH_PAINTER_PREVIEW_NAME)
+            if preview is None:
+                preview = bpy.data.images.new(BRUSH_PAINTER_PREVIEW_NAME, width, height, alpha=True, float_buffer=image.is_float)
+            elif tuple(preview.size) != (width, height):
+                preview.scale(width, height)
+            preview.colorspace_settings.name = image.colorspace_settings.name
+            preview.pixels.foreach_set(numpy.flipud(numpy.clip(tile, 0.0, 1.0)).ravel().astype(numpy.float32))
+            preview.update()
+            for window in context.window_manager.windows:
+                for area in window.screen.areas:
+                    if area.type == 'IMAGE_EDITOR' and area.spaces.active.image in {None, image, preview}:
+                        area.spaces.active.image = preview
+                        area.tag_redraw()
+            return preview
+
+        def remove_preview(self, context, image):
+            preview = bpy.data.images.get(BRUSH_PAINTER_PREVIEW_NAME)
+            if preview is None:
+                return
+            for window in context.window_manager.windows:
+                for area in window.screen.areas:
+                    if area.type == 'IMAGE_EDITOR' and area.spaces.active.image == preview:
+                        area.spaces.active.image = image
+            bpy.data.images.remove(preview)
+
         def execute(self, context):
             ps_ctx = self.parse_context(context)
             image = self.get_image(context)
@@ -354,9 +432,18 @@ if IMAGE_FILTERS_AVAILABLE:
             painter.value_shift = self.value_shift if self.use_hsv_shift else 0.0
             painter.use_random_seed = self.use_random_seed
             painter.random_seed = self.random_seed
+            if not self.use_random_seed:
+                if self.use_preview and self.preview_seed < 0:
+                    # Without a seed the full resolution painting would place other strokes than the preview
+                    self.preview_seed = random.randint(0, 1000000)
+                if self.preview_seed >= 0:
+                    painter.use_random_seed = True
+                    painter.random_seed = self.preview_seed
             painter.enable_seam_duplication = self.use_uv_seam_duplication
             painter.use_random_rotation = self.use_random_rotation
             painter.random_rotation_range = self.random_rotation_range
+            painter.tile_worker_count = self.tile_worker_count
+            set_cache_dir(os.path.join(tempfile.gettempdir(), "paint_system_brushes") if self.use_brush_disk_cache else None)
             # Set brush paths based on mode
             brush_folder_path = None
             brush_texture_path = None
@@ -380,8 +467,26 @@ if IMAGE_FILTERS_AVAILABLE:
                     wm.progress_begin(0, total_brush)
                 wm.progress_update(brush_applied)
             
-            image = image.copy()
             uv_map_name = self._resolve_uv_map_name(ps_ctx)
+            if self.use_preview:
+                painter.preview_factor = int(self.preview_scale)
+                preview_tiles = painter.paint_image_tiles(
+                    image,
+                    brush_folder_path=brush_folder_path,
+                    brush_texture_path=brush_texture_path,
+                    custom_image_gradient=custom_image_gradient,
+                    brush_callback=callback,
+                    mesh_object=ps_ctx.ps_object,
+                    uv_map_name=uv_map_name,
+                )
+                wm.progress_end()
+                if preview_tiles is None:
+                    return {'CANCELLED'}
+                preview = self.show_preview(context, image, preview_tiles)
+                self.report({'INFO'}, f"Preview painted at 1/{self.preview_scale} resolution into '{preview.name}'")
+                return {'FINISHED'}
+
+            image = image.copy()
             new_image = painter.apply_brush_painting(
                 image,
                 brush_folder_path=brush_folder_path,
@@ -393,6 +498,7 @@ if IMAGE_FILTERS_AVAILABLE:
             )
             
             wm.progress_end()
+            self.remove_preview(context, new_image)
             if ps_ctx.active_channel.use_bake_image:
                 ps_ctx.active_channel.bake_image = new_image
             else:
@@ -453,6 +559,14 @@ if IMAGE_FILTERS_AVAILABLE:
             col.prop(self, "start_opacity", slider=True)
             col.prop(self, "end_opacity", slider=True)
             col.prop(self, "gaussian_sigma")
+            box.prop(self, "tile_worker_count")
+            box.prop(self, "use_brush_disk_cache")
+            box = layout.box()
+            row = box.row()
+            row.prop(self, "use_preview")
+            sub = row.row()
+            sub.enabled = self.use_preview
+            sub.prop(self, "preview_scale", text="")
 
 # Build classes list
 classes = [
@@ -0,0 +1,314 @@
+"""Content hashes of channel bakes.
+
+A channel bake only depends on the channel node tree, what the material feeds
+into its group node, the images those nodes read, the mesh data of the baked
+objects and the bake settings. ``get_channel_bake_hash`` hashes all of them and
+the result is stored on the baked image, so baking an unchanged channel again
+can reuse the image instead of rendering it.
+"""
+
+import hashlib
+import os
+from typing import Any, Dict, Iterable, Optional
+
+import bpy
+import numpy as np
+from bpy.types import Context, Image, Material, Node, NodeSocket, NodeTree, Object
+
+from .image import find_udim_tile_files, parse_udim_filename
+
+BAKE_HASH_KEY = "ps_bake_hash"
+BAKE_IMAGE_HASH_KEY = "ps_bake_image_hash"
+
+# Node and struct properties that do not change what a node outputs
+_SKIPPED_PROPERTIES = {
+    "rna_type", "name", "label", "location", "location_absolute", "width", "height", "dimensions",
+    "select", "hide", "show_options", "show_preview", "show_texture", "use_custom_color", "color",
+    "parent", "internal_links", "inputs", "outputs", "is_active_output", "warning_propagation",
+    "bl_idname", "bl_label", "bl_description", "bl_icon", "bl_static_type",
+    "bl_width_default", "bl_width_min", "bl_width_max", "bl_height_default", "bl_height_min", "bl_height_max",
+}
+_MAX_STRUCT_DEPTH = 4
+
+
+class _BakeHasher:
+    """Feeds the values a bake depends on into a single digest."""
+
+    def __init__(self):
+        self._digest = hashlib.sha1()
+        self._node_trees: Dict[str, str] = {}
+        self._images: Dict[str, Optional[str]] = {}
+        self.is_valid = True
+
+    def update(self, *values: Any):
+        for value in values:
+            if isinstance(value, (bytes, memoryview)):
+                self._digest.update(value)
+            elif isinstance(value, set):
+                # Enum flags, keep the order stable between sessions
+                self._digest.update(repr(sorted(value)).encode())
+            else:
+                self._digest.update(repr(value).encode())
+            self._digest.update(b"\0")
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def update_struct(self, struct, depth: int = 0):
+        """Hash the RNA properties of a node or of a struct it owns (color ramp, curve mapping, ...)."""
+        for prop in struct.bl_rna.properties:
+            identifier = prop.identifier
+            if identifier in _SKIPPED_PROPERTIES:
+                continue
+            value = getattr(struct, identifier, None)
+            if prop.type == 'POINTER':
+                self.update(identifier)
+                self.update_pointer(value, depth)
+            elif prop.type == 'COLLECTION':
+                if depth >= _MAX_STRUCT_DEPTH:
+                    continue
+                self.update(identifier, len(value))
+                for item in value:
+                    self.update_struct(item, depth + 1)
+            elif getattr(prop, "is_array", False):
+                self.update(identifier, tuple(value))
+            else:
+                self.update(identifier, value)
+
+    def update_pointer(self, value, depth: int):
+        if value is None:
+            self.update(None)
+        elif isinstance(value, NodeTree):
+            self.update(self.get_node_tree_hash(value))
+        elif isinstance(value, Image):
+            image_hash = self.get_image_hash(value)
+            if image_hash is None:
+                self.is_valid = False
+            self.update(image_hash)
+        elif isinstance(value, bpy.types.ID):
+            self.update(type(value).__name__, value.name)
+        elif depth < _MAX_STRUCT_DEPTH:
+            self.update_struct(value, depth + 1)
+
+    def update_socket_value(self, socket: NodeSocket):
+        self.update(socket.identifier, socket.is_linked)
+        if socket.is_linked or not hasattr(socket, "default_value"):
+            return
+        value = socket.default_value
+        if isinstance(value, bpy.types.ID):
+            self.update_pointer(value, 0)
+        elif hasattr(value, "__len__") and not isinstance(value, str):
+            self.update(tuple(value))
+        else:
+            self.update(value)
+
+    def update_node(self, node: Node):
+        self.update(node.bl_idname, node.name, node.mute)
+        self.update_struct(node)
+        for socket in node.inputs:
+            self.update_socket_value(socket)
+
+    def get_node_tree_hash(self, node_tree: NodeTree) -> str:
+        """Hash every node, link and interface socket of a node tree, including nested trees."""
+        if node_tree.name in self._node_trees:
+            return self._node_trees[node_tree.name]
+        hasher = _BakeHasher()
+        # Share the caches, a layer tree is often used by several nodes
+        hasher._node_trees = self._node_trees
+        hasher._images = self._images
+        self._node_trees[node_tree.name] = ""
+        for item in node_tree.interface.items_tree:
+            if item.item_type != 'SOCKET':
+                continue
+            hasher.update(item.in_out, item.socket_type, item.name)
+            if hasattr(item, "default_value"):
+                value = item.default_value
+                hasher.update(tuple(value) if hasattr(value, "__len__") and not isinstance(value, str) else value)
+        for node in sorted(node_tree.nodes, key=lambda node: node.name):
+            if node.type == 'FRAME':
+                continue
+            hasher.update_node(node)
+        links = sorted(
+            (link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier, link.is_muted)
+            for link in node_tree.links
+        )
+        hasher.update(links)
+        if not hasher.is_valid:
+            self.is_valid = False
+        digest = hasher.hexdigest()
+        self._node_trees[node_tree.name] = digest
+        return digest
+
+    def update_upstream(self, socket: NodeSocket, visited: Optional[set] = None):
+        """Hash the nodes linked into socket, following the links upstream."""
+        visited = set() if visited is None else visited
+        self.update_socket_value(socket)
+        for link in socket.links:
+            if not link.is_valid or link.is_muted:
+                continue
+            node = link.from_node
+            self.update(link.from_socket.identifier)
+            if node.name in visited:
+                self.update(node.name)
+                continue
+            visited.add(node.name)
+            self.update_node(node)
+            for node_input in node.inputs:
+                if node_input.is_linked:
+                    self.update_upstream(node_input, visited)
+
+    def get_image_hash(self, image: Image) -> Optional[str]:
+        if image.name not in self._images:
+            self._images[image.name] = get_image_hash(image)
+        return self._images[image.name]
+
+
+def get_image_hash(image: Image) -> Optional[str]:
+    """Return a checksum of the image content, or None if it cannot be read cheaply.
+
+    Saved images are identified by their packed data or their file size and modification
+    time, edited ones by their pixels. Edited UDIM images only expose their first tile, so
+    they cannot be hashed.
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((image.source, tuple(image.size), image.is_float, image.colorspace_settings.name, image.alpha_mode)).encode())
+    if image.source == 'TILED':
+        digest.update(repr([tile.number for tile in image.tiles]).encode())
+    if not image.is_dirty:
+        if image.packed_files:
+            for packed in image.packed_files:
+                digest.update(repr((packed.tile_number, packed.view)).encode())
+                digest.update(packed.packed_file.data)
+            return digest.hexdigest()
+        if image.filepath and image.source in {'FILE', 'SEQUENCE', 'TILED'}:
+            directory = os.path.dirname(bpy.path.abspath(image.filepath))
+            if image.source == 'TILED':
+                prefix, _extension = parse_udim_filename(bpy.path.basename(image.filepath))
+                paths = [path for _, path in sorted(find_udim_tile_files(directory, prefix).items())]
+            else:
+                paths = [bpy.path.abspath(image.filepath)]
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    return None
+                digest.update(repr((path, stat.st_size, stat.st_mtime_ns)).encode())
+            return digest.hexdigest()
+    if image.source == 'TILED' and len(image.tiles) > 1:
+        return None
+    if image.source == 'GENERATED' and not image.is_dirty:
+        digest.update(repr((image.generated_type, tuple(image.generated_color))).encode())
+        return digest.hexdigest()
+    pixels = np.empty(len(image.pixels), dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    digest.update(pixels.data)
+    return digest.hexdigest()
+
+
+def _update_object(hasher: _BakeHasher, obj: Object, depsgraph, uv_layer: str):
+    hasher.update(obj.name, tuple(tuple(row) for row in obj.matrix_world))
+    for modifier in obj.modifiers:
+        hasher.update(modifier.name, modifier.type, modifier.show_render)
+    mesh = obj.evaluated_get(depsgraph).data
+    hasher.update(len(mesh.vertices), len(mesh.loops), len(mesh.polygons))
+    for collection, attribute, dtype in (
+        (mesh.vertices, "co", np.float32),
+        (mesh.loops, "vertex_index", np.int32),
+        (mesh.polygons, "loop_start", np.int32),
+        (mesh.polygons, "material_index", np.int32),
+        (mesh.polygons, "use_smooth", np.bool_),
+    ):
+        values = np.empty(len(collection) * (3 if attribute == "co" else 1), dtype=dtype)
+        collection.foreach_get(attribute, values)
+        hasher.update(attribute, values.data)
+    uv_data = mesh.uv_layers.get(uv_layer)
+    if uv_data is None:
+        hasher.update(None)
+    else:
+        uvs = np.empty(len(uv_data.uv) * 2, dtype=np.float32)
+        uv_data.uv.foreach_get("vector", uvs)
+        hasher.update(uv_layer, uvs.data)
+    for attribute in mesh.color_attributes:
+        colors = np.empty(len(attribute.data) * 4, dtype=np.float32)
+        attribute.data.foreach_get("color", colors)
+        hasher.update(attribute.name, attribute.domain, colors.data)
+
+
+def get_channel_bake_hash(
+        context: Context,
+        channel,
+        mat: Material,
+        objects: Iterable[Object],
+        bake_image: Image,
+        uv_layer: str,
+        **settings,
+    ) -> Optional[str]:
+    """Hash everything a bake of the channel into bake_image depends on.
+
+    Args:
+        context (Context): The context
+        channel (Channel): The baked channel
+        mat (Material): The material the channel is baked from
+        objects (Iterable[Object]): The baked objects, only the ones using mat are hashed
+        bake_image (Image): The image the channel is baked into
+        uv_layer (str): The UV layer
+        **settings: The bake settings (margin, margin type, alpha and vector space options)
+
+    Returns:
+        Optional[str]: The hash, or None if the bake cannot be cached.
+    """
+    if not channel.node_tree or not mat.node_tree:
+        return None
+    hasher = _BakeHasher()
+    hasher.update(
+        bake_image.name, tuple(bake_image.size), bake_image.source, bake_image.is_float,
+        bake_image.colorspace_settings.name, uv_layer, sorted(settings.items()),
+    )
+    # The channel tree reads its own bake image once it has been baked. Hash that image by
+    # identity only, otherwise every bake would change the key of the next one.
+    hasher._images[bake_image.name] = repr((bake_image.name, tuple(bake_image.size)))
+    hasher.update(hasher.get_node_tree_hash(channel.node_tree))
+    if settings.get("use_group_tree"):
+        for group in mat.ps_mat_data.groups:
+            if group.node_tree and channel.name in group.channels:
+                group_node = next((
+                    node for node in mat.node_tree.nodes
+                    if node.bl_idname == 'ShaderNodeGroup' and node.node_tree == group.node_tree
+                ), None)
+                if group_node is None:
+                    break
+                for socket_name in (channel.name, f"{channel.name} Alpha"):
+                    socket = group_node.inputs.get(socket_name)
+                    if socket is not None:
+                        hasher.update_upstream(socket)
+                break
+    depsgraph = context.evaluated_depsgraph_get()
+    for obj in sorted(objects, key=lambda obj: obj.name):
+        if obj.type == 'MESH' and mat.name in obj.data.materials:
+            _update_object(hasher, obj, depsgraph, uv_layer)
+    if not hasher.is_valid:
+        return None
+    return hasher.hexdigest()
+
+
+def is_bake_cached(bake_image: Image, bake_hash: Optional[str]) -> bool:
+    """Return True if bake_image holds the untouched result of a bake with this hash."""
+    if not bake_hash or bake_image.get(BAKE_HASH_KEY) != bake_hash:
+        return False
+    return get_image_hash(bake_image) == bake_image.get(BAKE_IMAGE_HASH_KEY)
+
+
+def store_bake_hash(bake_image: Image, bake_hash: Optional[str]):
+    """Record the hash of the bake that produced bake_image, see is_bake_cached."""
+    image_hash = get_image_hash(bake_image) if bake_hash else None
+    if image_hash is None:
+        clear_bake_hash(bake_image)
+        return
+    bake_image[BAKE_HASH_KEY] = bake_hash
+    bake_image[BAKE_IMAGE_HASH_KEY] = image_hash
+
+
+def clear_bake_hash(bake_image: Image):
+    for key in (BAKE_HASH_KEY, BAKE_IMAGE_HASH_KEY):
+        if key in bake_image:
+            del bake_image[key]
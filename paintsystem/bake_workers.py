@@ -0,0 +1,312 @@
+"""Bake channels in background Blender processes.
+
+``start_bake_workers`` saves a copy of the current file, writes one job manifest
+per worker and launches ``blender --background`` on the copy for each of them.
+Every worker bakes its own share of the (material, channel) pairs on CPU Cycles
+with ``run_bake_worker`` and writes the results to files. A timer then copies
+them back into the bake images of the running session, which stays responsive
+in the meantime.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import IO, Dict, List, Optional
+
+import bpy
+from bpy.types import Context
+
+from .context import parse_context
+from .data import ChannelBake, bake_channel_batches, mark_channels_baked, plan_bake_batches
+from .image import ImageTiles, blender_image_to_numpy, load_tile_file, save_image, save_tile_files, set_image_pixels
+from .rebuild_scheduler import deferred_node_tree_updates
+from ..preferences import addon_package
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_VERSION = 1
+_POLL_INTERVAL = 1.0
+
+
+@dataclass
+class _Worker:
+    process: subprocess.Popen
+    manifest_path: str
+    result_path: str
+    log_path: str
+    log_file: IO
+
+
+@dataclass
+class BakeWorkerSession:
+    """Background bake in progress, see start_bake_workers."""
+    job_dir: str
+    # Job id -> material name, channel RNA path and image name
+    jobs: Dict[str, dict]
+    workers: List[_Worker] = field(default_factory=list)
+    start_time: float = field(default_factory=time.time)
+
+
+_active_session: Optional[BakeWorkerSession] = None
+
+
+def is_bake_workers_running() -> bool:
+    return _active_session is not None
+
+
+def split_bakes(bakes: List[ChannelBake], worker_count: int) -> List[List[ChannelBake]]:
+    """Split the bakes into at most worker_count disjoint shares of similar size.
+
+    Bakes of the same material stay next to each other, so a worker can still bake
+    them in a single batch.
+    """
+    bakes = sorted(bakes, key=lambda bake: bake.material.name)
+    worker_count = max(1, min(worker_count, len(bakes)))
+    share_size, rest = divmod(len(bakes), worker_count)
+    shares = []
+    start = 0
+    for index in range(worker_count):
+        end = start + share_size + (1 if index < rest else 0)
+        shares.append(bakes[start:end])
+        start = end
+    return shares
+
+
+def start_bake_workers(
+        context: Context,
+        bakes: List[ChannelBake],
+        worker_count: int,
+        margin: int = 8,
+        margin_type: str = "ADJACENT_FACES",
+        use_cache: bool = False,
+    ) -> BakeWorkerSession:
+    """Bake the channels in worker_count background Blender processes.
+
+    The bake images must already exist with their final size, as the workers bake into
+    their copies in the saved file. The results are applied when all workers are done.
+
+    Raises:
+        RuntimeError: If a background bake is already running.
+        OSError: If the workers could not be started.
+    """
+    global _active_session
+    if _active_session is not None:
+        raise RuntimeError("A background bake is already running")
+
+    ps_ctx = parse_context(context)
+    job_dir = tempfile.mkdtemp(prefix="ps_bake_", dir=bpy.app.tempdir or None)
+    blend_path = os.path.join(job_dir, "bake.blend")
+    # Saving runs the save handlers, which pack or save the edited layer images first
+    bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True, check_existing=False)
+
+    shares = split_bakes(bakes, worker_count)
+    threads = max(1, (os.cpu_count() or 1) // len(shares))
+    session = BakeWorkerSession(job_dir=job_dir, jobs={})
+    command_expr = f"import importlib; importlib.import_module({__name__!r}).run_bake_worker()"
+    try:
+        for worker_index, share in enumerate(shares):
+            jobs = []
+            for bake in share:
+                job_id = str(len(session.jobs))
+                job = {
+                    "id": job_id,
+                    "material": bake.material.name,
+                    "channel": bake.channel.path_from_id(),
+                    "image": bake.bake_image.name,
+                    "output": os.path.join(job_dir, f"job_{job_id}"),
+                    "uv_layer": bake.uv_layer,
+                }
+                session.jobs[job_id] = job
+                jobs.append(job)
+            manifest_path = os.path.join(job_dir, f"worker_{worker_index}.json")
+            result_path = os.path.join(job_dir, f"worker_{worker_index}_result.json")
+            with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+                json.dump({
+                    "version": MANIFEST_VERSION,
+                    "objects": [obj.name for obj in ps_ctx.ps_objects],
+                    "active_object": ps_ctx.ps_object.name if ps_ctx.ps_object else "",
+                    "margin": margin,
+                    "margin_type": margin_type,
+                    "use_cache": use_cache,
+                    "threads": threads,
+                    "result": result_path,
+                    "jobs": jobs,
+                }, manifest_file, indent=2)
+
+            log_path = os.path.join(job_dir, f"worker_{worker_index}.log")
+            log_file = open(log_path, "w", encoding="utf-8")
+            command = [
+                bpy.app.binary_path,
+                "--background",
+                "--addons", addon_package(),
+                blend_path,
+                "--python-exit-code", "1",
+                "--python-expr", command_expr,
+                "--", manifest_path,
+            ]
+            process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT)
+            session.workers.append(_Worker(process, manifest_path, result_path, log_path, log_file))
+    except Exception:
+        _stop_workers(session)
+        raise
+
+    _active_session = session
+    bpy.app.timers.register(_poll_bake_workers, first_interval=_POLL_INTERVAL)
+    logger.info(f"Started {len(session.workers)} bake workers for {len(session.jobs)} channels in {job_dir}")
+    return session
+
+
+def run_bake_worker():
+    """Entry point of a worker process, bakes the jobs of the manifest given after '--'."""
+    manifest_path = sys.argv[sys.argv.index("--") + 1]
+    with open(manifest_path, encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise RuntimeError(f"Unsupported bake manifest version {manifest.get('version')}")
+
+    context = bpy.context
+    # Share the CPU with the other workers instead of each one using every core
+    context.scene.render.threads_mode = 'FIXED'
+    context.scene.render.threads = manifest["threads"]
+    view_layer = context.view_layer
+    object_names = set(manifest["objects"])
+    for obj in view_layer.objects:
+        obj.select_set(obj.name in object_names)
+    view_layer.objects.active = bpy.data.objects.get(manifest["active_object"])
+
+    results = {}
+    job_bakes = []
+    for job in manifest["jobs"]:
+        material = bpy.data.materials.get(job["material"])
+        image = bpy.data.images.get(job["image"])
+        try:
+            channel = material.path_resolve(job["channel"]) if material else None
+        except ValueError:
+            channel = None
+        if not (material and channel and image):
+            results[job["id"]] = {"error": f"{job['material']}: {job['channel']} not found"}
+            continue
+        job_bakes.append((job, ChannelBake(material=material, channel=channel, bake_image=image, uv_layer=job["uv_layer"])))
+
+    timings = bake_channel_batches(
+        context,
+        plan_bake_batches([bake for _, bake in job_bakes]),
+        use_gpu=False,
+        margin=manifest["margin"],
+        margin_type=manifest["margin_type"],
+        use_cache=manifest["use_cache"],
+    )
+    for job, bake in job_bakes:
+        if not bake.is_baked:
+            results[job["id"]] = {"error": "Bake failed"}
+        elif bake.is_cached:
+            results[job["id"]] = {"cached": True}
+        else:
+            image_tiles = blender_image_to_numpy(bake.bake_image)
+            extension = "exr" if bake.bake_image.is_float else "png"
+            paths = {tile: f"{job['output']}.{tile}.{extension}" for tile in image_tiles.tiles}
+            save_tile_files(image_tiles.tiles, paths, use_float=bake.bake_image.is_float)
+            results[job["id"]] = {"tiles": {str(tile): path for tile, path in paths.items()}}
+
+    with open(manifest["result"], "w", encoding="utf-8") as result_file:
+        json.dump({"results": results, "timings": timings.summary()}, result_file, indent=2)
+
+
+def _stop_workers(session: BakeWorkerSession):
+    for worker in session.workers:
+        if worker.process.poll() is None:
+            worker.process.terminate()
+        worker.log_file.close()
+
+
+def cancel_bake_workers():
+    """Stop the running background bake without applying its results."""
+    global _active_session
+    session = _active_session
+    if session is None:
+        return
+    _active_session = None
+    if bpy.app.timers.is_registered(_poll_bake_workers):
+        bpy.app.timers.unregister(_poll_bake_workers)
+    _stop_workers(session)
+    shutil.rmtree(session.job_dir, ignore_errors=True)
+    logger.info("Cancelled the background bake")
+
+
+def _poll_bake_workers():
+    global _active_session
+    session = _active_session
+    if session is None:
+        return None
+    if any(worker.process.poll() is None for worker in session.workers):
+        return _POLL_INTERVAL
+    _active_session = None
+    try:
+        _apply_results(session)
+    except Exception as e:
+        logger.error(f"Error applying background bake results: {e}")
+    return None
+
+
+def _read_results(session: BakeWorkerSession) -> Dict[str, dict]:
+    results = {}
+    for worker_index, worker in enumerate(session.workers):
+        worker.log_file.close()
+        if worker.process.returncode != 0:
+            logger.error(f"Bake worker {worker_index} exited with code {worker.process.returncode}, see {worker.log_path}")
+        try:
+            with open(worker.result_path, encoding="utf-8") as result_file:
+                worker_results = json.load(result_file)
+        except (OSError, ValueError):
+            continue
+        logger.info(f"Bake worker {worker_index}: {worker_results['timings']}")
+        results.update(worker_results["results"])
+    return results
+
+
+def _apply_results(session: BakeWorkerSession):
+    results = _read_results(session)
+    baked_channels = []
+    failed_jobs = []
+    with deferred_node_tree_updates(bpy.context):
+        for job_id, job in session.jobs.items():
+            result = results.get(job_id, {"error": "No result"})
+            material = bpy.data.materials.get(job["material"])
+            image = bpy.data.images.get(job["image"])
+            try:
+                channel = material.path_resolve(job["channel"]) if material else None
+            except ValueError:
+                channel = None
+            if "error" in result or not (material and channel and image):
+                failed_jobs.append(f"{job['material']}/{job['channel']}: {result.get('error', 'removed while baking')}")
+                continue
+            if "tiles" in result:
+                width, height = image.size
+                tiles = {int(tile): load_tile_file(path, width, height) for tile, path in result["tiles"].items()}
+                set_image_pixels(image, ImageTiles(
+                    tiles=tiles,
+                    ori_path=image.filepath,
+                    ori_packed=bool(image.packed_file or image.filepath == ''),
+                ))
+                save_image(image)
+            channel.use_bake_image = True
+            baked_channels.append(channel)
+    mark_channels_baked(baked_channels)
+
+    for failed_job in failed_jobs:
+        logger.error(f"Background bake failed for {failed_job}")
+    if failed_jobs:
+        logger.error(f"Kept the background bake files in {session.job_dir}")
+    else:
+        shutil.rmtree(session.job_dir, ignore_errors=True)
+    logger.info(f"Background bake of {len(baked_channels)} channels finished in {round(time.time() - session.start_time, 2)} seconds")
+
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            area.tag_redraw()
@@ -0,0 +1,186 @@
+"""CPU compositing of image layers.
+
+Merging two image layers that are painted in the same UV space is a per-pixel
+blend, so it can be evaluated on the image buffers directly instead of baking
+the channel with Cycles. Like the bake done by the Merge operators, the upper
+layer is mixed over the lower one whatever their blend modes. Only plain image
+layer graphs can be evaluated here, ``can_composite_layers`` tells whether the
+bake is needed instead.
+"""
+
+import time
+from typing import Dict, Optional, Set
+
+import numpy as np
+from bpy.types import Image
+
+from .graph.common import DEFAULT_PS_UV_MAP_NAME
+from .image import ImageTiles, blender_image_to_numpy, set_image_pixels
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Nodes an image layer graph is made of when it has no coordinate or colour modifiers
+_PLAIN_IMAGE_LAYER_NODES = {"group_input", "group_output", "pre_mix", "post_mix", "mix_rgb", "source", "uvmap", "mapping"}
+
+
+def srgb_to_linear(rgb: np.ndarray) -> np.ndarray:
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(rgb: np.ndarray) -> np.ndarray:
+    rgb = np.maximum(rgb, 0.0)
+    return np.where(rgb <= 0.0031308, rgb * 12.92, 1.055 * rgb ** (1.0 / 2.4) - 0.055)
+
+
+def composite_over(
+        below: np.ndarray,
+        above: np.ndarray,
+        opacity: float = 1.0,
+        below_opacity: float = 1.0,
+        is_clip: bool = False,
+    ) -> np.ndarray:
+    """Mix a straight alpha RGBA array over another one.
+
+    Args:
+        below (np.ndarray): The lower layer, (height, width, 4) in linear colour.
+        above (np.ndarray): The upper layer, same shape as below.
+        opacity (float): Opacity of the upper layer.
+        below_opacity (float): Opacity of the lower layer.
+        is_clip (bool): Clip the upper layer to the alpha of the lower one.
+
+    Returns:
+        np.ndarray: The straight alpha result, same shape as the inputs.
+    """
+    below_rgb = below[..., :3]
+    above_rgb = above[..., :3]
+    below_alpha = below[..., 3:4] * below_opacity
+    above_alpha = above[..., 3:4] * opacity
+
+    if is_clip:
+        rgb = below_rgb + above_alpha * (above_rgb - below_rgb)
+        alpha = below_alpha
+    else:
+        alpha = above_alpha + below_alpha * (1.0 - above_alpha)
+        premultiplied = above_alpha * above_rgb + (1.0 - above_alpha) * below_alpha * below_rgb
+        safe_alpha = np.where(alpha > 1e-6, alpha, 1.0)
+        rgb = np.where(alpha > 1e-6, premultiplied / safe_alpha, 0.0)
+    return np.concatenate((rgb, alpha), axis=2).astype(np.float32, copy=False)
+
+
+def _get_tile_numbers(image: Image) -> Set[int]:
+    if image.source == 'TILED':
+        return {tile.number for tile in image.tiles}
+    return {1001}
+
+
+def _is_srgb_encoded(image: Image) -> bool:
+    # Byte buffers hold display encoded values, float buffers are already linear
+    return not image.is_float and image.colorspace_settings.name == 'sRGB'
+
+
+def _is_identity_mapping(mapping_node) -> bool:
+    for socket_name, identity in (("Location", (0, 0, 0)), ("Rotation", (0, 0, 0)), ("Scale", (1, 1, 1))):
+        socket = mapping_node.inputs.get(socket_name)
+        if socket is None:
+            continue
+        if socket.is_linked or any(abs(value - expected) > 1e-6 for value, expected in zip(socket.default_value, identity)):
+            return False
+    return True
+
+
+def can_composite_layer(layer, uv_map_name: str) -> bool:
+    """Return True if the layer is a plain image layer painted in the uv_map_name UV space.
+
+    Args:
+        layer (Layer): The layer data (not the linked wrapper).
+        uv_map_name (str): The UV map the merged image is painted in.
+    """
+    if layer.type != 'IMAGE' or not layer.image or not layer.node_tree:
+        return False
+    layer_uv_map = DEFAULT_PS_UV_MAP_NAME if layer.coord_type == 'AUTO' else layer.uv_map_name
+    if layer.coord_type not in {'UV', 'AUTO'} or layer_uv_map != uv_map_name:
+        return False
+    labels = {node.label for node in layer.node_tree.nodes if node.type != 'FRAME'}
+    if not labels <= _PLAIN_IMAGE_LAYER_NODES:
+        return False
+    mapping_node = layer.find_node("mapping")
+    if mapping_node is None or not _is_identity_mapping(mapping_node):
+        return False
+    pre_mix = layer.pre_mix_node
+    if pre_mix is None or pre_mix.inputs['Opacity'].is_linked:
+        return False
+    return True
+
+
+def can_composite_layers(below, above, target_image: Image, uv_map_name: str) -> bool:
+    """Return True if composite_layers can merge the two layers into target_image."""
+    if not (can_composite_layer(below, uv_map_name) and can_composite_layer(above, uv_map_name)):
+        return False
+    if below.is_clip:
+        # Clipped to a layer that is not part of the merge
+        return False
+    images = (below.image, above.image, target_image)
+    if len({tuple(image.size) for image in images}) != 1:
+        return False
+    if len({frozenset(_get_tile_numbers(image)) for image in images}) != 1:
+        return False
+    return True
+
+
+def _read_linear_tiles(image: Image) -> Optional[Dict[int, np.ndarray]]:
+    image_tiles = blender_image_to_numpy(image)
+    if image_tiles is None:
+        return None
+    if not _is_srgb_encoded(image):
+        return image_tiles.tiles
+    tiles = {}
+    for tile_number, array in image_tiles.tiles.items():
+        array = array.copy()
+        array[..., :3] = srgb_to_linear(array[..., :3])
+        tiles[tile_number] = array
+    return tiles
+
+
+def composite_layers(below, above, target_image: Image) -> bool:
+    """Merge two image layers into target_image, see can_composite_layers.
+
+    Args:
+        below (Layer): The lower layer data.
+        above (Layer): The upper layer data.
+        target_image (Image): The image to write the result to.
+
+    Returns:
+        bool: False if the layers could not be read, in which case target_image is left untouched.
+    """
+    start_time = time.time()
+    below_tiles = _read_linear_tiles(below.image)
+    above_tiles = _read_linear_tiles(above.image)
+    if below_tiles is None or above_tiles is None:
+        return False
+
+    result_tiles = {}
+    for tile_number, below_array in below_tiles.items():
+        above_array = above_tiles.get(tile_number)
+        if above_array is None or above_array.shape != below_array.shape:
+            logger.debug(f"Tile {tile_number} differs between {below.name} and {above.name}")
+            return False
+        # The Merge operators bake both layers with their blend mode set to MIX
+        result = composite_over(
+            below_array,
+            above_array,
+            opacity=above.opacity,
+            below_opacity=below.opacity,
+            is_clip=above.is_clip,
+        )
+        if _is_srgb_encoded(target_image):
+            result[..., :3] = linear_to_srgb(result[..., :3])
+        result_tiles[tile_number] = result
+
+    set_image_pixels(target_image, ImageTiles(
+        tiles=result_tiles,
+        ori_path=target_image.filepath,
+        ori_packed=bool(target_image.packed_file or target_image.filepath == ''),
+    ))
+    logger.debug(f"Composited {above.name} over {below.name} in {(time.time() - start_time)*1000} milliseconds")
+    return True
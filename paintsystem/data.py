@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from typing import Dict, Generator, List, Literal, Optional, Any
 from ..utils.logging import get_logger
 
@@ -9,6 +10,7 @@ import numpy as np
 import uuid
 from collections import Counter
 import math
+import time
 
 import bpy
 from bpy.app.handlers import persistent
@@ -38,6 +40,7 @@ from typing import Optional
 from mathutils import Color, Euler, Vector
 
 from .image import blender_image_to_numpy, set_image_pixels, save_image, ImageTiles
+from .bake_cache import clear_bake_hash, get_channel_bake_hash, is_bake_cached, store_bake_hash
 
 from .list_manager import ListManager
 
@@ -57,7 +60,8 @@ from .graph import (
     set_layer_blend_type,
 )
 from .graph.common import get_library_nodetree, get_library_object, DEFAULT_PS_UV_MAP_NAME
-from .nested_list_manager import BaseNestedListManager, BaseNestedListItem
+from .nested_list_manager import BaseNestedListManager, BaseNestedListItem, bump_collection_revision, bump_structure_revision
+from .rebuild_scheduler import deferred_node_tree_updates, is_deferring, mark_channel_dirty, mark_group_dirty, mark_layer_dirty
 
 BLEND_MODE_ENUM = []
 for blend_mode in bpy.types.ShaderNodeMixRGB.bl_rna.properties['blend_type'].enum_items:
@@ -832,6 +836,9 @@ class Layer(BaseNestedListItem):
     def update_node_tree(self, context):
         if not self.auto_update_node_tree:
             return
+        if is_deferring():
+            mark_layer_dirty(self)
+            return
         # Ensure the paint system UV map even if it's linked
         if self.get_layer_data().coord_type == 'AUTO':
             ensure_paint_system_uv_map(context)
@@ -874,7 +881,7 @@ class Layer(BaseNestedListItem):
         ensure_sockets(self.node_tree, expected_output, "OUTPUT")
         
         # Update node tree name
-        if self.name:
+        if self.name and self.node_tree.name != f"PS {self.name} ({self.uid[:8]})":
             self.node_tree.name = f"PS {self.name} ({self.uid[:8]})"
         
         if self.coord_type == "DECAL":
@@ -886,7 +893,7 @@ class Layer(BaseNestedListItem):
         
         match self.type:
             case "IMAGE":
-                if self.image:
+                if self.image and self.image.name != self.name:
                     self.image.name = self.name
             case "GRADIENT":
                 if self.gradient_type in ('LINEAR', 'RADIAL', 'FAKE_LIGHT'):
@@ -914,7 +921,10 @@ class Layer(BaseNestedListItem):
                 collection.objects.unlink(self.empty_object)
         
         layer_graph = create_layer_graph(self)
-        layer_graph.compile()
+        if layer_graph.compile().tree_changed:
+            channel = get_layer_channel(self)
+            if channel:
+                channel.mark_bake_dirty()
         
         # For fake light, we need to update the empty object rotation via drivers
         object_rot_node = self.find_node("object_rotation")
@@ -1225,6 +1235,8 @@ class Layer(BaseNestedListItem):
         update=update_node_tree
     )
     def update_type(self, context: Context):
+        # Only folders hold children, so the display order depends on the type
+        bump_structure_revision()
         try:
             if self.type == "IMAGE":
                 self.color_output_name = "Color"
@@ -1441,8 +1453,7 @@ class Layer(BaseNestedListItem):
         layer_data = self.get_layer_data()
         active_channel = ps_ctx.active_channel
         flattened = active_channel.flatten_hierarchy()
-        current_flat_index = next(
-            (i for i, (it, _) in enumerate(flattened) if it.id == self.id), -1)
+        current_flat_index = active_channel.get_flattened_index(self.id)
         below_layer, next_index = active_channel.get_next_sibling_item(flattened, current_flat_index)
         warnings = []
         blend_mode = get_layer_blend_type(layer_data)
@@ -1555,17 +1566,19 @@ class Layer(BaseNestedListItem):
     
     def apply_properties(self, from_layer: "Layer", to_layer: "Layer", ignore_props: list[str] = []):
         retry_props = []
-        for prop in from_layer.bl_rna.properties:
-            pid = getattr(prop, 'identifier', '')
-            if not pid or getattr(prop, 'is_readonly', False):
-                continue
-            if pid in ignore_props:
-                continue
-            value = getattr(from_layer, pid)
-            try:
-                setattr(to_layer, pid, value)
-            except Exception as e:
-                retry_props.append(pid)
+        # Every property update would rebuild the node tree, rebuild it once instead
+        with deferred_node_tree_updates():
+            for prop in from_layer.bl_rna.properties:
+                pid = getattr(prop, 'identifier', '')
+                if not pid or getattr(prop, 'is_readonly', False):
+                    continue
+                if pid in ignore_props:
+                    continue
+                value = getattr(from_layer, pid)
+                try:
+                    setattr(to_layer, pid, value)
+                except Exception as e:
+                    retry_props.append(pid)
         # If some properties failed, force update_node_tree first and then apply the properties again
         failed_props = []
         if retry_props:
@@ -1649,59 +1662,339 @@ def restore_cycles_settings(settings):
     scene.cycles.use_denoising = settings['use_denoising']
     scene.cycles.use_adaptive_sampling = settings['use_adaptive_sampling']
 
+_cycles_session_depth = 0
+
+@contextmanager
+def cycles_bake_session(context, use_gpu=True):
+    """Switch the scene to the Cycles bake settings, restoring them when the outermost session exits.
+
+    ps_bake_outputs opens a session itself, so wrapping several bakes in one only pays the
+    settings switch once.
+    """
+    global _cycles_session_depth
+    if _cycles_session_depth:
+        _cycles_session_depth += 1
+        try:
+            yield
+        finally:
+            _cycles_session_depth -= 1
+        return
+    
+    cycles_settings = save_cycles_settings()
+    orig_view_transform = str(context.scene.view_settings.view_transform)
+    # Switch to Cycles if needed
+    if context.scene.render.engine != 'CYCLES':
+        context.scene.render.engine = 'CYCLES'
+    context.scene.view_settings.view_transform = "Standard"
+    cycles = context.scene.cycles
+    cycles.device = 'GPU' if use_gpu else 'CPU'
+    cycles.samples = 1
+    cycles.use_denoising = False
+    cycles.use_adaptive_sampling = False
+    _cycles_session_depth = 1
+    try:
+        yield
+    finally:
+        _cycles_session_depth = 0
+        context.scene.view_settings.view_transform = orig_view_transform
+        restore_cycles_settings(cycles_settings)
+
 def ps_bake(context, objects: list[Object], mat: Material, uv_layer, bake_image, use_gpu=True, use_clear=True, margin=8, margin_type='ADJACENT_FACES'):
+    return ps_bake_outputs(context, objects, mat, uv_layer, [(None, bake_image)], use_gpu, use_clear, margin, margin_type)[0]
+
+def ps_bake_outputs(
+        context,
+        objects: list[Object],
+        mat: Material,
+        uv_layer,
+        outputs: list[tuple[Optional[NodeSocket], Image]],
+        use_gpu=True,
+        use_clear=True,
+        margin=8,
+        margin_type='ADJACENT_FACES'
+    ) -> list[Image]:
+    """Bake several shader outputs of a material with a single Cycles setup.
+
+    Args:
+        context (Context): The context
+        objects (list[Object]): The objects to bake
+        mat (Material): The material
+        uv_layer (str): The UV layer
+        outputs (list[tuple[Optional[NodeSocket], Image]]): The sockets to connect to the material
+            output surface and the image to bake each of them into. A socket of None bakes the
+            surface as it is connected.
+
+    Returns:
+        list[Image]: The baked images, in the order of outputs
+    """
     bake_objects = []
     
-    ensure_udim_tiles(bake_image, objects, uv_layer)
+    for _, bake_image in outputs:
+        ensure_udim_tiles(bake_image, objects, uv_layer)
     
     for obj in objects:
         if mat.name in obj.data.materials:
             bake_objects.append(obj)
     
-    cycles_settings = save_cycles_settings()
-    # Switch to Cycles if needed
-    
-    orig_view_transform = str(context.scene.view_settings.view_transform)
-    
     node_tree = mat.node_tree
+    surface_socket = None
+    if any(socket is not None for socket, _ in outputs):
+        surface_socket = get_material_output(node_tree).inputs['Surface']
     
     image_node = node_tree.nodes.new(type='ShaderNodeTexImage')
-    image_node.image = bake_image
-    with context.temp_override(active_object=bake_objects[0], selected_objects=bake_objects):
+    with cycles_bake_session(context, use_gpu), context.temp_override(active_object=bake_objects[0], selected_objects=bake_objects):
         bake_params = {
             "type": 'EMIT',
             "margin": margin,
             "margin_type": margin_type,
         }
-        if context.scene.render.engine != 'CYCLES':
-            context.scene.render.engine = 'CYCLES'
-        context.scene.view_settings.view_transform = "Standard"
         cycles = context.scene.cycles
-        cycles.device = 'GPU' if use_gpu else 'CPU'
-        cycles.samples = 1
-        cycles.use_denoising = False
-        cycles.use_adaptive_sampling = False
         for node in node_tree.nodes:
             node.select = False
 
         image_node.select = True
         node_tree.nodes.active = image_node
-        try:
-            bpy.ops.object.bake(**bake_params, uv_layer=uv_layer, use_clear=use_clear)
-        except Exception as e:
-            # Try baking with CPU if GPU fails
-            logger.debug(f"GPU baking failed, trying CPU")
-            cycles.device = 'CPU'
-            bpy.ops.object.bake(**bake_params, uv_layer=uv_layer, use_clear=use_clear)
+        for socket, bake_image in outputs:
+            if socket is not None:
+                connect_sockets(surface_socket, socket)
+            image_node.image = bake_image
+            try:
+                bpy.ops.object.bake(**bake_params, uv_layer=uv_layer, use_clear=use_clear)
+            except Exception as e:
+                # Try baking with CPU if GPU fails
+                logger.debug(f"GPU baking failed, trying CPU")
+                cycles.device = 'CPU'
+                bpy.ops.object.bake(**bake_params, uv_layer=uv_layer, use_clear=use_clear)
 
     # Delete bake nodes
     node_tree.nodes.remove(image_node)
-    
-    context.scene.view_settings.view_transform = orig_view_transform
-    
-    restore_cycles_settings(cycles_settings)
 
-    return bake_image
+    return [bake_image for _, bake_image in outputs]
+
+def prepare_bake_context(context: Context):
+    """Make the paint system mesh the active object if it is not, and return the parsed context."""
+    ps_context = parse_context(context)
+    if context.active_object and ps_context.active_object.type != "MESH" and ps_context.ps_object.type == "MESH":
+        # Change the active object to the ps_object
+        ps_context.active_object.select_set(False)
+        ps_context.ps_object.select_set(True)
+        context.view_layer.objects.active = ps_context.ps_object
+        ps_context = parse_context(context)
+    return ps_context
+
+DEFORM_MODIFIER_TYPES = {
+    'ARMATURE', 'CAST', 'CURVE', 'DISPLACE', 'HOOK', 'LAPLACIANDEFORM',
+    'LATTICE', 'MESH_DEFORM', 'SHRINKWRAP', 'SIMPLE_DEFORM', 'SMOOTH',
+    'CORRECTIVE_SMOOTH', 'LAPLACIANSMOOTH', 'SURFACE_DEFORM', 'WARP', 'WAVE'
+}
+
+def disable_deform_modifiers_for_bake(objects: list[Object]) -> list[tuple[Object, str, bool]]:
+    """Hide the deform modifiers of the objects from render, see restore_deform_modifiers."""
+    saved_modifier_states = []
+    for obj in objects:
+        for mod in obj.modifiers:
+            if mod.type in DEFORM_MODIFIER_TYPES:
+                saved_modifier_states.append((obj, mod.name, mod.show_render))
+                mod.show_render = False
+    return saved_modifier_states
+
+def restore_deform_modifiers(saved_modifier_states: list[tuple[Object, str, bool]]):
+    for obj, mod_name, orig_show_render in saved_modifier_states:
+        if mod_name in obj.modifiers:
+            obj.modifiers[mod_name].show_render = orig_show_render
+
+def create_alpha_bake_image(bake_image: Image, objects: list[Object], uv_layer: str) -> Image:
+    """Create the image the alpha pass of bake_image is baked into.
+
+    A fresh image rather than a copy of bake_image, to skip duplicating its pixels.
+    """
+    alpha_image = create_ps_image(
+        f"{bake_image.name} Alpha",
+        *bake_image.size,
+        use_udim_tiles=bake_image.source == 'TILED',
+        objects=objects,
+        uv_layer_name=uv_layer,
+        use_float=bake_image.is_float
+    )
+    alpha_image.colorspace_settings.name = 'Non-Color'
+    return alpha_image
+
+def apply_baked_alpha(bake_image: Image, alpha_image: Optional[Image]):
+    """Copy the baked alpha pass into the alpha of bake_image, save it and remove the alpha image."""
+    if alpha_image is None:
+        save_image(bake_image)
+        return
+    try:
+        pixels_bake = blender_image_to_numpy(bake_image)
+        pixels_alpha = blender_image_to_numpy(alpha_image)
+        if pixels_bake is None or pixels_alpha is None:
+            return
+        
+        # Process tiles - handle both UDIM and non-UDIM cases
+        alpha_single = pixels_alpha.get_single_tile()
+        
+        # Update alpha channel for each tile in bake_image
+        for tile_num, bake_tile in pixels_bake.tiles.items():
+            # Use corresponding tile if available, otherwise use single tile
+            alpha_tile = pixels_alpha.tiles.get(tile_num, alpha_single)
+            bake_tile[:, :, 3] = alpha_tile[:, :, 0]
+        
+        set_image_pixels(bake_image, pixels_bake)
+        save_image(bake_image)
+    finally:
+        bpy.data.images.remove(alpha_image)
+
+@dataclass
+class ChannelBake:
+    """A channel to bake into an image."""
+    material: Material
+    channel: "Channel"
+    bake_image: Image
+    uv_layer: str
+    # Set by bake_channel_batches once bake_image holds the bake, baked or cached
+    is_baked: bool = False
+    is_cached: bool = False
+
+@dataclass
+class BakeBatch:
+    """Channel bakes sharing a material (so the same objects), UV map and resolution."""
+    material: Material
+    uv_layer: str
+    size: tuple[int, int]
+    bakes: List[ChannelBake] = field(default_factory=list)
+
+@dataclass
+class BakeTimings:
+    """Time spent in each phase of bake_channel_batches, in seconds."""
+    prepare: float = 0.0
+    bake: float = 0.0
+    finish: float = 0.0
+    batches: int = 0
+    passes: int = 0
+    cached: int = 0
+    
+    def summary(self) -> str:
+        return (
+            f"{self.batches} batches, {self.passes} passes, {self.cached} cached: "
+            f"prepare {round(self.prepare, 2)}s, bake {round(self.bake, 2)}s, finish {round(self.finish, 2)}s"
+        )
+
+def plan_bake_batches(bakes: list[ChannelBake]) -> list[BakeBatch]:
+    """Group channel bakes into batches that can share a single ps_bake_outputs call."""
+    batches: Dict[tuple, BakeBatch] = {}
+    for bake in bakes:
+        size = tuple(bake.bake_image.size)
+        key = (bake.material.name, bake.uv_layer, size)
+        batch = batches.get(key)
+        if batch is None:
+            batch = batches[key] = BakeBatch(material=bake.material, uv_layer=bake.uv_layer, size=size)
+        batch.bakes.append(bake)
+    return list(batches.values())
+
+def bake_channel_batches(
+        context: Context,
+        batches: list[BakeBatch],
+        use_gpu: bool = True,
+        margin: int = 8,
+        margin_type: Literal['ADJACENT_FACES', 'EXTEND'] = "ADJACENT_FACES",
+        use_cache: bool = False,
+    ) -> BakeTimings:
+    """Bake every channel of the batches, like Channel.bake with the group tree and forced alpha.
+
+    The Cycles settings are switched once for all batches, the channel trees of a batch are
+    rebuilt once for all its channels and each batch bakes all its passes in a single
+    ps_bake_outputs call. With use_cache, channels whose image is up to date are skipped.
+
+    Returns:
+        BakeTimings: The time spent preparing, baking and finishing (alpha and cleanup).
+    """
+    timings = BakeTimings()
+    ps_context = prepare_bake_context(context)
+    ps_objects = ps_context.ps_objects
+    preview_channel = ps_context.active_channel if ps_context.ps_mat_data.preview_channel else None
+    if preview_channel:
+        preview_channel.isolate_channel(context)
+    
+    try:
+        with cycles_bake_session(context, use_gpu):
+            for batch in batches:
+                phase_start = time.time()
+                mat = batch.material
+                node_tree = mat.node_tree
+                bake_hashes = {}
+                if use_cache:
+                    for bake in list(batch.bakes):
+                        bake_hash = get_channel_bake_hash(
+                            context, bake.channel, mat, ps_objects, bake.bake_image, batch.uv_layer,
+                            use_group_tree=True,
+                            force_alpha=True,
+                            as_tangent_normal=False,
+                            tangent_uv_map="",
+                            margin=margin,
+                            margin_type=margin_type,
+                            disable_deform_modifiers=False,
+                        )
+                        if is_bake_cached(bake.bake_image, bake_hash):
+                            batch.bakes.remove(bake)
+                            bake.is_baked = True
+                            bake.is_cached = True
+                            timings.cached += 1
+                        else:
+                            bake_hashes[bake.bake_image.name] = bake_hash
+                if not batch.bakes:
+                    timings.prepare += time.time() - phase_start
+                    continue
+                surface_socket = get_material_output(node_tree).inputs['Surface']
+                from_socket = surface_socket.links[0].from_socket if surface_socket.links else None
+                with deferred_node_tree_updates(context):
+                    saved_settings = [bake.channel._override_bake_settings(True, False) for bake in batch.bakes]
+                
+                to_be_deleted_nodes = []
+                pending_alpha = []
+                try:
+                    outputs = []
+                    for bake in batch.bakes:
+                        color_output, alpha_output, nodes = bake.channel._get_bake_outputs(mat, True)
+                        to_be_deleted_nodes.extend(nodes)
+                        alpha_image = create_alpha_bake_image(bake.bake_image, ps_objects, batch.uv_layer)
+                        pending_alpha.append((bake.bake_image, alpha_image))
+                        outputs.extend(((color_output, bake.bake_image), (alpha_output, alpha_image)))
+                    timings.prepare += time.time() - phase_start
+                    
+                    phase_start = time.time()
+                    ps_bake_outputs(context, ps_objects, mat, batch.uv_layer, outputs, use_gpu, margin=margin, margin_type=margin_type)
+                    timings.bake += time.time() - phase_start
+                    timings.batches += 1
+                    timings.passes += len(outputs)
+                    
+                    phase_start = time.time()
+                    while pending_alpha:
+                        bake_image, alpha_image = pending_alpha.pop(0)
+                        apply_baked_alpha(bake_image, alpha_image)
+                        store_bake_hash(bake_image, bake_hashes.get(bake_image.name))
+                    for bake in batch.bakes:
+                        bake.is_baked = True
+                except Exception as e:
+                    logger.error(f"Error baking material {mat.name}: {e}")
+                    for bake in batch.bakes:
+                        clear_bake_hash(bake.bake_image)
+                    phase_start = time.time()
+                finally:
+                    for _, alpha_image in pending_alpha:
+                        bpy.data.images.remove(alpha_image)
+                    for node in to_be_deleted_nodes:
+                        node_tree.nodes.remove(node)
+                    if from_socket:
+                        connect_sockets(surface_socket, from_socket)
+                    with deferred_node_tree_updates(context):
+                        for bake, saved in zip(batch.bakes, saved_settings):
+                            bake.channel._restore_bake_settings(saved)
+                    timings.finish += time.time() - phase_start
+    finally:
+        if preview_channel:
+            preview_channel.isolate_channel(context)
+    logger.debug(f"Baked channels: {timings.summary()}")
+    return timings
 
 def vector_transform(node_builder: NodeTreeBuilder, color_name: str, color_socket: str, convert_from: str, convert_to: str, normalize_input: bool, normalize_output: bool, vector_type: str, tangent_uv: str= "UVMap"):
     """Transform the vector output of the channel to the output vector space.
@@ -1804,14 +2097,18 @@ class Channel(BaseNestedListManager):
     def update_node_tree(self, context:Context):
         if not self.node_tree:
             return
-        _invalidate_material_layer_cache(parse_context(context).active_material)
-        
-        self.node_tree.name = f"PS {self.name}"
+        # The interface is always created right away so group graphs can use it
         if len(self.node_tree.interface.items_tree) == 0:
             self.node_tree.interface.new_socket("Color", in_out="OUTPUT", socket_type="NodeSocketColor")
             self.node_tree.interface.new_socket("Alpha", in_out="OUTPUT", socket_type="NodeSocketFloat")
             self.node_tree.interface.new_socket("Color", in_out="INPUT", socket_type="NodeSocketColor")
             self.node_tree.interface.new_socket("Alpha", in_out="INPUT", socket_type="NodeSocketFloat")
+        if is_deferring():
+            mark_channel_dirty(self)
+            return
+        _invalidate_material_layer_cache(parse_context(context).active_material)
+        
+        self.node_tree.name = f"PS {self.name}"
         node_builder = NodeTreeBuilder(self.node_tree, frame_name="Channel Graph", node_width=200)
         node_builder.add_node("group_input", "NodeGroupInput")
         node_builder.add_node("group_output", "NodeGroupOutput")
@@ -1873,7 +2170,8 @@ class Channel(BaseNestedListManager):
             if self.use_bake_image:
                 node_builder.link("bake_image", previous_data.color_name, "Color", previous_data.color_socket)
                 node_builder.link("bake_image", "group_output", "Alpha", "Alpha")
-                node_builder.compile()
+                if node_builder.compile().tree_changed:
+                    self.mark_bake_dirty()
                 return
             
         if len(flattened_unlinked_layers) > 0:
@@ -1983,7 +2281,8 @@ class Channel(BaseNestedListManager):
         node_builder.add_node("alpha_clamp_start", "ShaderNodeClamp", {"hide": True})
         node_builder.link("alpha_clamp_start", prev_layer.alpha_name, "Result", prev_layer.alpha_socket)
         node_builder.link("group_input", "alpha_clamp_start", "Alpha", "Value")
-        node_builder.compile()
+        if node_builder.compile().tree_changed:
+            self.mark_bake_dirty()
     
     def update_channel_name(self, context):
         """Update the channel name to ensure uniqueness."""
@@ -2086,6 +2385,55 @@ class Channel(BaseNestedListManager):
         for layer in layers:
             self.delete_layer(context, layer)
     
+    def _override_bake_settings(self, force_alpha: bool, as_tangent_normal: bool) -> dict:
+        """Switch the channel to its bake settings.
+
+        Returns:
+            dict: The original values, to pass to _restore_bake_settings.
+        """
+        saved = {}
+        if force_alpha:
+            saved['use_alpha'] = bool(self.use_alpha)
+            self.use_alpha = True
+        if as_tangent_normal:
+            saved['tangent_uv_map'] = str(self.tangent_uv_map)
+            saved['output_vector_space'] = str(self.output_vector_space)
+            self.tangent_uv_map = self.bake_uv_map
+            self.output_vector_space = "TANGENT"
+        else:
+            saved['disable_output_transform'] = bool(self.disable_output_transform)
+            self.disable_output_transform = True
+        return saved
+    
+    def _restore_bake_settings(self, saved: dict):
+        for prop_name, value in saved.items():
+            if getattr(self, prop_name) != value:
+                setattr(self, prop_name, value)
+    
+    def _get_bake_outputs(self, mat: Material, use_group_tree: bool) -> tuple[NodeSocket, Optional[NodeSocket], list[Node]]:
+        """Find the sockets outputting the channel colour and alpha in the material.
+
+        Returns:
+            tuple[NodeSocket, Optional[NodeSocket], list[Node]]: The colour and alpha sockets, and
+                the nodes added to the material to expose them, to be removed after baking.
+        """
+        node_tree = mat.node_tree
+        if hasattr(mat, "ps_mat_data") and mat.ps_mat_data.groups and use_group_tree:
+            # Bake as output of group ps if exists in the node tree
+            for group in mat.ps_mat_data.groups:
+                if group.node_tree and self.name in group.channels:
+                    bake_node = find_node(node_tree, {'bl_idname': 'ShaderNodeGroup', 'node_tree': group.node_tree})
+                    if not bake_node:
+                        break
+                    alpha_output = bake_node.outputs[f'{self.name} Alpha'] if self.use_alpha else None
+                    return bake_node.outputs[self.name], alpha_output, []
+        
+        # Use channel node group instead
+        bake_node = node_tree.nodes.new(type='ShaderNodeGroup')
+        bake_node.node_tree = self.node_tree
+        alpha_output = bake_node.outputs['Alpha'] if self.use_alpha else None
+        return bake_node.outputs['Color'], alpha_output, [bake_node]
+    
     def bake(
             self,
             context: Context,
@@ -2099,6 +2447,7 @@ class Channel(BaseNestedListManager):
             margin: int = 8, # Margin
             margin_type: Literal['ADJACENT_FACES', 'EXTEND'] = "ADJACENT_FACES", # Margin type
             disable_deform_modifiers: bool = False, # Disable deform modifiers
+            use_cache: bool = False, # Skip the bake if nothing changed since the last one
             ):
         """Bake the channel
 
@@ -2109,6 +2458,12 @@ class Channel(BaseNestedListManager):
             uv_layer (str): The UV layer
             use_gpu (bool, optional): Whether to use the GPU. Defaults to True.
             use_group_tree (bool, optional): Whether to use the group tree if found. Defaults to True.
+            use_cache (bool, optional): Keep bake_image as it is if it already holds a bake with the
+                same inputs, see bake_cache. Defaults to False.
+
+        Returns:
+            bool: True if bake_image holds the bake of the channel, either baked now or
+                already up to date. False if the bake failed.
 
         Raises:
             ValueError: If the node tree is not found
@@ -2116,120 +2471,57 @@ class Channel(BaseNestedListManager):
         node_tree = mat.node_tree
         if not node_tree:
             raise ValueError("Node tree not found")
-        ps_context = parse_context(context)
-        
-        if context.active_object and ps_context.active_object.type != "MESH" and ps_context.ps_object.type == "MESH":
-            # Change the active object to the ps_object
-            ps_context.active_object.select_set(False)
-            ps_context.ps_object.select_set(True)
-            context.view_layer.objects.active = ps_context.ps_object
-        
-        ps_context = parse_context(context)
+        ps_context = prepare_bake_context(context)
         
         orig_preview_channel = False
         if ps_context.ps_mat_data.preview_channel:
             orig_preview_channel = bool(ps_context.ps_mat_data.preview_channel)
             self.isolate_channel(context)
         
-        if force_alpha:
-            orig_use_alpha = bool(self.use_alpha)
-            self.use_alpha = True
-            
-        if as_tangent_normal:
-            orig_tangent_uv_map = str(self.tangent_uv_map)
-            self.tangent_uv_map = self.bake_uv_map
-            orig_output_vector_space = str(self.output_vector_space)
-            self.output_vector_space = "TANGENT"
-        else:
-            orig_disable_output_transform = bool(self.disable_output_transform)
-            self.disable_output_transform = True
+        ps_objects = ps_context.ps_objects
+        bake_hash = None
+        if use_cache:
+            bake_hash = get_channel_bake_hash(
+                context, self, mat, ps_objects, bake_image, uv_layer,
+                use_group_tree=use_group_tree,
+                force_alpha=force_alpha,
+                as_tangent_normal=as_tangent_normal,
+                tangent_uv_map=self.bake_uv_map if as_tangent_normal else "",
+                margin=margin,
+                margin_type=margin_type,
+                disable_deform_modifiers=disable_deform_modifiers,
+            )
+            if is_bake_cached(bake_image, bake_hash):
+                logger.info(f"Channel {self.name} is unchanged since it was baked into {bake_image.name}, skipping")
+                if orig_preview_channel:
+                    self.isolate_channel(context)
+                return True
+        
+        saved_settings = self._override_bake_settings(force_alpha, as_tangent_normal)
+        saved_modifier_states = disable_deform_modifiers_for_bake(ps_objects) if disable_deform_modifiers else []
+        
+        surface_socket = get_material_output(node_tree).inputs['Surface']
+        from_socket = surface_socket.links[0].from_socket if surface_socket.links else None
+        to_be_deleted_nodes = []
+        is_baked = False
         try:
-            ps_objects = ps_context.ps_objects
-            
-            # Disable deform modifiers if requested
-            saved_modifier_states = []
-            if disable_deform_modifiers:
-                DEFORM_MODIFIER_TYPES = {
-                    'ARMATURE', 'CAST', 'CURVE', 'DISPLACE', 'HOOK', 'LAPLACIANDEFORM',
-                    'LATTICE', 'MESH_DEFORM', 'SHRINKWRAP', 'SIMPLE_DEFORM', 'SMOOTH',
-                    'CORRECTIVE_SMOOTH', 'LAPLACIANSMOOTH', 'SURFACE_DEFORM', 'WARP', 'WAVE'
-                }
-                for obj in ps_objects:
-                    for mod in obj.modifiers:
-                        if mod.type in DEFORM_MODIFIER_TYPES:
-                            saved_modifier_states.append((obj, mod.name, mod.show_render))
-                            mod.show_render = False
-            
-            material_output = get_material_output(node_tree)
-            surface_socket = material_output.inputs['Surface']
-            from_socket = surface_socket.links[0].from_socket if surface_socket.links else None
-            
-            # Bake as output of group ps if exists in the node tree
-            bake_node = None
-            to_be_deleted_nodes = []
-            color_output = None
-            alpha_output = None
-            
-            if not self.use_alpha:
-                # Use the value node set to 1 as alpha output
-                value_node = node_tree.nodes.new('ShaderNodeValue')
-                value_node.outputs['Value'].default_value = 1.0
-                alpha_output = value_node.outputs['Value']
-                to_be_deleted_nodes.append(value_node)
-            
-            if hasattr(mat, "ps_mat_data") and mat.ps_mat_data.groups and use_group_tree:
-                for group in mat.ps_mat_data.groups:
-                    if group.node_tree and self.name in group.channels:
-                        bake_node = find_node(node_tree, {'bl_idname': 'ShaderNodeGroup', 'node_tree': group.node_tree})
-                        color_output = bake_node.outputs[self.name]
-                        if self.use_alpha:
-                            alpha_output = bake_node.outputs[f'{self.name} Alpha']
-                        break
-            
-            if not bake_node:
-                # Use channel node group instead
-                bake_node = node_tree.nodes.new(type='ShaderNodeGroup')
-                bake_node.node_tree = self.node_tree
-                color_output = bake_node.outputs['Color']
-                if self.use_alpha:
-                    alpha_output = bake_node.outputs['Alpha']
-                to_be_deleted_nodes.append(bake_node)
-            
-            # Bake image
-            connect_sockets(surface_socket, color_output)
-            temp_alpha_image = bake_image.copy()
-            bake_image = ps_bake(context, ps_objects, mat, uv_layer, bake_image, use_gpu, margin=margin, margin_type=margin_type)
-            
-            temp_alpha_image.colorspace_settings.name = 'Non-Color'
-            connect_sockets(surface_socket, alpha_output)
-            temp_alpha_image = ps_bake(context, ps_objects, mat, uv_layer, temp_alpha_image, use_gpu, margin=margin, margin_type=margin_type)
-
-            if bake_image and temp_alpha_image:
-                # pixels_bake = np.empty(len(bake_image.pixels), dtype=np.float32)
-                # pixels_temp_alpha = np.empty(len(temp_alpha_image.pixels), dtype=np.float32)
-                pixels_bake = blender_image_to_numpy(bake_image)
-                pixels_temp_alpha = blender_image_to_numpy(temp_alpha_image)
-                
-                if pixels_bake is None or pixels_temp_alpha is None:
-                    return
-                
-                # Process tiles - handle both UDIM and non-UDIM cases
-                temp_alpha_single = pixels_temp_alpha.get_single_tile()
-                
-                # Update alpha channel for each tile in bake_image
-                for tile_num in pixels_bake.tiles.keys():
-                    bake_tile = pixels_bake.tiles[tile_num]
-                    # Use corresponding tile if available, otherwise use single tile
-                    if tile_num in pixels_temp_alpha.tiles:
-                        temp_tile = pixels_temp_alpha.tiles[tile_num]
-                        bake_tile[:, :, 3] = temp_tile[:, :, 0]
-                    else:
-                        bake_tile[:, :, 3] = temp_alpha_single[:, :, 0]
-                
-                set_image_pixels(bake_image, pixels_bake)
-                save_image(bake_image)
-            bpy.data.images.remove(temp_alpha_image)
-
+            color_output, alpha_output, to_be_deleted_nodes = self._get_bake_outputs(mat, use_group_tree)
+            outputs = [(color_output, bake_image)]
+            temp_alpha_image = None
+            if self.use_alpha:
+                # Emission bakes only carry RGB, so alpha needs its own pass
+                temp_alpha_image = create_alpha_bake_image(bake_image, ps_objects, uv_layer)
+                outputs.append((alpha_output, temp_alpha_image))
+            # Without alpha, the colour bake already writes it as opaque inside
+            # the baked area and transparent outside
+            ps_bake_outputs(context, ps_objects, mat, uv_layer, outputs, use_gpu, margin=margin, margin_type=margin_type)
+            apply_baked_alpha(bake_image, temp_alpha_image)
+            store_bake_hash(bake_image, bake_hash)
+            is_baked = True
+        except Exception as e:
+            logger.error(f"Error baking channel: {e}")
+            clear_bake_hash(bake_image)
+        finally:
             for node in to_be_deleted_nodes:
                 node_tree.nodes.remove(node)
             
@@ -2237,35 +2529,16 @@ class Channel(BaseNestedListManager):
             if from_socket:
                 connect_sockets(surface_socket, from_socket)
             
-            if force_alpha:
-                self.use_alpha = orig_use_alpha
-                
-            if as_tangent_normal:
-                self.tangent_uv_map = orig_tangent_uv_map
-                self.output_vector_space = orig_output_vector_space
-            else:
-                self.disable_output_transform = orig_disable_output_transform
+            try:
+                self._restore_bake_settings(saved_settings)
+            except Exception as e:
+                logger.error(f"Error restoring channel settings: {e}")
             
             if orig_preview_channel:
                 self.isolate_channel(context)
             
-            # Restore deform modifiers
-            for obj, mod_name, orig_show_render in saved_modifier_states:
-                if mod_name in obj.modifiers:
-                    obj.modifiers[mod_name].show_render = orig_show_render
-        except Exception as e:
-            logger.error(f"Error baking channel: {e}")
-            try:
-                self.use_alpha = orig_use_alpha
-                self.tangent_uv_map = orig_tangent_uv_map
-                self.output_vector_space = orig_output_vector_space
-                self.disable_output_transform = orig_disable_output_transform
-            except Exception as e:
-                logger.error(f"Error restoring channel settings: {e}")
-            # Restore deform modifiers on error
-            for obj, mod_name, orig_show_render in saved_modifier_states:
-                if mod_name in obj.modifiers:
-                    obj.modifiers[mod_name].show_render = orig_show_render
+            restore_deform_modifiers(saved_modifier_states)
+        return is_baked
         
     @property
     def item_type(self):
@@ -2297,11 +2570,11 @@ class Channel(BaseNestedListManager):
     
     @property
     def flattened_layers(self):
-        return [layer.get_layer_data() for layer, _ in self.flatten_hierarchy()]
+        return [layer.get_layer_data() for layer in self.flattened_unlinked_layers]
 
     @property
     def flattened_unlinked_layers(self):
-        return [layer for layer, _ in self.flatten_hierarchy()]
+        return self.get_flattened_items()
     
     active_index: IntProperty(name="Active Material Layer Index", update=update_active_image)
     def update_type(self, context):
@@ -2473,6 +2746,16 @@ class Channel(BaseNestedListManager):
         default='OBJECT',
         update=update_bake_image
     )
+    bake_dirty: BoolProperty(
+        name="Changed Since Bake",
+        description="The channel, its images or its meshes changed since it was last baked into its bake image",
+        default=True
+    )
+    
+    def mark_bake_dirty(self):
+        # Avoid tagging the material for an update when nothing changes
+        if not self.bake_dirty:
+            self.bake_dirty = True
     
     def get_movement_menu_items(self, item_id, direction):
         """
@@ -2576,6 +2859,11 @@ class Group(PropertyGroup):
         ensure_sockets(node_tree, expected_sockets, "OUTPUT")
         ensure_sockets(node_tree, expected_sockets, "INPUT")
         
+        # Sockets are kept up to date so callers can link the group node right away
+        if is_deferring():
+            mark_group_dirty(self)
+            return
+        
         node_builder = NodeTreeBuilder(self.node_tree, frame_name="Group Graph", clear=True)
         node_builder.add_node("group_input", "NodeGroupInput")
         node_builder.add_node("group_output", "NodeGroupOutput")
@@ -2651,6 +2939,7 @@ class Group(PropertyGroup):
         channels = self.channels
         node_tree = bpy.data.node_groups.new(name=f"Temp Channel Name", type='ShaderNodeTree')
         new_channel = channels.add()
+        bump_collection_revision()
         self.active_index = len(channels) - 1
         unique_name = get_next_unique_name(channel_name, [channel.name for channel in channels])
         new_channel.name = unique_name
@@ -2669,65 +2958,67 @@ class Group(PropertyGroup):
         template: str,
         add_layers: bool = True
     ):
-        ps_ctx = parse_context(context)
-        mat = ps_ctx.active_material
-        mat_node_tree = mat.node_tree
-        node_group = ps_ctx.active_group.get_group_node(mat_node_tree)
-        to_node = find_node(mat_node_tree, {'bl_idname': 'ShaderNodeBsdfPrincipled'})
-        if not to_node:
-            to_node = find_node(mat_node_tree, {'bl_idname': 'ShaderNodeBsdfDiffuse'})
-        match template:
-            case "COLOR":
-                channel = self.create_channel(context, channel_name='Color', channel_type='COLOR', use_alpha=True)
-                if node_group and to_node:
-                    color_socket = find_socket_on_node(to_node, 'Base Color')
-                    # Color
-                    if not color_socket:
-                        color_socket = find_socket_on_node(to_node, 'Color')
-                    if color_socket:
-                        transfer_connection(mat_node_tree, color_socket, node_group.inputs['Color'])
-                        connect_sockets(node_group.outputs['Color'], color_socket)
-                    # Alpha
-                    alpha_socket = find_socket_on_node(to_node, 'Alpha')
-                    if alpha_socket:
-                        transfer_connection(mat_node_tree, alpha_socket, node_group.inputs['Color Alpha'])
-                        connect_sockets(node_group.outputs['Color Alpha'], alpha_socket)
-                    else:
-                        # Disable alpha
-                        channel.use_alpha = False
-                if add_layers:
-                    channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
-                return channel
-            case "METALLIC":
-                channel = self.create_channel(context, channel_name='Metallic', channel_type='FLOAT', use_alpha=False, use_max_min=True, color_space='NONCOLOR')
-                if node_group and to_node:
-                    metallic_socket = find_socket_on_node(to_node, 'Metallic')
-                    if metallic_socket:
-                        transfer_connection(mat_node_tree, metallic_socket, node_group.inputs['Metallic'])
-                        connect_sockets(node_group.outputs['Metallic'], metallic_socket)
-                return channel
-            case "ROUGHNESS":
-                channel = self.create_channel(context, channel_name='Roughness', channel_type='FLOAT', use_alpha=False, use_max_min=True, color_space='NONCOLOR')
-                if node_group and to_node:
-                    roughness_socket = find_socket_on_node(to_node, 'Roughness')
-                    if roughness_socket:
-                        transfer_connection(mat_node_tree, roughness_socket, node_group.inputs['Roughness'])
-                        connect_sockets(node_group.outputs['Roughness'], roughness_socket)
-                return channel
-            case "NORMAL":
-                socket_transferred = False
-                channel = self.create_channel(context, channel_name='Normal', channel_type='VECTOR', use_alpha=False, normalize_input=True, color_space='NONCOLOR', default_value='NORMAL', use_space_transform_input=True, use_space_transform_output=True)
-                if node_group and to_node:
-                    normal_socket = find_socket_on_node(to_node, 'Normal')
-                    if normal_socket:
-                        socket_transferred = transfer_connection(mat_node_tree, to_node.inputs['Normal'], node_group.inputs['Normal'])
-                        connect_sockets(node_group.outputs['Normal'], normal_socket)
-                if add_layers:
-                    if not socket_transferred:
-                        channel.create_layer(context, layer_name='Normal', layer_type='GEOMETRY', geometry_type='OBJECT_NORMAL', normalize_normal=True)
-                    channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
-            case _:
-                raise ValueError(f"Invalid template: {template}")
+        # Rebuild the new channel, its layers and the group once at the end
+        with deferred_node_tree_updates(context):
+            ps_ctx = parse_context(context)
+            mat = ps_ctx.active_material
+            mat_node_tree = mat.node_tree
+            node_group = ps_ctx.active_group.get_group_node(mat_node_tree)
+            to_node = find_node(mat_node_tree, {'bl_idname': 'ShaderNodeBsdfPrincipled'})
+            if not to_node:
+                to_node = find_node(mat_node_tree, {'bl_idname': 'ShaderNodeBsdfDiffuse'})
+            match template:
+                case "COLOR":
+                    channel = self.create_channel(context, channel_name='Color', channel_type='COLOR', use_alpha=True)
+                    if node_group and to_node:
+                        color_socket = find_socket_on_node(to_node, 'Base Color')
+                        # Color
+                        if not color_socket:
+                            color_socket = find_socket_on_node(to_node, 'Color')
+                        if color_socket:
+                            transfer_connection(mat_node_tree, color_socket, node_group.inputs['Color'])
+                            connect_sockets(node_group.outputs['Color'], color_socket)
+                        # Alpha
+                        alpha_socket = find_socket_on_node(to_node, 'Alpha')
+                        if alpha_socket:
+                            transfer_connection(mat_node_tree, alpha_socket, node_group.inputs['Color Alpha'])
+                            connect_sockets(node_group.outputs['Color Alpha'], alpha_socket)
+                        else:
+                            # Disable alpha
+                            channel.use_alpha = False
+                    if add_layers:
+                        channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
+                    return channel
+                case "METALLIC":
+                    channel = self.create_channel(context, channel_name='Metallic', channel_type='FLOAT', use_alpha=False, use_max_min=True, color_space='NONCOLOR')
+                    if node_group and to_node:
+                        metallic_socket = find_socket_on_node(to_node, 'Metallic')
+                        if metallic_socket:
+                            transfer_connection(mat_node_tree, metallic_socket, node_group.inputs['Metallic'])
+                            connect_sockets(node_group.outputs['Metallic'], metallic_socket)
+                    return channel
+                case "ROUGHNESS":
+                    channel = self.create_channel(context, channel_name='Roughness', channel_type='FLOAT', use_alpha=False, use_max_min=True, color_space='NONCOLOR')
+                    if node_group and to_node:
+                        roughness_socket = find_socket_on_node(to_node, 'Roughness')
+                        if roughness_socket:
+                            transfer_connection(mat_node_tree, roughness_socket, node_group.inputs['Roughness'])
+                            connect_sockets(node_group.outputs['Roughness'], roughness_socket)
+                    return channel
+                case "NORMAL":
+                    socket_transferred = False
+                    channel = self.create_channel(context, channel_name='Normal', channel_type='VECTOR', use_alpha=False, normalize_input=True, color_space='NONCOLOR', default_value='NORMAL', use_space_transform_input=True, use_space_transform_output=True)
+                    if node_group and to_node:
+                        normal_socket = find_socket_on_node(to_node, 'Normal')
+                        if normal_socket:
+                            socket_transferred = transfer_connection(mat_node_tree, to_node.inputs['Normal'], node_group.inputs['Normal'])
+                            connect_sockets(node_group.outputs['Normal'], normal_socket)
+                    if add_layers:
+                        if not socket_transferred:
+                            channel.create_layer(context, layer_name='Normal', layer_type='GEOMETRY', geometry_type='OBJECT_NORMAL', normalize_normal=True)
+                        channel.create_layer(context, layer_name='Image', layer_type='IMAGE', coord_type=self.coord_type, uv_map_name=self.uv_map_name)
+                case _:
+                    raise ValueError(f"Invalid template: {template}")
     
     def delete_channel(self, context, channel: "Channel"):
         active_index = self.channels.find(channel.name)
@@ -2736,6 +3027,7 @@ class Group(PropertyGroup):
             return
         
         self.channels.remove(active_index)
+        bump_collection_revision()
         self.active_index = max(0, active_index - 1)
         self.update_node_tree(context)
 
@@ -3000,6 +3292,82 @@ def get_all_layers() -> list[Layer]:
     """Return a flat list of every layer across all materials."""
     return [layer for _mat, _grp, _ch, layer in iter_all_layers()]
 
+
+def get_layer_channel(layer: Layer) -> Channel | None:
+    """Return the channel that owns the layer, or None for legacy global layers."""
+    material = layer.id_data
+    if not isinstance(material, Material):
+        return None
+    try:
+        channel_path, _, _ = layer.path_from_id().rpartition(".layers[")
+        return material.path_resolve(channel_path) if channel_path else None
+    except ValueError:
+        return None
+
+
+def mark_channels_baked(channels: list[Channel]):
+    """Clear the bake_dirty flag of the channels after baking them into their bake image."""
+    for channel in channels:
+        if channel.bake_dirty:
+            channel.bake_dirty = False
+
+def update_bake_dirty_channels(depsgraph: bpy.types.Depsgraph) -> int:
+    """Flag the channels affected by a depsgraph update as changed since their last bake.
+
+    A channel changes when one of its layer node trees is edited, when one of its layer images
+    is painted or when the geometry of an object using its material changes. Channel node trees
+    are only rebuilt by Channel.update_node_tree, which flags the channel itself when the rebuild
+    changes the graph, so switching to the bake image does not flag the channel again.
+
+    Returns:
+        int: The number of channels flagged.
+    """
+    if not (
+        depsgraph.id_type_updated('NODETREE')
+        or depsgraph.id_type_updated('IMAGE')
+        or depsgraph.id_type_updated('OBJECT')
+    ):
+        return 0
+    
+    node_tree_names = set()
+    image_names = set()
+    material_names = set()
+    for update in depsgraph.updates:
+        updated_id = update.id.original
+        if isinstance(updated_id, NodeTree):
+            node_tree_names.add(updated_id.name)
+        elif isinstance(updated_id, Image):
+            image_names.add(updated_id.name)
+        elif isinstance(updated_id, Object) and update.is_updated_geometry and updated_id.type == 'MESH':
+            material_names.update(mat.name for mat in updated_id.data.materials if mat)
+    if not (node_tree_names or image_names or material_names):
+        return 0
+    
+    flagged = 0
+    for material in bpy.data.materials:
+        if not hasattr(material, 'ps_mat_data'):
+            continue
+        mesh_changed = material.name in material_names
+        for group in material.ps_mat_data.groups:
+            for channel in group.channels:
+                if channel.bake_dirty:
+                    continue
+                changed = mesh_changed
+                for layer in channel.layers:
+                    if changed:
+                        break
+                    # Linked layers read the tree and image of their source layer
+                    layer_data = layer.get_layer_data()
+                    if layer_data:
+                        changed = bool(
+                            (layer_data.node_tree and layer_data.node_tree.name in node_tree_names)
+                            or (layer_data.image and layer_data.image.name in image_names)
+                        )
+                if changed:
+                    channel.bake_dirty = True
+                    flagged += 1
+    return flagged
+
 def is_layer_linked(check_layer: Layer) -> bool:
     """Check if the layer is linked (referenced by more than one layer entry)."""
     counter = Counter()
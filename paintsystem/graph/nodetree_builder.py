@@ -1,8 +1,9 @@
 import bpy
 from bpy.utils import register_classes_factory
 from mathutils import Vector, Color
-from typing import Dict, List, Union, Sequence, Set, Optional, Tuple
+from typing import Dict, Iterable, List, Union, Sequence, Set, Optional, Tuple
 from dataclasses import dataclass, field
+from collections import deque
 from uuid import uuid4
 import re
 import time
@@ -44,6 +45,14 @@ def get_main_socket_type(socket_type: str) -> str:
     return None
 
 
+# Node properties that are layout/meta data rather than user-tweakable state
+IGNORED_NODE_PROPERTIES = {
+    'rna_type', 'type', 'location_absolute', 'location', 'internal_links',
+    'inputs', 'outputs', 'parent', 'name', 'label', 'node_width', 'mute', 'hide', 'bl_idname'
+}
+CAPTURED_PROPERTY_TYPES = {'BOOLEAN', 'INT', 'FLOAT', 'STRING', 'ENUM'}
+
+
 def capture_node_properties(node: bpy.types.Node) -> dict:
     node_props: Dict[str, object] = {}
     try:
@@ -54,13 +63,10 @@ def capture_node_properties(node: bpy.types.Node) -> dict:
                 if node.bl_idname == "ShaderNodeValToRGB" and hasattr(node, "color_ramp"):
                     node_props["color_ramp"] = [(element.color, element.alpha, element.position) for element in node.color_ramp.elements]
                 continue
-            if pid in {
-                'rna_type', 'type', 'location_absolute', 'location', 'internal_links',
-                'inputs', 'outputs', 'parent', 'name', 'label', 'node_width', 'mute', 'hide', 'bl_idname'
-            }:
+            if pid in IGNORED_NODE_PROPERTIES:
                 continue
             ptype = getattr(prop, 'type', None)
-            if ptype in {'BOOLEAN', 'INT', 'FLOAT', 'STRING', 'ENUM'}:
+            if ptype in CAPTURED_PROPERTY_TYPES:
                 try:
                     node_props[pid] = getattr(node, pid)
                 except Exception as e:
@@ -183,6 +189,51 @@ def apply_node_state(node: bpy.types.Node, state: dict) -> None:
     apply_node_defaults(node, state['inputs'], state['outputs'])
 
 
+def is_user_property(node: bpy.types.Node, pid: str) -> bool:
+    """
+    Returns True if the property would be captured by `capture_node_properties`,
+    i.e. it is user-tweakable state that survives a recompile.
+    """
+    try:
+        prop = node.bl_rna.properties.get(pid)
+    except Exception:
+        return False
+    if prop is None or prop.is_readonly or pid in IGNORED_NODE_PROPERTIES:
+        return False
+    return prop.type in CAPTURED_PROPERTY_TYPES
+
+
+def values_equal(current, value, tolerance: float = 1e-6) -> bool:
+    """
+    Compares a Blender property value with a requested value. Arrays are compared
+    element-wise and floats within a tolerance, since Blender stores them as float32.
+    """
+    if isinstance(current, (str, bytes, set, bpy.types.bpy_struct)) or isinstance(value, (str, bytes, set, bpy.types.bpy_struct)):
+        return current == value
+    if current is None or value is None:
+        return current is value
+    try:
+        current_items = tuple(current)
+    except TypeError:
+        current_items = (current,)
+    try:
+        value_items = tuple(value)
+    except TypeError:
+        value_items = (value,)
+    if len(current_items) != len(value_items):
+        return False
+    for a, b in zip(current_items, value_items):
+        if isinstance(a, float) or isinstance(b, float):
+            try:
+                if abs(a - b) > tolerance:
+                    return False
+            except TypeError:
+                return False
+        elif a != b:
+            return False
+    return True
+
+
 def get_nodetree_version(node_tree: bpy.types.NodeTree) -> int:
     if not node_tree:
         return 0
@@ -191,6 +242,66 @@ def get_nodetree_version(node_tree: bpy.types.NodeTree) -> int:
         return int(version_frame.label)
     return 0
 
+def compute_node_levels(node_names: Iterable[str], edges: Iterable[Tuple[str, str]]) -> Dict[str, int]:
+    """
+    Assigns each node its layout level in O(N + E).
+
+    End nodes (nodes that are not the source of any edge) are level 0, and every other
+    node's level is its longest path distance to an end node. Nodes that cannot reach
+    an end node (e.g. inside a cycle) are left out of the result.
+
+    Args:
+        node_names (Iterable[str]): Names of the nodes in the graph.
+        edges (Iterable[Tuple[str, str]]): (source, target) name pairs.
+
+    Returns:
+        Dict[str, int]: Mapping of node name to level.
+    """
+    sources_by_target: Dict[str, List[str]] = {}
+    source_names: Set[str] = set()
+    edge_pairs: List[Tuple[str, str]] = []
+    for source, target in edges:
+        source_names.add(source)
+        if source == target:
+            continue
+        edge_pairs.append((source, target))
+        sources_by_target.setdefault(target, []).append(source)
+
+    end_node_names = [name for name in node_names if name not in source_names]
+
+    # Only edges leading (eventually) to an end node take part in the layering
+    reachable: Set[str] = set(end_node_names)
+    queue = deque(end_node_names)
+    while queue:
+        name = queue.popleft()
+        for source in sources_by_target.get(name, ()):
+            if source not in reachable:
+                reachable.add(source)
+                queue.append(source)
+
+    pending_targets: Dict[str, int] = {}
+    for source, target in edge_pairs:
+        if target in reachable:
+            pending_targets[source] = pending_targets.get(source, 0) + 1
+
+    # Topological layering from the end nodes backwards: a node is placed once all of
+    # its targets have their final level
+    level_map: Dict[str, int] = {}
+    for name in end_node_names:
+        level_map.setdefault(name, 0)
+    queue = deque(level_map)
+    while queue:
+        name = queue.popleft()
+        next_level = level_map[name] + 1
+        for source in sources_by_target.get(name, ()):
+            if level_map.get(source, 0) < next_level:
+                level_map[source] = next_level
+            pending_targets[source] -= 1
+            if pending_targets[source] == 0:
+                queue.append(source)
+    return level_map
+
+
 @dataclass
 class Edge:
     """
@@ -275,6 +386,8 @@ class NodeTreeBuilder:
         # Find or create a unique frame by label if provided; otherwise create a fresh frame
         self.frame, created = self._find_or_create_frame(frame_name, frame_color)
         self.compiled = not created  # Flag to indicate if the graph has been compiled
+        # Set by compile when it added, removed or changed nodes, node values or links (not their layout)
+        self.tree_changed = False
         self.sub_graphs: Set['NodeTreeBuilder'] = set()  # List of subgraphs if any
         self.width = 0 # Width of the graph
         self.node_links = []
@@ -487,9 +600,12 @@ class NodeTreeBuilder:
             return self.get_unique_identifier(identifier, counter + 1)
         return check_identifier
 
-    def _create_node(self, identifier: str, node_type: str, properties: dict = None, default_values: dict = None, default_outputs: dict = None, force_properties: bool = False, force_default_values: bool = False) -> None:
+    def _create_node(self, identifier: str, node_type: str, properties: dict = None, default_values: dict = None, default_outputs: dict = None, force_properties: bool = False, force_default_values: bool = False, forced_properties: Set[str] = None) -> None:
         """
-        Creates a node in the graph.
+        Creates a node in the graph, or updates the existing node with the same identifier.
+
+        Existing nodes are only touched where they differ from the request. User-tweakable
+        properties and enabled socket values are kept unless they are forced.
 
         Args:
             node_type (str): The Blender identifier for the node (e.g., 'ShaderNodeTexNoise').
@@ -501,23 +617,30 @@ class NodeTreeBuilder:
                                             Defaults to False.
             force_default_values (bool, optional): If True, the default values will be overridden after recompiling.
                                             Defaults to False.
+            forced_properties (set, optional): Names of properties that are always overridden (from .force suffix).
 
         Returns:
             The created Blender node object.
         """
-        existing = next((node for node in self.nodes.values() if self.get_node_identifier(node) == identifier), None)
+        existing = self.nodes.get(identifier)
+        if isinstance(existing, NodeTreeBuilder) or (existing is not None and self.get_node_identifier(existing) != identifier):
+            existing = None
         node = None
+        created = False
         if existing is not None and getattr(existing, 'bl_idname', None) == node_type:
             node = existing
             # Ensure correct parenting and width
             try:
-                node.parent = self.frame
-                node.width = self.node_width
+                if node.parent != self.frame:
+                    node.parent = self.frame
+                if node.width != self.node_width:
+                    node.width = self.node_width
             except Exception:
                 pass
             # Ensure identifier custom property is set/updated
             try:
-                node.label = identifier
+                if node.label != identifier:
+                    node.label = identifier
             except Exception:
                 pass
         else:
@@ -536,33 +659,51 @@ class NodeTreeBuilder:
             except Exception:
                 pass
             self.nodes[identifier] = node
+            created = True
+            self.tree_changed = True
+
+        # Sockets whose current value belongs to the user (captured before properties can toggle them)
+        kept_sockets: Set[int] = set()
+        if not created and not force_default_values:
+            for sock in list(node.inputs) + list(node.outputs):
+                if sock.enabled and hasattr(sock, 'default_value'):
+                    kept_sockets.add(sock.as_pointer())
 
         # Set custom properties if provided
         if properties:
             for key, value in properties.items():
-                if hasattr(node, key):
-                    setattr(node, key, value)
-                else:
+                if not hasattr(node, key):
                     self._log(
                         f"Warning: Property '{key}' not found on node type '{node_type}'")
+                    continue
+                is_forced = force_properties or (forced_properties and key in forced_properties)
+                if not created and not is_forced and is_user_property(node, key):
+                    continue
+                if not values_equal(getattr(node, key), value):
+                    setattr(node, key, value)
+                    self.tree_changed = True
         
         # --- Set Input Default Values ---
         # If a default_values dictionary is provided, iterate through it
         if default_values:
             for input_name, value in default_values.items():
-                # Check if the input socket exists on the node
-                # if input_name in node.inputs:
                 try:
-                    node.inputs[input_name].default_value = value
+                    sock = node.inputs[input_name]
+                    if sock.as_pointer() in kept_sockets or values_equal(sock.default_value, value):
+                        continue
+                    sock.default_value = value
+                    self.tree_changed = True
                 except Exception as e:
                     self._log(f"Warning: Could not set default value for input '{input_name}' to '{value}'. Error: {e}")
-                # else:
-                #     self._log(f"Warning: Input socket '{input_name}' not found on node type '{node_type}'.")
                 
         if default_outputs:
             for output_name, value in default_outputs.items():
                 try:
-                    node.outputs[output_name].default_value = value
+                    sock = node.outputs[output_name]
+                    if sock.as_pointer() in kept_sockets or values_equal(sock.default_value, value):
+                        continue
+                    sock.default_value = value
+                    self.tree_changed = True
                 except Exception as e:
                     self._log(f"Warning: Could not set default value for output '{output_name}' to '{value}'. Error: {e}")
 
@@ -944,48 +1085,39 @@ class NodeTreeBuilder:
         for node in to_remove:
             del self.nodes[self.get_node_identifier(node)]
             self.tree.nodes.remove(node)
+            self.tree_changed = True
 
     # @timing_decorator("Node Tree Compilation")
     def compile(self, arrange_nodes: bool = True) -> 'NodeTreeBuilder':
         """
-        Builds the node tree by creating all the defined links and arranging the nodes.
+        Builds the node tree by diffing the requested nodes and links against the frame.
+
+        Nodes, links and locations that already match the definition are left untouched,
+        so recompiling an unchanged graph does not modify the node tree.
         """
             
         self._log(f"Compiling graph {self.frame.label}")
+        self.tree_changed = False
         # Remove unused nodes
         self._remove_unused_nodes()
-        # Capture current node state so we can restore user-changed values on recompilation
-        saved_state: Dict[str, dict] = {}
         if self.compiled:
-            saved_state = self._capture_node_states()
             self._log("Graph already compiled. Recompiling...")
-            # for subgraph in self.sub_graphs:
-            #     subgraph.compile()
-            # if not self.adjustable:
-            #     self.clear_tree()  # Clear existing nodes and links
             self.compiled = False
-        
-        # Reset link tracking for a fresh build
-        self.node_links = []
 
-        # Add all pre-defined nodes to the tree
+        # Add all pre-defined nodes to the tree, updating the ones that already exist
         self._log("Adding nodes to the tree")
         start_time_add_nodes = time.time()
         for identifier, command in self.__add_nodes_commands.items():
-            self._create_node(identifier, command.node_type, command.properties, command.default_values, command.default_outputs)
+            self._create_node(
+                identifier, command.node_type, command.properties, command.default_values, command.default_outputs,
+                command.force_properties, command.force_default_values, command.forced_properties)
         self._log(f"Time taken to add nodes: {time.time() - start_time_add_nodes} seconds")
 
-        # Re-apply previously captured state (node-level props and input defaults)
-        if saved_state:
-            self._apply_node_states(saved_state)
-
-        # --- Create the links between nodes ---
-        # Remove existing links touching any node in this frame to avoid duplicates
-        self._remove_existing_links_in_frame()
-        # self._log("Linking edges")
+        # --- Resolve the links between nodes ---
         start_time_link_edges = time.time()
+        requested_links = []
         for idx, edge in enumerate(self.edges):
-            self._log(f"Linking edge {idx + 1}: {edge.source} -> {edge.target}")
+            self._log(f"Resolving edge {idx + 1}: {edge.source} -> {edge.target}")
             # Resolve the source node and its specific output socket
             source_node, source_sock = self._resolve_node_and_socket(
                 edge.source, edge.source_socket, is_source=True, edge_idx=idx
@@ -995,9 +1127,9 @@ class NodeTreeBuilder:
             target_node, target_sock = self._resolve_node_and_socket(
                 edge.target, edge.target_socket, is_source=False, edge_idx=idx
             )
-            # Create the link between the resolved source and target sockets
-            self.node_links.append(connect_sockets(source_sock, target_sock))
-            # self._log(f"Linked edge {idx + 1}/{len(self.edges)}")
+            requested_links.append((source_sock, target_sock))
+        # Only remove and create the links that differ from the current tree
+        self._sync_links(requested_links)
         self._log(f"Time taken to link edges: {time.time() - start_time_link_edges} seconds")
         # --- Arrange nodes for clarity (simple horizontal layout) ---
         self._log("Arranging nodes")
@@ -1011,85 +1143,62 @@ class NodeTreeBuilder:
             version_frame.name = "versioning"
             version_frame.label = str(self.version)
             version_frame.location = Vector((200, 0))
-        else:
+        elif self.tree.nodes["versioning"].label != str(self.version):
             self.tree.nodes["versioning"].label = str(self.version)
         self._log(f"Time taken to arrange nodes: {time.time() - start_time_arrange_nodes} seconds")
         self._log("Updating node tree")
+        if any(sub_graph.tree_changed for sub_graph in self.sub_graphs):
+            self.tree_changed = True
         self.compiled = True
-        self.frame.width = self.width
+        if abs(self.frame.width - self.width) > 1e-3:
+            self.frame.width = self.width
         self._log(f"Compiled graph {self.frame.label}")
         self._log("-----------------------------------")
         return self
 
-    def _remove_existing_links_in_frame(self) -> None:
-        """Remove links where either end belongs to a node parented to this frame."""
-        self._log(f"Removing existing links in frame {self.frame.label}")
-        nodes_in_frame = {node for node in self.tree.nodes if getattr(node, 'parent', None) == self.frame}
-        if not nodes_in_frame:
-            return
-        try:
-            # Copy list to avoid mutating during iteration
-            for link in list(self.tree.links):
-                from_node = getattr(getattr(link, 'from_socket', None), 'node', None)
-                to_node = getattr(getattr(link, 'to_socket', None), 'node', None)
-                if from_node in nodes_in_frame or to_node in nodes_in_frame:
-                    self.tree.links.remove(link)
-        except Exception:
-            pass
-
-    def _capture_node_states(self) -> Dict[str, dict]:
-        """Capture non-readonly node properties and input socket default values.
+    def _sync_links(self, requested_links: List[Tuple[bpy.types.NodeSocket, bpy.types.NodeSocket]]) -> None:
+        """
+        Makes the links touching this frame match the requested (source, target) socket pairs.
 
-        Returns a mapping: identifier -> { 'properties': {...}, 'inputs': {...} }
+        Matching links are kept, stale links are removed and only missing links are created.
+        As with `connect_sockets`, a later link into a single-input socket replaces an earlier one.
         """
-        self._log("Capturing node state")
-        captured: Dict[str, dict] = {}
-        for identifier, node in list(self.nodes.items()):
-            # Skip subgraphs and special reroutes
-            if isinstance(node, NodeTreeBuilder):
-                continue
-            if getattr(node, 'type', None) == 'REROUTE' and (
-                str(getattr(node, 'name', '')).startswith(START) or str(getattr(node, 'name', '')).startswith(END)
-            ):
-                continue
+        wanted: Dict[Tuple[int, int], Tuple[bpy.types.NodeSocket, bpy.types.NodeSocket]] = {}
+        target_keys: Dict[int, Tuple[int, int]] = {}
+        for source_sock, target_sock in requested_links:
+            key = (source_sock.as_pointer(), target_sock.as_pointer())
+            if not getattr(target_sock, 'is_multi_input', False):
+                previous_key = target_keys.get(key[1])
+                if previous_key is not None and previous_key != key:
+                    wanted.pop(previous_key, None)
+                target_keys[key[1]] = key
+            wanted[key] = (source_sock, target_sock)
 
-            captured[identifier] = capture_node_state(node)
-        self._log("Captured node state")
-        self._log(captured)
-        return captured
-
-    def _apply_node_states(self, saved_state: Dict[str, dict]) -> None:
-        """Apply captured properties and input defaults to current nodes by identifier."""
-        self._log("Applying node state")
-        for identifier, state in saved_state.items():
-            node = next((n for n in self.nodes.values() if self.get_node_identifier(n) == identifier.split('.')[0]), None)
-            if node is None or isinstance(node, NodeTreeBuilder):
-                self._log(f"Skipping node {identifier}")
-                continue
-            
-            # Get the add command for this node
-            add_command = self.__add_nodes_commands.get(identifier)
-            if add_command is None:
+        nodes_in_frame = {node for node in self.tree.nodes if getattr(node, 'parent', None) == self.frame}
+        kept_links: Dict[Tuple[int, int], bpy.types.NodeLink] = {}
+        removed = 0
+        # Copy list to avoid mutating during iteration
+        for link in list(self.tree.links):
+            if link.from_node not in nodes_in_frame and link.to_node not in nodes_in_frame:
                 continue
-            
-            # Filter out forced properties (either from force_properties flag or forced_properties set)
-            properties_to_apply = {}
-            if not add_command.force_properties:
-                # If force_properties is False, apply all properties except those in forced_properties set
-                properties_to_apply = {
-                    key: value for key, value in state['properties'].items()
-                    if key not in add_command.forced_properties
-                }
-            # If force_properties is True, don't apply any properties (existing behavior)
-            
-            if properties_to_apply:
-                apply_node_properties(node, properties_to_apply)
+            key = (link.from_socket.as_pointer(), link.to_socket.as_pointer())
+            if key in wanted and key not in kept_links:
+                kept_links[key] = link
+            else:
+                self.tree.links.remove(link)
+                removed += 1
 
-            # Ignore if the node is force_default_values
-            # Find node in __add_nodes_commands
-            if not add_command.force_default_values:
-                apply_node_defaults(node, state['inputs'], state['outputs'])
-        self._log("Applied node state")
+        self.node_links = []
+        created = 0
+        for key, (source_sock, target_sock) in wanted.items():
+            link = kept_links.get(key)
+            if link is None:
+                link = connect_sockets(source_sock, target_sock)
+                created += 1
+            self.node_links.append(link)
+        if removed or created:
+            self.tree_changed = True
+        self._log(f"Links kept: {len(kept_links)}, removed: {removed}, created: {created}")
 
     def _arrange_nodes(self):
         """A simple node arrangement algorithm."""
@@ -1098,50 +1207,21 @@ class NodeTreeBuilder:
         self.__min_x_pos = 0
         self.__max_x_pos = 0
 
-        # --- 1. Determine End Nodes by Analyzing Connections ---
-        # An "end node" is any node within the graph that does not serve as a
-        # source for any defined edge. These are the leaves of the graph.
-        source_node_names = {str(edge.source) for edge in self.edges}
-        self._log(f"Source nodes: {source_node_names}")
-        
-        end_node_names = [name for name in self.nodes if name not in source_node_names]
-        
-        self._log(f"End nodes: {end_node_names}")
-        
-        # --- 2. Calculate Node Levels with a Backwards Traversal ---
-        # We traverse from the end nodes (level 0) backwards. A node's level is
-        # its longest path distance from an end node.
-        level_map: dict[str, int] = {}  # Stores {node_name: level}
-        nodes_to_process = []
-        
-        for name in end_node_names:
-            if name not in level_map:
-                level_map[name] = 0
-                nodes_to_process.append(name)
-                
+        # --- 1. Calculate Node Levels ---
+        # End nodes (nodes that are not the source of any edge) are level 0. A
+        # node's level is its longest path distance from an end node.
+        level_map = compute_node_levels(
+            self.nodes.keys(), ((str(edge.source), str(edge.target)) for edge in self.edges))
+
         layer_infos: Dict[int, LayerInfo] = {}
-        
-        while nodes_to_process:
-            self._log(f"Processing nodes: {nodes_to_process}")
-            current_node_name = nodes_to_process.pop(0)
-            current_level = level_map[current_node_name]
-
-            # Find nodes that connect to the current node
-            for edge in self.edges:
-                if str(edge.target) == current_node_name:
-                    source_node_name = str(edge.source)
-                    level_map[source_node_name] = max(
-                        current_level + 1, level_map.get(source_node_name, 1))
-                    if source_node_name not in nodes_to_process and current_node_name != source_node_name:
-                        nodes_to_process.append(source_node_name)
-        
         NODE_MARGIN = 20  # Margin between nodes
+        subgraphs_by_name = {str(sg): sg for sg in self.sub_graphs}
         
-        for name, level in list(level_map.items()):
+        for name, level in level_map.items():
             if level not in layer_infos:
                 layer_infos[level] = LayerInfo()
 
-            matching_subgraph = next((sg for sg in self.sub_graphs if name == str(sg)), None)
+            matching_subgraph = subgraphs_by_name.get(name)
             if matching_subgraph is not None:
                 layer_infos[level].width = max(layer_infos[level].width, matching_subgraph.width)
             else:
@@ -1149,11 +1229,22 @@ class NodeTreeBuilder:
                 layer_infos[level].width = max(layer_infos[level].width, base_width)
 
             layer_infos[level].nodes.append(name)
+
+        # --- 2. Precompute the horizontal offset of every level ---
+        max_level = max(layer_infos, default=0)
+        level_offsets: List[float] = [0.0]
+        for level in range(max_level + 1):
+            level_width = layer_infos[level].width if level in layer_infos else 0
+            level_offsets.append(level_offsets[-1] + level_width)
+
+        def get_level_offset(level: int) -> float:
+            widths = level_offsets[min(level, len(level_offsets) - 1)]
+            return widths + level * NODE_MARGIN
         
         def calculate_node_position(name: str, node: bpy.types.Node):
             current_level = level_map.get(name, 1)
             current_level_info = layer_infos.get(current_level, LayerInfo())
-            x_pos = -1 * (sum(layer_infos[l].width for l in range(current_level) if l in layer_infos) + current_level * NODE_MARGIN)
+            x_pos = -1 * get_level_offset(current_level)
             y_pos = 200
             if not isinstance(node, NodeTreeBuilder):
                 if node.type != "FRAME":
@@ -1174,10 +1265,10 @@ class NodeTreeBuilder:
             if isinstance(node, NodeTreeBuilder):
                 node.set_node_offset(pos, arrange_nodes=True)
             else:
-                if hasattr(node, 'location_absolute'):
-                    node.location_absolute = pos
-                else:
-                    node.location = pos
+                # Only move nodes whose position actually changed
+                location_attr = 'location_absolute' if hasattr(node, 'location_absolute') else 'location'
+                if (Vector(getattr(node, location_attr)) - pos).length > 1e-3:
+                    setattr(node, location_attr, pos)
         self.width = self.__max_x_pos - self.__min_x_pos + 35*2
     
     def set_node_offset(self, offset: Vector, arrange_nodes: bool = False):
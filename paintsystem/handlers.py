@@ -3,8 +3,11 @@ import bpy
 from .versioning import get_layer_parent_map, migrate_global_layer_data, migrate_blend_mode, migrate_source_node, migrate_socket_names, update_layer_name, update_layer_version, update_library_nodetree_version
 from .version_check import get_latest_version
 from .context import parse_context
-from .data import sort_actions, get_all_layers, is_valid_uuidv4, iter_all_layers
-from .image import save_image
+from .data import sort_actions, get_all_layers, is_valid_uuidv4, iter_all_layers, update_bake_dirty_channels
+from .image_export import save_dirty_images
+from .rebuild_scheduler import clear_pending_updates
+from .bake_workers import cancel_bake_workers
+from .nested_list_manager import invalidate_nested_list_indexes
 from .graph.basic_layers import get_layer_version_for_type
 import time
 from .graph.nodetree_builder import get_nodetree_version
@@ -106,6 +109,20 @@ def load_paint_system_data():
     logger.debug(f"Paint System: Checked layers in {round((time.time() - start_time) * 1000, 2)} ms")
 
 
+@bpy.app.handlers.persistent
+def load_pre(scene):
+    # Pending rebuilds, cached indexes and background bakes refer to data of the file being closed
+    clear_pending_updates()
+    invalidate_nested_list_indexes()
+    cancel_bake_workers()
+
+
+@bpy.app.handlers.persistent
+def undo_redo_post(scene, *args):
+    # Undo reloads data, cached layer indexes may point at stale collections
+    invalidate_nested_list_indexes()
+
+
 @bpy.app.handlers.persistent
 def load_post(scene):
     ps_scene_data = get_ps_scene_data(bpy.context.scene)
@@ -117,8 +134,8 @@ def load_post(scene):
 
 @bpy.app.handlers.persistent
 def save_handler(scene: bpy.types.Scene):
-    images = set()
-    
+    # Images are shared by linked layers, collect each dirty one once by name
+    images = {}
     seen_channels = set()
     for _mat, _grp, channel, layer in iter_all_layers():
         # Collect bake images once per channel
@@ -126,13 +143,12 @@ def save_handler(scene: bpy.types.Scene):
         if ch_id not in seen_channels:
             seen_channels.add(ch_id)
             if channel.bake_image and channel.bake_image.is_dirty:
-                images.add(channel.bake_image)
+                images[channel.bake_image.name] = channel.bake_image
         # Collect layer images
-        if layer.image:
-            images.add(layer.image)
-            
-    for image in images:
-        save_image(image)
+        if layer.image and layer.image.is_dirty:
+            images[layer.image.name] = layer.image
+
+    save_dirty_images(images.values())
 
 
 @bpy.app.handlers.persistent
@@ -186,6 +202,15 @@ def color_history_handler(scene: bpy.types.Scene, depsgraph: bpy.types.Depsgraph
         logger.error(f"Color History Error: {e}")
         pass
 
+@bpy.app.handlers.persistent
+def bake_dirty_handler(scene: bpy.types.Scene, depsgraph: bpy.types.Depsgraph = None):
+    if not depsgraph:
+        return
+    try:
+        update_bake_dirty_channels(depsgraph)
+    except Exception as e:
+        logger.error(f"Error flagging changed channels: {e}")
+
 @bpy.app.handlers.persistent
 def paint_system_object_update(scene: bpy.types.Scene, depsgraph: bpy.types.Depsgraph = None):
     """Handle object changes and update paint canvas"""
@@ -241,11 +266,15 @@ def brush_color_callback(*args):
 
 def register():
     bpy.app.handlers.frame_change_pre.append(frame_change_pre)
+    bpy.app.handlers.load_pre.append(load_pre)
     bpy.app.handlers.load_post.append(load_post)
+    bpy.app.handlers.undo_post.append(undo_redo_post)
+    bpy.app.handlers.redo_post.append(undo_redo_post)
     bpy.app.handlers.save_pre.append(save_handler)
     bpy.app.handlers.load_post.append(refresh_image)
     bpy.app.handlers.depsgraph_update_post.append(paint_system_object_update)
     bpy.app.handlers.depsgraph_update_post.append(color_history_handler)
+    bpy.app.handlers.depsgraph_update_post.append(bake_dirty_handler)
     bpy.app.timers.register(on_addon_enable, first_interval=0.1)
     bpy.msgbus.subscribe_rna(
         key=(bpy.types.UnifiedPaintSettings, "color"),
@@ -269,8 +298,12 @@ def register():
 def unregister():
     bpy.msgbus.clear_by_owner(owner)
     bpy.app.handlers.frame_change_pre.remove(frame_change_pre)
+    bpy.app.handlers.load_pre.remove(load_pre)
     bpy.app.handlers.load_post.remove(load_post)
+    bpy.app.handlers.undo_post.remove(undo_redo_post)
+    bpy.app.handlers.redo_post.remove(undo_redo_post)
     bpy.app.handlers.save_pre.remove(save_handler)
     bpy.app.handlers.load_post.remove(refresh_image)
     bpy.app.handlers.depsgraph_update_post.remove(paint_system_object_update)
-    bpy.app.handlers.depsgraph_update_post.remove(color_history_handler)
\ No newline at end of file
+    bpy.app.handlers.depsgraph_update_post.remove(color_history_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(bake_dirty_handler)
\ No newline at end of file
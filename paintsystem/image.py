@@ -5,7 +5,7 @@ import time
 import os
 import re
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -136,8 +136,10 @@ def temp_save_image(image):
     
     # Save the image (this saves all tiles)
     if image.filepath and '.<UDIM>.' in image.filepath:
-        # Already has a valid filepath with UDIM marker
-        image.save()
+        # Already has a valid filepath with UDIM marker. Unpacking already wrote
+        # the packed tiles as-is, only re-encode them if they were edited since
+        if not was_packed or image.is_dirty:
+            image.save()
     else:
         # No filepath or missing UDIM marker, save to temp directory with UDIM marker
         # Construct a filepath with UDIM marker
@@ -186,16 +188,107 @@ def blender_image_to_numpy(image: Image) -> Optional[ImageTiles]:
     # UDIM image - read each tile directly from Blender
     was_packed = (image.packed_file or image.filepath == '')
     original_filepath = image.filepath
+    width, height = image.size
     
-    # Save image to ensure all tiles are on disk
-    temp_save_image(image)
+    tiles_dict = _read_udim_tiles_in_memory(image, width, height)
+    if tiles_dict is None:
+        tiles_dict = _read_udim_tiles_from_disk(image, width, height)
+    
+    end_time = time.time()
+    logger.debug(f"Blender UDIM image to numpy took {(end_time - start_time)*1000} milliseconds for {len(tiles_dict)} tiles")
+    
+    return ImageTiles(tiles=tiles_dict, ori_path=original_filepath, ori_packed=was_packed)
+
+def _decode_tile_pixels(data: bytes, width: int, height: int) -> np.ndarray:
+    """Decode an encoded tile (e.g. PNG bytes) through a scratch image, without touching disk."""
+    scratch = bpy.data.images.new("__tmp_tile_read__", width=1, height=1, alpha=True)
+    try:
+        scratch.pack(data=data, data_len=len(data))
+        scratch.source = 'FILE'
+        scratch.colorspace_settings.name = 'Non-Color'
+        t_w, t_h = scratch.size
+        if t_w != width or t_h != height:
+            scratch.scale(width, height)
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        scratch.pixels.foreach_get(pixels)
+    finally:
+        bpy.data.images.remove(scratch)
+    # Flip vertically (Blender uses bottom-left origin, numpy uses top-left)
+    return np.flipud(pixels.reshape((height, width, 4)))
+
+def _read_udim_tiles_in_memory(image: Image, width: int, height: int) -> Optional[Dict[int, np.ndarray]]:
+    """Read every tile of a UDIM image from its packed data.
+    
+    Images that are not packed, or were edited since they were packed, are packed for the
+    read only. Their packed, dirty and filepath state is restored afterwards, so reading
+    never packs the user's image into the blend file.
+    
+    Returns:
+        The tiles, or None if the image is backed by unedited files on disk or could not be packed.
+    """
+    was_packed = bool(image.packed_files)
+    was_dirty = image.is_dirty
+    if image.filepath and not was_packed and not was_dirty:
+        return None
+    original_filepath = image.filepath_raw
+    if was_dirty or not was_packed:
+        try:
+            image.pack()
+        except RuntimeError as e:
+            logger.debug(f"Could not pack {image.name} in memory, reading tiles from disk: {e}")
+            return None
+    try:
+        packed_tiles = {
+            packed.tile_number: packed.packed_file
+            for packed in image.packed_files
+            if packed.view == 0
+        }
+        tiles_dict = {}
+        for tile in image.tiles:
+            packed_file = packed_tiles.get(tile.number)
+            if packed_file is None:
+                logger.debug(f"Tile {tile.number} of {image.name} is not packed, reading tiles from disk")
+                return None
+            tiles_dict[tile.number] = _decode_tile_pixels(packed_file.data, width, height)
+    finally:
+        if not was_packed:
+            _remove_packed_data(image, original_filepath)
+        if was_dirty and not image.is_dirty:
+            _mark_image_dirty(image)
+    return tiles_dict
+
+def _remove_packed_data(image: Image, filepath: str):
+    """Drop the packed data of an image, keeping its pixels in memory and its files on disk untouched."""
+    try:
+        # 'REMOVE' frees the packed files without writing or reloading anything
+        image.unpack(method='REMOVE')
+    except RuntimeError as e:
+        logger.warning(f"Failed to remove the temporary packed data of {image.name}: {e}")
+        return
+    image.filepath_raw = filepath
+
+def _mark_image_dirty(image: Image):
+    """Flag an image as edited again by writing its first tile back unchanged."""
+    pixels = np.empty(len(image.pixels), dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    image.pixels.foreach_set(pixels)
+
+def _read_udim_tiles_from_disk(image: Image, width: int, height: int) -> Dict[int, np.ndarray]:
+    """Read every tile of a UDIM image from its tile files, saving it first unless they are up to date."""
+    is_up_to_date = (
+        '.<UDIM>.' in image.filepath
+        and not image.packed_files
+        and not image.is_dirty
+    )
+    if not is_up_to_date:
+        # Save image to ensure all tiles are on disk
+        temp_save_image(image)
     
     directory, filename = _get_image_dir_and_filename(image)
     prefix, extension = parse_udim_filename(filename)
     
     # Load all tiles
     tiles_dict = {}
-    width, height = image.size
     
     # Build a map of tile numbers to file paths by searching the directory
     tile_files = find_udim_tile_files(directory, prefix)
@@ -209,22 +302,7 @@ def blender_image_to_numpy(image: Image) -> Optional[ImageTiles]:
             tile_path = _resolve_tile_path(directory, prefix, extension, tile_number)
         
         if tile_path and os.path.exists(tile_path):
-            # Load tile using a temporary Blender image (no PIL required)
-            tmp_img = bpy.data.images.load(tile_path, check_existing=False)
-            try:
-                tmp_img.colorspace_settings.name = 'Non-Color'
-                # Resize if tile dimensions don't match
-                t_w, t_h = tmp_img.size
-                if t_w != width or t_h != height:
-                    tmp_img.scale(width, height)
-                pixels = np.empty(width * height * 4, dtype=np.float32)
-                tmp_img.pixels.foreach_get(pixels)
-                pixels = pixels.reshape((height, width, 4))
-                # Flip vertically (Blender uses bottom-left origin, numpy uses top-left)
-                pixels = np.flipud(pixels)
-                tiles_dict[tile_number] = pixels
-            finally:
-                bpy.data.images.remove(tmp_img)
+            tiles_dict[tile_number] = load_tile_file(tile_path, width, height)
         else:
             # Tile file not found, try to get from Blender's pixel data (first tile only)
             if tile_number == image.tiles[0].number:
@@ -236,11 +314,50 @@ def blender_image_to_numpy(image: Image) -> Optional[ImageTiles]:
                     tiles_dict[tile_number] = pixels
             else:
                 tiles_dict[tile_number] = np.zeros((height, width, 4), dtype=np.float32)
-    
-    end_time = time.time()
-    logger.debug(f"Blender UDIM image to numpy took {(end_time - start_time)*1000} milliseconds for {len(tiles_dict)} tiles")
-    
-    return ImageTiles(tiles=tiles_dict, ori_path=original_filepath, ori_packed=was_packed)
+    return tiles_dict
+
+def load_tile_file(path: str, width: int, height: int) -> np.ndarray:
+    """Read an image file into a (height, width, 4) array of its stored values, no colour conversion."""
+    # Load tile using a temporary Blender image (no PIL required)
+    tmp_img = bpy.data.images.load(path, check_existing=False)
+    try:
+        tmp_img.colorspace_settings.name = 'Non-Color'
+        # Resize if tile dimensions don't match
+        t_w, t_h = tmp_img.size
+        if t_w != width or t_h != height:
+            tmp_img.scale(width, height)
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        tmp_img.pixels.foreach_get(pixels)
+    finally:
+        bpy.data.images.remove(tmp_img)
+    # Flip vertically (Blender uses bottom-left origin, numpy uses top-left)
+    return np.flipud(pixels.reshape((height, width, 4)))
+
+def save_tile_files(tiles: Dict[int, np.ndarray], paths: Dict[int, str], use_float: bool = False):
+    """Write arrays from ImageTiles.tiles to files, as OpenEXR if use_float else PNG.
+
+    Args:
+        tiles: The arrays to write, by tile number.
+        paths: The file to write each tile to, by tile number.
+        use_float: Write 32 bit float files instead of 8 bit ones.
+    """
+    tmp_img = None
+    try:
+        for tile_number, array in tiles.items():
+            array = np.flipud(array)
+            t_height, t_width = array.shape[:2]
+            if tmp_img is None or tuple(tmp_img.size) != (t_width, t_height):
+                if tmp_img is not None:
+                    bpy.data.images.remove(tmp_img)
+                tmp_img = bpy.data.images.new("__tmp_tile_save__", width=t_width, height=t_height, alpha=True, float_buffer=use_float)
+                tmp_img.colorspace_settings.name = 'Non-Color'
+            tmp_img.pixels.foreach_set(array.ravel().astype(np.float32))
+            tmp_img.filepath_raw = paths[tile_number]
+            tmp_img.file_format = 'OPEN_EXR' if use_float else 'PNG'
+            tmp_img.save()
+    finally:
+        if tmp_img is not None:
+            bpy.data.images.remove(tmp_img)
 
 def numpy_to_blender_image(array, image_name="BrushPainted", create_new=True) -> Image:
     """Convert numpy array back to Blender image."""
@@ -337,9 +454,24 @@ def switch_image_content(image1: Image, image2: Image):
     end_time = time.time()
     logger.debug(f"Switch image content took {(end_time - start_time)*1000} milliseconds")
 
-def set_image_pixels(image: Image, image_tiles: ImageTiles):
+def get_changed_tile_numbers(original: ImageTiles, edited: ImageTiles) -> List[int]:
+    """Return the numbers of the tiles of edited that differ from the ones of original."""
+    return [
+        tile_number for tile_number, array in edited.tiles.items()
+        if tile_number not in original.tiles or not np.array_equal(original.tiles[tile_number], array)
+    ]
+
+_TILE_FILE_FORMATS = {'png': 'PNG', 'jpg': 'JPEG', 'jpeg': 'JPEG', 'exr': 'OPEN_EXR', 'tif': 'TIFF', 'tiff': 'TIFF'}
+
+def set_image_pixels(image: Image, image_tiles: ImageTiles, tile_numbers: Optional[Iterable[int]] = None):
     """
     Set image pixels from ImageTiles dataclass.
+    
+    Args:
+        image: The image to write to.
+        image_tiles: The pixels to write.
+        tile_numbers: For UDIM images, only write these tiles and keep the others as they are.
+            Writes every tile in image_tiles if None.
     """
     start_time = time.time()
     
@@ -347,37 +479,50 @@ def set_image_pixels(image: Image, image_tiles: ImageTiles):
     is_udim = image.source == 'TILED' and len(image.tiles) > 1
     
     if image_tiles.is_udim or is_udim:
+        if tile_numbers is None:
+            tile_numbers = list(image_tiles.tiles)
+        else:
+            tile_numbers = [number for number in tile_numbers if number in image_tiles.tiles]
+        if not tile_numbers:
+            return
+        
         # UDIM image - save tiles to disk
+        if image.packed_file or not image.filepath or image.is_dirty:
+            # Unpack or save the current tiles so reload() picks up both the unchanged and the saved tiles
+            temp_save_image(image)
         
         directory, filename = _get_image_dir_and_filename(image)
         prefix, extension = parse_udim_filename(filename)
         
-        # Save each tile
-        for tile_number, array in image_tiles.tiles.items():
-            array = np.flipud(array.copy())
-            array = np.clip(array, 0, 1)
-            
-            # Construct tile filename, preferring existing file path
-            tile_filename = f"{prefix}.{tile_number}.{extension}"
-            tile_path = os.path.join(directory, tile_filename)
-            
-            # Try alternative separator patterns if file doesn't exist yet
-            existing_path = _resolve_tile_path(directory, prefix, extension, tile_number)
-            if existing_path:
-                tile_path = existing_path
-            
-            # Save tile using a temporary Blender image (no PIL required)
-            t_height, t_width = array.shape[:2]
-            tmp_img = bpy.data.images.new("__tmp_tile_save__", width=t_width, height=t_height, alpha=True)
-            try:
-                tmp_img.colorspace_settings.name = 'Non-Color'
+        # Save each changed tile through a single scratch image (no PIL required)
+        tmp_img = None
+        try:
+            for tile_number in tile_numbers:
+                array = np.flipud(image_tiles.tiles[tile_number])
+                array = np.clip(array, 0, 1)
+                
+                # Construct tile filename, preferring existing file path
+                tile_filename = f"{prefix}.{tile_number}.{extension}"
+                tile_path = os.path.join(directory, tile_filename)
+                
+                # Try alternative separator patterns if file doesn't exist yet
+                existing_path = _resolve_tile_path(directory, prefix, extension, tile_number)
+                if existing_path:
+                    tile_path = existing_path
+                
+                t_height, t_width = array.shape[:2]
+                if tmp_img is None or tuple(tmp_img.size) != (t_width, t_height):
+                    if tmp_img is not None:
+                        bpy.data.images.remove(tmp_img)
+                    tmp_img = bpy.data.images.new("__tmp_tile_save__", width=t_width, height=t_height, alpha=True)
+                    tmp_img.colorspace_settings.name = 'Non-Color'
                 tmp_img.pixels.foreach_set(array.ravel().astype(np.float32))
                 tmp_img.filepath_raw = tile_path
                 ext = os.path.splitext(tile_path)[1].lower().lstrip('.')
-                fmt_map = {'png': 'PNG', 'jpg': 'JPEG', 'jpeg': 'JPEG', 'exr': 'OPEN_EXR', 'tif': 'TIFF', 'tiff': 'TIFF'}
-                tmp_img.file_format = fmt_map.get(ext, 'PNG')
+                tmp_img.file_format = _TILE_FILE_FORMATS.get(ext, 'PNG')
                 tmp_img.save()
-            finally:
+        finally:
+            if tmp_img is not None:
                 bpy.data.images.remove(tmp_img)
         
         # Reload image to update tiles
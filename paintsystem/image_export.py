@@ -0,0 +1,358 @@
+"""Threaded export of images to PNG and OpenEXR files.
+
+Pixels are read from Blender on the main thread, the only one allowed to touch
+``bpy``, and encoded and written from a thread pool. Encoding is done here with
+NumPy and zlib rather than through Blender: zlib releases the GIL, so the files
+are compressed in parallel.
+"""
+
+import hashlib
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import bpy
+import numpy as np
+from bpy.types import Image
+
+from .compositing import linear_to_srgb, srgb_to_linear
+from .image import blender_image_to_numpy, save_image
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+FILE_EXTENSIONS = {'PNG': "png", 'OPEN_EXR': "exr"}
+_EXR_COMPRESSION = {'NONE': 0, 'ZIPS': 2, 'ZIP': 3}
+# Scanlines per chunk for each EXR compression
+_EXR_LINES_PER_CHUNK = {'NONE': 1, 'ZIPS': 1, 'ZIP': 16}
+
+# Checksum of the pixels last written to each file, with the file size and modification time after the write
+_written_checksums: Dict[str, Tuple[str, int, int]] = {}
+
+
+@dataclass
+class ImageExportSettings:
+    """File settings of an export, mirroring Blender's image format settings."""
+    file_format: str = 'PNG'
+    # '8' or '16' for PNG, '16' (half) or '32' (float) for OpenEXR
+    color_depth: str = '8'
+    # PNG compression in percent, like ImageFormatSettings.compression
+    compression: int = 15
+    # 'NONE', 'ZIPS' or 'ZIP'
+    exr_codec: str = 'ZIP'
+
+    @property
+    def extension(self) -> str:
+        return FILE_EXTENSIONS[self.file_format]
+
+
+@dataclass
+class ImageSnapshot:
+    """Pixels of one image tile, read on the main thread and ready to be encoded."""
+    filepath: str
+    # (height, width, 4), top row first, as stored in the image: straight alpha
+    # for byte buffers, premultiplied for float ones
+    pixels: np.ndarray
+    is_float: bool
+    is_srgb: bool
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+
+
+def encode_png(pixels: np.ndarray, bit_depth: int = 8, compression: int = 15) -> bytes:
+    """Encode straight alpha RGBA values in [0, 1] as a PNG file.
+
+    Args:
+        pixels (np.ndarray): (height, width, 4) array, top row first.
+        bit_depth (int): 8 or 16.
+        compression (int): Compression in percent, mapped to the zlib levels.
+    """
+    height, width = pixels.shape[:2]
+    max_value = 255 if bit_depth == 8 else 65535
+    values = np.clip(pixels, 0.0, 1.0) * max_value + 0.5
+    values = values.astype(np.uint8 if bit_depth == 8 else ">u2")
+    rows = values.reshape(height, -1).view(np.uint8)
+    # Up filter: every row stores its difference with the previous one
+    filtered = np.empty((height, rows.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    filtered[0, 1:] = rows[0]
+    np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+    level = min(9, max(0, round(compression * 9 / 100)))
+    header = struct.pack(">IIBBBBB", width, height, bit_depth, 6, 0, 0, 0)
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", header),
+        _png_chunk(b"IDAT", zlib.compress(filtered.tobytes(), level)),
+        _png_chunk(b"IEND", b""),
+    ))
+
+
+def _exr_attribute(name: str, attribute_type: str, value: bytes) -> bytes:
+    return name.encode() + b"\0" + attribute_type.encode() + b"\0" + struct.pack("<i", len(value)) + value
+
+
+def _exr_zip_compress(data: bytes, level: int) -> bytes:
+    raw = np.frombuffer(data, dtype=np.uint8)
+    # Interleave the low and high bytes, then store the difference with the previous byte
+    reordered = np.concatenate((raw[0::2], raw[1::2]))
+    predicted = np.empty_like(reordered)
+    predicted[:1] = reordered[:1]
+    predicted[1:] = reordered[1:] - reordered[:-1] + np.uint8(128)
+    return zlib.compress(predicted.tobytes(), level)
+
+
+def encode_exr(pixels: np.ndarray, use_half: bool = True, codec: str = 'ZIP') -> bytes:
+    """Encode linear RGBA values as a scanline OpenEXR file.
+
+    Args:
+        pixels (np.ndarray): (height, width, 4) array, top row first.
+        use_half (bool): Store 16 bit half floats instead of 32 bit floats.
+        codec (str): 'NONE', 'ZIPS' or 'ZIP'.
+    """
+    height, width = pixels.shape[:2]
+    pixel_type = 1 if use_half else 2
+    channels = b"".join(name + b"\0" + struct.pack("<iB3xii", pixel_type, 0, 1, 1) for name in (b"A", b"B", b"G", b"R")) + b"\0"
+    header = b"".join((
+        struct.pack("<ii", 20000630, 2),
+        _exr_attribute("channels", "chlist", channels),
+        _exr_attribute("compression", "compression", struct.pack("<B", _EXR_COMPRESSION[codec])),
+        _exr_attribute("dataWindow", "box2i", struct.pack("<iiii", 0, 0, width - 1, height - 1)),
+        _exr_attribute("displayWindow", "box2i", struct.pack("<iiii", 0, 0, width - 1, height - 1)),
+        _exr_attribute("lineOrder", "lineOrder", b"\0"),
+        _exr_attribute("pixelAspectRatio", "float", struct.pack("<f", 1.0)),
+        _exr_attribute("screenWindowCenter", "v2f", struct.pack("<ff", 0.0, 0.0)),
+        _exr_attribute("screenWindowWidth", "float", struct.pack("<f", 1.0)),
+        b"\0",
+    ))
+
+    # Each scanline stores the channels one after the other, in alphabetical order
+    planar = pixels[..., [3, 2, 1, 0]].transpose(0, 2, 1).astype("<f2" if use_half else "<f4")
+    lines_per_chunk = _EXR_LINES_PER_CHUNK[codec]
+    chunks = []
+    for y in range(0, height, lines_per_chunk):
+        data = planar[y:y + lines_per_chunk].tobytes()
+        if codec != 'NONE':
+            compressed = _exr_zip_compress(data, 6)
+            # Chunks that do not shrink are stored uncompressed
+            if len(compressed) < len(data):
+                data = compressed
+        chunks.append(struct.pack("<ii", y, len(data)) + data)
+
+    offset = len(header) + 8 * len(chunks)
+    offsets = []
+    for chunk in chunks:
+        offsets.append(offset)
+        offset += len(chunk)
+    return b"".join((header, struct.pack(f"<{len(offsets)}Q", *offsets), *chunks))
+
+
+def snapshot_image(image: Image, filepath: str) -> List[ImageSnapshot]:
+    """Read the pixels of every tile of the image, must run on the main thread.
+
+    Args:
+        image (Image): The image to export.
+        filepath (str): The file to write, with a <UDIM> marker for tiled images.
+    """
+    image_tiles = blender_image_to_numpy(image)
+    if image_tiles is None:
+        return []
+    is_srgb = image.colorspace_settings.name == 'sRGB'
+    return [
+        ImageSnapshot(filepath.replace("<UDIM>", str(tile_number)), pixels, image.is_float, is_srgb)
+        for tile_number, pixels in image_tiles.tiles.items()
+    ]
+
+
+def _get_checksum(snapshot: ImageSnapshot, settings: ImageExportSettings) -> str:
+    digest = hashlib.sha1(repr((settings, snapshot.is_float, snapshot.is_srgb)).encode())
+    digest.update(np.ascontiguousarray(snapshot.pixels).data)
+    return digest.hexdigest()
+
+
+def _is_file_unchanged(filepath: str, checksum: str) -> bool:
+    written = _written_checksums.get(filepath)
+    if written is None or written[0] != checksum:
+        return False
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return False
+    return (stat.st_size, stat.st_mtime_ns) == written[1:]
+
+
+def write_snapshot(snapshot: ImageSnapshot, settings: ImageExportSettings, skip_unchanged: bool = False) -> bool:
+    """Encode a snapshot and write it to its file, safe to run on any thread.
+
+    Args:
+        snapshot (ImageSnapshot): The pixels to write.
+        settings (ImageExportSettings): The file settings.
+        skip_unchanged (bool): Do not write the file if it still holds these pixels from a previous write.
+
+    Returns:
+        bool: False if the file was skipped.
+    """
+    checksum = _get_checksum(snapshot, settings) if skip_unchanged else None
+    if checksum and _is_file_unchanged(snapshot.filepath, checksum):
+        return False
+    pixels = snapshot.pixels
+    if settings.file_format == 'OPEN_EXR':
+        if not snapshot.is_float:
+            # Byte buffers hold display encoded values with straight alpha,
+            # EXR files are linear with premultiplied alpha
+            pixels = pixels.copy()
+            if snapshot.is_srgb:
+                pixels[..., :3] = srgb_to_linear(pixels[..., :3])
+            pixels[..., :3] *= pixels[..., 3:4]
+        data = encode_exr(pixels, use_half=settings.color_depth == '16', codec=settings.exr_codec)
+    else:
+        if snapshot.is_float:
+            # Float buffers are linear with premultiplied alpha,
+            # PNG files hold display encoded values with straight alpha
+            pixels = pixels.copy()
+            alpha = pixels[..., 3:4]
+            color = pixels[..., :3]
+            np.divide(color, alpha, out=color, where=alpha > 0)
+            if snapshot.is_srgb:
+                pixels[..., :3] = linear_to_srgb(color)
+        data = encode_png(pixels, bit_depth=int(settings.color_depth), compression=settings.compression)
+    with open(snapshot.filepath, "wb") as file:
+        file.write(data)
+    if checksum:
+        stat = os.stat(snapshot.filepath)
+        _written_checksums[snapshot.filepath] = (checksum, stat.st_size, stat.st_mtime_ns)
+    return True
+
+
+def export_images(
+        images: List[Tuple[Image, str, ImageExportSettings]],
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        skip_unchanged: bool = False,
+    ) -> Dict[str, Optional[str]]:
+    """Export images, reading them on the calling (main) thread and writing them from a thread pool.
+
+    At most max_workers snapshots are held in memory at once.
+
+    Args:
+        images (List[Tuple[Image, str, ImageExportSettings]]): The images, the file to write each
+            one to, with a <UDIM> marker for tiled images, and its file settings.
+        max_workers (Optional[int]): Size of the thread pool, the CPU count if None.
+        progress_callback (Optional[Callable[[int, int], None]]): Called on the calling thread
+            with the number of written files and the number of images read so far.
+        skip_unchanged (bool): Skip the files that still hold the pixels they were last written with.
+
+    Returns:
+        Dict[str, Optional[str]]: The error message of every image by name, None if it was exported.
+    """
+    start_time = time.time()
+    max_workers = max_workers or os.cpu_count() or 1
+    errors: Dict[str, Optional[str]] = {}
+    futures: Dict[Future, str] = {}
+    written = 0
+    skipped = 0
+    snapshot_time = 0.0
+
+    def collect(done: set):
+        nonlocal written, skipped
+        for future in done:
+            image_name = futures.pop(future)
+            try:
+                if future.result():
+                    written += 1
+                else:
+                    skipped += 1
+            except Exception as e:
+                errors[image_name] = str(e)
+        if progress_callback:
+            progress_callback(written, len(errors))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ps_export") as executor:
+        for image, filepath, settings in images:
+            errors.setdefault(image.name, None)
+            read_start = time.time()
+            try:
+                snapshots = snapshot_image(image, filepath)
+            except Exception as e:
+                errors[image.name] = str(e)
+                continue
+            snapshot_time += time.time() - read_start
+            for snapshot in snapshots:
+                while len(futures) >= max_workers:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    collect(done)
+                futures[executor.submit(write_snapshot, snapshot, settings, skip_unchanged)] = image.name
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            collect(done)
+    logger.debug(
+        f"Exported {written} files and skipped {skipped} unchanged ones in {round(time.time() - start_time, 2)} seconds "
+        f"({round(snapshot_time, 2)} seconds reading pixels)"
+    )
+    return errors
+
+
+def get_image_file_settings(image: Image) -> Optional[ImageExportSettings]:
+    """Return the settings to write the file of the image with, None if its format is not supported here."""
+    if image.file_format == 'PNG':
+        return ImageExportSettings(file_format='PNG', color_depth='16' if image.is_float else '8')
+    if image.file_format == 'OPEN_EXR':
+        return ImageExportSettings(file_format='OPEN_EXR', color_depth='16' if image.use_half_precision else '32')
+    return None
+
+
+def _is_round_trip_exact(image: Image, settings: ImageExportSettings) -> bool:
+    """Whether writing the image with these settings and reloading it gives back the same buffer."""
+    if image.is_float:
+        # EXR files hold linear, premultiplied floats, as float buffers do
+        return (
+            settings.file_format == 'OPEN_EXR'
+            and settings.color_depth == '32'
+            and image.colorspace_settings.name != 'sRGB'
+        )
+    # Byte buffers are written to 8 bit PNG files as is
+    return settings.file_format == 'PNG' and settings.color_depth == '8'
+
+
+def save_dirty_images(images: Iterable[Image], max_workers: Optional[int] = None):
+    """Save the dirty images, writing the ones stored in external files concurrently.
+
+    Only single images whose file gives back the exact same buffer are written here,
+    and reloaded afterwards to clear their dirty flag. Packed, generated and UDIM
+    images, and files that would lose precision, are saved by Blender one after the
+    other, which keeps their buffer in memory as it is.
+    """
+    start_time = time.time()
+    external_images = []
+    for image in images:
+        if not image.is_dirty:
+            continue
+        settings = get_image_file_settings(image)
+        is_multi_tile = image.source == 'TILED' and len(image.tiles) > 1
+        if (
+            settings is None
+            or image.packed_file
+            or image.filepath == ''
+            or image.source not in {'FILE', 'TILED'}
+            or is_multi_tile
+            or not _is_round_trip_exact(image, settings)
+        ):
+            save_image(image)
+            continue
+        external_images.append((image, bpy.path.abspath(image.filepath), settings))
+    if not external_images:
+        return
+
+    errors = export_images(external_images, max_workers=max_workers, skip_unchanged=True)
+    for image, _filepath, _settings in external_images:
+        if errors.get(image.name):
+            logger.warning(f"Failed to write {image.name}: {errors[image.name]}. Saving it with Blender instead.")
+            save_image(image)
+        else:
+            image.reload()
+    logger.debug(f"Saved {len(external_images)} image files in {round(time.time() - start_time, 2)} seconds")
@@ -1,5 +1,7 @@
 import bpy
 
+from .nested_list_manager import bump_collection_revision
+
 class ListManager:
     """
     A generic class to manage reordering, adding, and removing items 
@@ -43,6 +45,7 @@ class ListManager:
 
         new_index = self.active_index - 1
         self.collection.move(self.active_index, new_index)
+        bump_collection_revision()
         self.active_index = new_index
 
     def move_active_down(self):
@@ -52,11 +55,13 @@ class ListManager:
 
         new_index = self.active_index + 1
         self.collection.move(self.active_index, new_index)
+        bump_collection_revision()
         self.active_index = new_index
         
     def add_item(self):
         """Add a new item to the list."""
         item = self.collection.add()
+        bump_collection_revision()
         item.name = f"Item {len(self.collection)}"
         self.active_index = len(self.collection) - 1
         return item
@@ -67,6 +72,7 @@ class ListManager:
             return
 
         self.collection.remove(self.active_index)
+        bump_collection_revision()
         # Adjust active index if it's out of bounds
         if self.active_index >= len(self.collection):
             self.active_index = len(self.collection) - 1
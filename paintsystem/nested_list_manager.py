@@ -1,20 +1,125 @@
-from typing import Literal
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Tuple
 import bpy
 from bpy.props import StringProperty, IntProperty, EnumProperty
 from bpy.types import PropertyGroup
 
+
+@dataclass
+class NestedListIndex:
+    """Lookup tables for one nested list, built from a single pass over its collection."""
+    revision: int
+    length: int
+    index_by_id: Dict[int, int] = field(default_factory=dict)
+    # parent_id -> collection indices of its direct children, in collection order
+    children_by_parent: Dict[int, List[int]] = field(default_factory=dict)
+
+
+@dataclass
+class FlattenedHierarchy:
+    """Display order of one nested list, valid for a single structure revision.
+
+    Only collection indices are kept: a cached item would point to freed memory once
+    the data-block holding its manager is removed.
+    """
+    revision: int
+    length: int
+    # (collection index, level) of every item in display order
+    hierarchy: List[Tuple[int, int]]
+    position_by_id: Dict[int, int]
+
+
+class ResolvedHierarchy(Sequence):
+    """Read-only sequence over a flattened hierarchy, resolving the items from the collection on access.
+
+    Yields (item, level) tuples, or only the items if with_levels is False.
+    """
+
+    def __init__(self, collection, hierarchy: List[Tuple[int, int]], with_levels: bool = True):
+        self._collection = collection
+        self._hierarchy = hierarchy
+        self._with_levels = with_levels
+
+    def __len__(self):
+        return len(self._hierarchy)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        index, level = self._hierarchy[position]
+        item = self._collection[index]
+        return (item, level) if self._with_levels else item
+
+
+# bpy structs can't hold Python attributes, so the indexes are kept here, keyed
+# by the pointer of their manager and the session uid of the data-block holding it.
+# The uid tells a manager apart from a freed one that had the same address.
+_index_cache: Dict[Tuple[int, int], NestedListIndex] = {}
+_flatten_cache: Dict[Tuple[int, int], FlattenedHierarchy] = {}
+# Bumped whenever the id, parent_id or order of any item changes
+_structure_revision = 0
+# Bumped whenever managers are added, removed or moved. Their collection is compacted or
+# reallocated, so a manager can end up with the pointer another one was cached under.
+_collection_revision = 0
+
+
+def bump_structure_revision():
+    """Mark every cached flattened hierarchy as stale."""
+    global _structure_revision
+    _structure_revision += 1
+
+
+def bump_collection_revision():
+    """Mark every cached index and flattened hierarchy as stale, after adding, removing or moving managers."""
+    global _collection_revision
+    _collection_revision += 1
+    bump_structure_revision()
+
+
+def invalidate_nested_list_indexes():
+    """Drop every cached nested list index (e.g. after undo or loading a file)."""
+    _index_cache.clear()
+    _flatten_cache.clear()
+    bump_collection_revision()
+
+
+def _on_structure_update(self, context):
+    bump_structure_revision()
+
+
+def _get_owning_manager(item):
+    """Return the manager whose collection holds item, or None if it cannot be resolved."""
+    try:
+        # Drop the "[key]" of the item first, the key may be a name containing dots
+        owner_path = item.path_from_id().rpartition("[")[0].rpartition(".")[0]
+        return item.id_data.path_resolve(owner_path) if owner_path else item.id_data
+    except (ValueError, AttributeError):
+        return None
+
+
+def _on_parent_id_update(self, context):
+    # The parent is also set directly outside the manager (e.g. when pasting layers)
+    manager = _get_owning_manager(self)
+    if isinstance(manager, BaseNestedListManager):
+        manager.invalidate_index()
+    else:
+        invalidate_nested_list_indexes()
+
+
 class BaseNestedListItem(PropertyGroup):
     """Base class for nested list items. Extend this class to add custom properties."""
-    id: IntProperty()
+    id: IntProperty(update=_on_structure_update)
     name: StringProperty()
-    parent_id: IntProperty(default=-1)
-    order: IntProperty()
+    parent_id: IntProperty(default=-1, update=_on_parent_id_update)
+    order: IntProperty(update=_on_structure_update)
     type: EnumProperty(
         items=[
             ('FOLDER', "Folder", "Can contain other items"),
             ('ITEM', "Item", "Cannot contain other items")
         ],
-        default='ITEM'
+        default='ITEM',
+        update=_on_structure_update
     )
 
 
@@ -33,6 +138,38 @@ class BaseNestedListManager(PropertyGroup):
         """Override this to return the name of the collection property"""
         return "items"
 
+    def _get_cache_key(self) -> Tuple[int, int]:
+        return self.as_pointer(), self.id_data.session_uid
+
+    def invalidate_index(self):
+        """Drop the cached lookup index and display order, they are rebuilt on the next lookup."""
+        key = self._get_cache_key()
+        _index_cache.pop(key, None)
+        _flatten_cache.pop(key, None)
+
+    def get_index(self) -> NestedListIndex:
+        """Get the id and parent lookup index, rebuilding it if the collection changed size."""
+        collection = getattr(self, self.collection_name)
+        key = self._get_cache_key()
+        index = _index_cache.get(key)
+        if index is None or index.revision != _collection_revision or index.length != len(collection):
+            index = NestedListIndex(revision=_collection_revision, length=len(collection))
+            for i, item in enumerate(collection):
+                index.index_by_id[item.id] = i
+                index.children_by_parent.setdefault(item.parent_id, []).append(i)
+            _index_cache[key] = index
+        return index
+
+    def get_direct_children(self, parent_id) -> list:
+        """Get the items directly under parent_id, in collection order."""
+        collection = getattr(self, self.collection_name)
+        children = [collection[i] for i in self.get_index().children_by_parent.get(parent_id, ())]
+        if any(child.parent_id != parent_id for child in children):
+            # The collection was reordered outside the manager
+            self.invalidate_index()
+            children = [collection[i] for i in self.get_index().children_by_parent.get(parent_id, ())]
+        return children
+
     def get_active_item(self):
         """Get currently active item based on active_index."""
         if getattr(self, self.collection_name) is None or self.active_index < 0 or self.active_index >= len(getattr(self, self.collection_name)):
@@ -41,8 +178,8 @@ class BaseNestedListManager(PropertyGroup):
 
     def adjust_sibling_orders(self, parent_id, insert_order):
         """Increase order of all items at or above the insert_order under the same parent"""
-        for item in getattr(self, self.collection_name):
-            if item.parent_id == parent_id and item.order >= insert_order:
+        for item in self.get_direct_children(parent_id):
+            if item.order >= insert_order:
                 item.order += 1
 
     def get_insertion_data(self, active_item=None, handle_folder=True, insert_at: Literal["TOP", "BOTTOM", "CURSOR", "BEFORE", "AFTER"] = "CURSOR"):
@@ -73,8 +210,7 @@ class BaseNestedListManager(PropertyGroup):
                         # If selected item is a folder, add inside it
                         parent_id = active_item.id
                         # Find lowest order in folder or default to 1
-                        orders = [
-                            item.order for item in getattr(self, self.collection_name) if item.parent_id == parent_id]
+                        orders = [item.order for item in self.get_direct_children(parent_id)]
                         insert_order = min(orders) if orders else 1
                     else:
                         # If selected item is not a folder, add at same level
@@ -91,6 +227,7 @@ class BaseNestedListManager(PropertyGroup):
                 return -1
 
         new_item = getattr(self, self.collection_name).add()
+        self.invalidate_index()
         new_item.id = self.next_id
         new_item.name = name
         new_item.parent_id = parent_id
@@ -107,11 +244,10 @@ class BaseNestedListManager(PropertyGroup):
     
     def get_children(self, parent_id):
         children = []
-        for item in getattr(self, self.collection_name):
-            if item.parent_id == parent_id:
-                children.append(item)
-                if item.type == 'FOLDER':
-                    children.extend(self.get_children(item.id))
+        for item in self.get_direct_children(parent_id):
+            children.append(item)
+            if item.type == 'FOLDER':
+                children.extend(self.get_children(item.id))
         return children
     
     def remove_children(self, item_id):
@@ -121,17 +257,17 @@ class BaseNestedListManager(PropertyGroup):
             collection = getattr(self, self.collection_name)
             for index in sorted(children_index, reverse=True):
                 collection.remove(index)
+            self.invalidate_index()
 
     def remove_item_and_children(self, item_id, on_delete=None):
         """Remove an item and all its children"""
         to_remove = []
 
         def collect_children(parent_id):
-            for i, item in enumerate(getattr(self, self.collection_name)):
-                if item.parent_id == parent_id:
-                    to_remove.append(i)
-                    if item.type == 'FOLDER':
-                        collect_children(item.id)
+            for item in self.get_direct_children(parent_id):
+                to_remove.append(self.get_collection_index_from_id(item.id))
+                if item.type == 'FOLDER':
+                    collect_children(item.id)
 
         # Collect the item index
         item_index = self.get_collection_index_from_id(item_id)
@@ -147,25 +283,29 @@ class BaseNestedListManager(PropertyGroup):
                 if on_delete:
                     on_delete(getattr(self, self.collection_name)[index])
                 getattr(self, self.collection_name).remove(index)
+            self.invalidate_index()
 
             return True
         self.normalize_orders()
         return False
 
     def get_next_order(self, parent_id):
-        return max((item.order for item in getattr(self, self.collection_name) if item.parent_id == parent_id), default=-1) + 1
+        return max((item.order for item in self.get_direct_children(parent_id)), default=-1) + 1
 
     def get_item_by_id(self, item_id):
-        for item in getattr(self, self.collection_name):
-            if item.id == item_id:
-                return item
-        return None
+        index = self.get_collection_index_from_id(item_id)
+        if index == -1:
+            return None
+        return getattr(self, self.collection_name)[index]
 
     def get_collection_index_from_id(self, item_id):
-        for index, item in enumerate(getattr(self, self.collection_name)):
-            if item.id == item_id:
-                return index
-        return -1
+        collection = getattr(self, self.collection_name)
+        index = self.get_index().index_by_id.get(item_id, -1)
+        if index != -1 and collection[index].id != item_id:
+            # The collection was reordered outside the manager
+            self.invalidate_index()
+            index = self.get_index().index_by_id.get(item_id, -1)
+        return index
 
     def get_id_from_flattened_index(self, flattened_index):
         flattened = getattr(self, self.collection_name)
@@ -173,20 +313,43 @@ class BaseNestedListManager(PropertyGroup):
             return flattened[flattened_index].id
         return -1
 
-    def flatten_hierarchy(self):
-        """Return a list of (item, level) tuples representing the hierarchy in display order."""
+    def get_flattened(self) -> FlattenedHierarchy:
+        """Get the cached display order, rebuilding it if the structure changed since."""
+        key = self._get_cache_key()
+        length = len(getattr(self, self.collection_name))
+        flattened = _flatten_cache.get(key)
+        if flattened is not None and flattened.revision == _structure_revision and flattened.length == length:
+            return flattened
+
         def collect_items(parent_id, level):
             collected = []
-            children = sorted(
-                [item for item in getattr(self, self.collection_name) if item.parent_id == parent_id],
-                key=lambda i: i.order
-            )
+            children = sorted(self.get_direct_children(parent_id), key=lambda i: i.order)
             for item in children:
-                collected.append((item, level))
+                collected.append((self.get_collection_index_from_id(item.id), item.id, level))
                 if item.type == 'FOLDER':
                     collected.extend(collect_items(item.id, level + 1))
             return collected
-        return collect_items(-1, 0)
+        collected = collect_items(-1, 0)
+        flattened = FlattenedHierarchy(
+            revision=_structure_revision,
+            length=length,
+            hierarchy=[(index, level) for index, _, level in collected],
+            position_by_id={item_id: i for i, (_, item_id, _) in enumerate(collected)},
+        )
+        _flatten_cache[key] = flattened
+        return flattened
+
+    def flatten_hierarchy(self) -> ResolvedHierarchy:
+        """Return a sequence of (item, level) tuples representing the hierarchy in display order."""
+        return ResolvedHierarchy(getattr(self, self.collection_name), self.get_flattened().hierarchy)
+
+    def get_flattened_items(self) -> ResolvedHierarchy:
+        """Return a sequence of the items in display order."""
+        return ResolvedHierarchy(getattr(self, self.collection_name), self.get_flattened().hierarchy, with_levels=False)
+
+    def get_flattened_index(self, item_id) -> int:
+        """Get the display position of an item, or -1 if it is not in the hierarchy."""
+        return self.get_flattened().position_by_id.get(item_id, -1)
     
     def get_item_level_from_id(self, item_id):
         """Get the level of an item in the hierarchy"""
@@ -203,18 +366,13 @@ class BaseNestedListManager(PropertyGroup):
 
     def normalize_orders(self):
         """Normalize orders to be sequential starting from 1 within each parent level"""
-        # Group items by parent_id
-        parent_groups = {}
-        for item in getattr(self, self.collection_name):
-            if item.parent_id not in parent_groups:
-                parent_groups[item.parent_id] = []
-            parent_groups[item.parent_id].append(item)
-
         # Sort and reassign orders within each parent group
-        for parent_id, items in parent_groups.items():
-            sorted_items = sorted(items, key=lambda x: x.order)
+        for parent_id in list(self.get_index().children_by_parent):
+            sorted_items = sorted(self.get_direct_children(parent_id), key=lambda x: x.order)
             for index, item in enumerate(sorted_items, start=1):  # Start from 1
-                item.order = index
+                # Only write changed orders, every write bumps the structure revision
+                if item.order != index:
+                    item.order = index
 
     def get_next_sibling_item(self, flattened, current_flat_index):
         """
@@ -248,8 +406,7 @@ class BaseNestedListManager(PropertyGroup):
             return []
 
         flattened = self.flatten_hierarchy()
-        current_flat_index = next(
-            (i for i, (it, _) in enumerate(flattened) if it.id == item_id), -1)
+        current_flat_index = self.get_flattened_index(item_id)
         options = []
 
         if direction == 'UP':
@@ -274,8 +431,7 @@ class BaseNestedListManager(PropertyGroup):
                 options.append(('SKIP', "Skip over"))
 
             # Check if at top of current parent
-            siblings = sorted(
-                [i for i in getattr(self, self.collection_name) if i.parent_id == item.parent_id], key=lambda x: x.order)
+            siblings = sorted(self.get_direct_children(item.parent_id), key=lambda x: x.order)
             if item.order == 0 and item.parent_id != -1:  # At top of current parent and not at root
                 parent = self.get_item_by_id(item.parent_id)
                 if parent:
@@ -342,13 +498,13 @@ class BaseNestedListManager(PropertyGroup):
             item.order = parent.order
 
             # Shift parent and siblings down
-            for sibling in getattr(self, self.collection_name):
-                if sibling.parent_id == grandparent_id and sibling.order >= parent.order:
+            for sibling in self.get_direct_children(grandparent_id):
+                if sibling.order >= parent.order:
                     sibling.order += 1
         else:  # DOWN
             # Move to bottom of grandparent level
             max_order = max(
-                (i.order for i in getattr(self, self.collection_name) if i.parent_id == grandparent_id),
+                (i.order for i in self.get_direct_children(grandparent_id)),
                 default=-1
             )
             item.parent_id = grandparent_id
@@ -362,9 +518,8 @@ class BaseNestedListManager(PropertyGroup):
 
         if position == 'TOP':
             # Shift existing items down
-            for other in getattr(self, self.collection_name):
-                if other.parent_id == target_folder.id:
-                    other.order += 1
+            for other in self.get_direct_children(target_folder.id):
+                other.order += 1
             item.order = 0
         else:  # BOTTOM
             item.order = self.get_next_order(target_folder.id)
@@ -380,10 +535,8 @@ class BaseNestedListManager(PropertyGroup):
         else:  # DOWN
             item.order = target_item.order
             # Shift other items
-            for other in getattr(self, self.collection_name):
-                if (other.parent_id == target_item.parent_id and
-                    other.order >= target_item.order and
-                        other.id != item.id):
+            for other in self.get_direct_children(target_item.parent_id):
+                if other.order >= target_item.order and other.id != item.id:
                     other.order += 1
 
         return True
@@ -413,8 +566,7 @@ class BaseNestedListManager(PropertyGroup):
         self.normalize_orders()
 
         flattened = self.flatten_hierarchy()
-        current_flat_index = next(
-            (i for i, (it, _) in enumerate(flattened) if it.id == item_id), -1)
+        current_flat_index = self.get_flattened_index(item_id)
 
         # Handle moving out of folder
         if action in ['MOVE_OUT', 'MOVE_OUT_BOTTOM'] and item.parent_id != -1:
@@ -432,10 +584,7 @@ class BaseNestedListManager(PropertyGroup):
                 elif action == 'MOVE_ADJACENT':
                     return self.move_item_adjacent(item, target_item, direction)
                 elif action == 'SKIP':
-                    siblings = sorted(
-                        [i for i in getattr(self, self.collection_name) if i.parent_id == item.parent_id],
-                        key=lambda x: x.order
-                    )
+                    siblings = sorted(self.get_direct_children(item.parent_id), key=lambda x: x.order)
                     return self.skip_over_item(item, siblings, direction)
         else:  # DOWN
             next_item, _ = self.get_next_sibling_item(
@@ -447,10 +596,7 @@ class BaseNestedListManager(PropertyGroup):
                 elif action == 'MOVE_ADJACENT':
                     return self.move_item_adjacent(item, next_item, direction)
                 elif action == 'SKIP':
-                    siblings = sorted(
-                        [i for i in getattr(self, self.collection_name) if i.parent_id == item.parent_id],
-                        key=lambda x: x.order
-                    )
+                    siblings = sorted(self.get_direct_children(item.parent_id), key=lambda x: x.order)
                     return self.skip_over_item(item, siblings, direction)
 
         return False
@@ -0,0 +1,175 @@
+"""Deferred, de-duplicated node tree rebuilds for layers, channels and groups.
+
+Inside a ``deferred_node_tree_updates()`` scope, ``Layer.update_node_tree``,
+``Channel.update_node_tree`` and ``Group.update_node_tree`` only mark their tree
+as dirty. Every dirty tree is rebuilt exactly once when the outermost scope exits,
+in dependency order (layers, then channels, then groups), or earlier through
+``flush_node_tree_updates()``.
+
+Dirty items are tracked by material name and RNA path rather than by Python
+reference, so they survive collection reallocation between marking and flushing.
+
+Example (headless script)::
+
+    with deferred_node_tree_updates():
+        layer.blend_mode = 'MULTIPLY'
+        layer.coord_type = 'DECAL'
+    # both changes are applied with a single rebuild here
+"""
+
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import bpy
+
+from ..utils.logging import get_logger
+
+if TYPE_CHECKING:
+    from .data import Channel, Group, Layer
+
+logger = get_logger(__name__)
+
+LAYER = "LAYER"
+CHANNEL = "CHANNEL"
+GROUP = "GROUP"
+# Rebuild order on flush: layer trees are nested inside channel trees,
+# which are nested inside group trees
+_FLUSH_ORDER = (LAYER, CHANNEL, GROUP)
+
+# (kind, material name, RNA path) -> layer uid (empty for channels and groups)
+_dirty_items: Dict[Tuple[str, str, str], str] = {}
+_defer_depth = 0
+_flushing = False
+
+
+def is_deferring() -> bool:
+    """Return True if node tree rebuilds are currently being deferred."""
+    return _defer_depth > 0 and not _flushing
+
+
+def has_pending_updates() -> bool:
+    """Return True if there are dirty trees waiting for a flush."""
+    return bool(_dirty_items)
+
+
+def _get_item_key(kind: str, item: bpy.types.PropertyGroup) -> Optional[Tuple[str, str, str]]:
+    material = item.id_data
+    if not isinstance(material, bpy.types.Material):
+        return None
+    try:
+        path = item.path_from_id()
+    except ValueError:
+        return None
+    return (kind, material.name, path)
+
+
+def _update_now(item) -> None:
+    global _flushing
+    was_flushing = _flushing
+    _flushing = True
+    try:
+        item.update_node_tree(bpy.context)
+    finally:
+        _flushing = was_flushing
+
+
+def mark_layer_dirty(layer: "Layer") -> None:
+    """Queue *layer* for a node tree rebuild on the next flush."""
+    key = _get_item_key(LAYER, layer)
+    if key is None:
+        logger.warning(f"Could not defer update of layer {layer.name}, updating now")
+        _update_now(layer)
+        return
+    _dirty_items[key] = layer.uid
+
+
+def mark_channel_dirty(channel: "Channel") -> None:
+    """Queue *channel* for a node tree rebuild on the next flush."""
+    key = _get_item_key(CHANNEL, channel)
+    if key is None:
+        logger.warning(f"Could not defer update of channel {channel.name}, updating now")
+        _update_now(channel)
+        return
+    _dirty_items[key] = ""
+
+
+def mark_group_dirty(group: "Group") -> None:
+    """Queue *group* for a node tree rebuild on the next flush."""
+    key = _get_item_key(GROUP, group)
+    if key is None:
+        logger.warning(f"Could not defer update of group {group.name}, updating now")
+        _update_now(group)
+        return
+    _dirty_items[key] = ""
+
+
+def _resolve_item(kind: str, material_name: str, path: str, uid: str):
+    material = bpy.data.materials.get(material_name)
+    if material is None:
+        return None
+    try:
+        item = material.path_resolve(path)
+    except ValueError:
+        item = None
+    if kind == LAYER and (item is None or item.uid != uid):
+        # The layer moved inside its collection, find it by uid instead
+        from .data import get_layer_by_uid
+        item = get_layer_by_uid(material, uid)
+    return item
+
+
+def flush_node_tree_updates(context: bpy.types.Context = None) -> int:
+    """Rebuild every dirty tree once: layers first, then channels, then groups.
+
+    Safe to call inside a ``deferred_node_tree_updates()`` scope, e.g. before
+    reading nodes or baking.
+
+    Returns:
+        int: The number of rebuilt trees.
+    """
+    global _flushing
+    if _flushing or not _dirty_items:
+        return 0
+    context = context or bpy.context
+    rebuilt = 0
+    _flushing = True
+    try:
+        for kind in _FLUSH_ORDER:
+            for key in [key for key in _dirty_items if key[0] == kind]:
+                uid = _dirty_items.pop(key, None)
+                if uid is None:
+                    continue
+                item = _resolve_item(kind, key[1], key[2], uid)
+                if item is None:
+                    logger.debug(f"Skipping removed {kind.lower()} {key[2]} ({key[1]})")
+                    continue
+                try:
+                    item.update_node_tree(context)
+                    rebuilt += 1
+                except Exception as e:
+                    logger.error(f"Error updating {kind.lower()} {item.name}: {e}")
+    finally:
+        _flushing = False
+    return rebuilt
+
+
+@contextmanager
+def deferred_node_tree_updates(context: bpy.types.Context = None):
+    """Defer layer, channel and group rebuilds until the outermost scope exits.
+
+    Reentrant: nested scopes only flush when the outermost one exits. Can also be
+    used as a decorator, e.g. on an operator's ``execute``.
+    """
+    global _defer_depth
+    _defer_depth += 1
+    try:
+        yield
+    finally:
+        _defer_depth -= 1
+        if _defer_depth == 0:
+            flush_node_tree_updates(context)
+
+
+def clear_pending_updates() -> None:
+    """Drop all pending rebuilds without applying them (e.g. after loading a file)."""
+    _dirty_items.clear()
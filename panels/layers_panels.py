@@ -63,7 +63,7 @@ class MAT_PT_UL_LayerList(PSContextMixin, UIList):
             return
         # The UIList passes channel as 'data'
         active_channel = data
-        flattened = active_channel.flattened_layers
+        flattened = active_channel.flattened_unlinked_layers
         if index < len(flattened):
             level = active_channel.get_item_level_from_id(item.id)
             main_row = layout.row(align=True)
@@ -119,21 +119,21 @@ class MAT_PT_UL_LayerList(PSContextMixin, UIList):
         # If you do not make filtering and/or ordering, return empty list(s) (this will be more efficient than
         # returning full lists doing nothing!).
         layers = getattr(data, propname).values()
-        flattened_layers = data.flattened_unlinked_layers
+        flattened = data.get_flattened()
+
+        # Parents come before their children in display order, so a single pass
+        # finds every item that sits inside a collapsed folder
+        collapsed_ids = set()
+        for layer, _ in data.flatten_hierarchy():
+            if layer.parent_id in collapsed_ids or not layer.is_expanded:
+                collapsed_ids.add(layer.id)
 
-        # Default return values.
         flt_flags = []
         flt_neworder = []
-
-        # Filtering by name
-        flt_flags = [self.bitflag_filter_item] * len(layers)
-        for idx, layer in enumerate(layers):
-            flt_neworder.append(flattened_layers.index(layer))
-            while layer.parent_id != -1:
-                layer = data.get_item_by_id(layer.parent_id)
-                if layer and not layer.is_expanded:
-                    flt_flags[idx] &= ~self.bitflag_filter_item
-                    break
+        for layer in layers:
+            hidden = layer.parent_id in collapsed_ids
+            flt_flags.append(0 if hidden else self.bitflag_filter_item)
+            flt_neworder.append(flattened.position_by_id[layer.id])
 
         return flt_flags, flt_neworder
 